@@ -0,0 +1,80 @@
+import pandas as pd
+
+import flavor_profiles
+import scoring
+import storage
+
+# Analytics over stored cupping data. Everything is derived from one flat
+# per-sample frame with vectorized group-bys; callers cache the results keyed
+# on storage.get_data_version() so nothing is recomputed until new cups land.
+
+# Averages are only compared across the quality attributes (6-10 scale).
+ATTRIBUTE_LABELS = {
+    scoring.ATTRIBUTES[i]: scoring.ATTRIBUTE_LABELS[scoring.ATTRIBUTES[i]] for i in scoring.QUALITY
+}
+
+
+def load_samples_frame(conn, user_email):
+    query, params = storage.scored_samples_query(user_email)
+    df = pd.read_sql_query(query, conn, params=params)
+    df["date"] = pd.to_datetime(df["date"])
+    columns = list(storage.SCORE_COLUMNS)
+    df[columns] = df[columns].astype(float)
+    return df
+
+
+def session_scores(df):
+    # One point per session: mean final score of its scored samples.
+    scored = df.dropna(subset=["final_score"])
+    return (
+        scored.groupby(["session_id", "date"], sort=False)["final_score"]
+        .mean()
+        .reset_index()
+        .sort_values(["date", "session_id"])
+        .rename(columns={"final_score": "score"})
+    )
+
+
+def origin_counts(df):
+    return df["origin"].replace("", pd.NA).dropna().value_counts()
+
+
+def origin_averages(df):
+    scored = df.dropna(subset=["final_score"])
+    return (
+        scored[scored["origin"].fillna("") != ""]
+        .groupby("origin")["final_score"]
+        .mean()
+        .sort_values(ascending=False)
+    )
+
+
+def attribute_means(df):
+    means = df[list(ATTRIBUTE_LABELS)].mean()
+    return means.dropna().rename(index=ATTRIBUTE_LABELS)
+
+
+def monthly_progress(df):
+    scored = df.dropna(subset=["final_score"])
+    monthly = scored.groupby(scored["date"].dt.to_period("M"))["final_score"].mean()
+    monthly.index = monthly.index.strftime("%b %Y")
+    return monthly
+
+
+def flavor_categories(conn, user_email):
+    # Descriptor mentions per wheel category over sample notes and saved
+    # profiles, most used first; categories never used are left out.
+    counts = pd.Series(flavor_profiles.category_counts(flavor_profiles.load_usage(conn, user_email)))
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+
+def summarize(conn, user_email):
+    df = load_samples_frame(conn, user_email)
+    return {
+        "session_scores": session_scores(df),
+        "origin_counts": origin_counts(df),
+        "origin_averages": origin_averages(df),
+        "attribute_means": attribute_means(df),
+        "monthly_progress": monthly_progress(df),
+        "flavor_categories": flavor_categories(conn, user_email),
+    }
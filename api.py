@@ -0,0 +1,197 @@
+import functools
+import json
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import auth
+import badges
+import services
+import storage
+
+# JSON API over the service layer, for scales, inventory systems and scripts.
+# Handlers are async; password hashing and SQLite calls run on the worker
+# thread pool, each worker with its own connection. Clients log in once and
+# send the token as "Authorization: Bearer <token>".
+#
+#     POST /api/login                     {"email", "password"} -> {"token"}
+#     GET  /api/stats                     per-user stats and badges
+#     GET  /api/sessions?limit=&sort=&cursor=
+#     POST /api/sessions                  one session or a list of sessions
+#     POST /api/reviews                   one review or a list of reviews
+#     GET  /api/flavors?q=&limit=         flavor wheel search
+#     GET  /api/samples/{id}/similar?limit=&approximate=1
+#     POST /api/samples/similar           {"scores", "flavors", "limit"} for an unsaved sample
+#     POST /api/calibration/{code}/scores list of {"sample", "version", "cups"}
+#
+# Samples in POST /api/sessions may carry "cups": [{attribute: value}, ...],
+# so a whole score sheet is submitted in one call.
+
+MAX_BATCH = 500
+MAX_LIMIT = 200
+
+# Saves through the API award badges too (also when served from asgi.py,
+# before any UI session has started).
+badges.register()
+
+
+def _error(message, status=400):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def _run(function, *args):
+    # Thread-local connection, opened on whichever worker runs the call.
+    return run_in_threadpool(lambda: function(storage.get_connection(), *args))
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError:
+        raise services.ValidationError("request body must be JSON")
+
+
+def _batch(body):
+    items = body if isinstance(body, list) else [body]
+    if not items or len(items) > MAX_BATCH or not all(isinstance(i, dict) for i in items):
+        raise services.ValidationError(f"send an object or a list of 1-{MAX_BATCH} objects")
+    return items
+
+
+def _limit(params, default, maximum):
+    try:
+        return max(1, min(int(params.get("limit", default)), maximum))
+    except (TypeError, ValueError):
+        raise services.ValidationError("limit must be an integer")
+
+
+def _cursor(params):
+    # The JSON [sort key, id] pair from the previous page, or None.
+    if "cursor" not in params:
+        return None
+    try:
+        cursor = json.loads(params["cursor"])
+    except ValueError:
+        cursor = None
+    if not (isinstance(cursor, list) and len(cursor) == 2 and isinstance(cursor[1], int)
+            and isinstance(cursor[0], (str, int, float))):
+        raise services.ValidationError("cursor must be the JSON [key, id] pair from the previous page")
+    return cursor
+
+
+def endpoint(authenticated=True):
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            email = None
+            if authenticated:
+                header = request.headers.get("authorization", "")
+                email = auth.check_token(header[7:]) if header.startswith("Bearer ") else None
+                if email is None:
+                    return _error("missing or expired token", 401)
+            try:
+                return JSONResponse(await handler(request, email))
+            except services.ValidationError as e:
+                return _error(str(e))
+        return wrapper
+    return decorator
+
+
+@endpoint(authenticated=False)
+async def login(request, _):
+    body = await _json_body(request)
+    if not isinstance(body, dict):
+        raise services.ValidationError("send a JSON object with email and password")
+    user = await _run(auth.authenticate, str(body.get("email", "")), str(body.get("password", "")))
+    if user is None:
+        raise services.ValidationError("invalid email or password")
+    return {"token": auth.issue_token(user["email"]), "expires_in": auth.TOKEN_TTL}
+
+
+@endpoint()
+async def stats(request, email):
+    return await _run(services.user_summary, email)
+
+
+@endpoint()
+async def list_sessions(request, email):
+    params = request.query_params
+    sort = params.get("sort", "date")
+    if sort not in storage.SESSION_SORTS:
+        raise services.ValidationError(f"sort must be one of {', '.join(storage.SESSION_SORTS)}")
+    limit = _limit(params, 20, MAX_LIMIT)
+    cursor = _cursor(params)
+    sessions = await _run(lambda conn: storage.list_sessions(conn, email, limit, cursor, sort))
+    next_cursor = storage.next_cursor(sessions) if len(sessions) == limit else None
+    for session in sessions:
+        del session["sort_key"]
+    return {"sessions": sessions, "cursor": next_cursor}
+
+
+@endpoint()
+async def create_sessions(request, email):
+    items = _batch(await _json_body(request))
+    return {"ids": await _run(services.create_sessions, email, items)}
+
+
+@endpoint()
+async def create_reviews(request, email):
+    items = _batch(await _json_body(request))
+    return {"ids": await _run(services.create_reviews, email, items)}
+
+
+@endpoint()
+async def search_flavors(request, email):
+    params = request.query_params
+    return {"flavors": services.search_flavors(params.get("q", ""), _limit(params, 10, 50))}
+
+
+def _approximate(params):
+    return params.get("approximate", "0") not in ("", "0", "false")
+
+
+@endpoint()
+async def similar_to_sample(request, email):
+    params = request.query_params
+    sample_id = request.path_params["sample_id"]
+    k = _limit(params, 10, MAX_LIMIT)
+    matches = await _run(lambda conn: services.similar_samples(
+        conn, email, sample_id=sample_id, k=k, approximate=_approximate(params)))
+    return {"matches": matches}
+
+
+@endpoint()
+async def similar_to_scores(request, email):
+    body = await _json_body(request)
+    if not isinstance(body, dict):
+        raise services.ValidationError("send a JSON object with scores and flavors")
+    k = _limit(body, 10, MAX_LIMIT)
+    matches = await _run(lambda conn: services.similar_samples(
+        conn, email, scores=body.get("scores"), flavors=body.get("flavors") or [], k=k,
+        approximate=bool(body.get("approximate"))))
+    return {"matches": matches}
+
+
+@endpoint()
+async def calibration_scores(request, email):
+    items = _batch(await _json_body(request))
+    code = request.path_params["code"].upper()
+    return {"results": await _run(services.submit_calibration_scores, code, email, items)}
+
+
+routes = [
+    Route("/api/login", login, methods=["POST"]),
+    Route("/api/stats", stats, methods=["GET"]),
+    Route("/api/sessions", list_sessions, methods=["GET"]),
+    Route("/api/sessions", create_sessions, methods=["POST"]),
+    Route("/api/reviews", create_reviews, methods=["POST"]),
+    Route("/api/flavors", search_flavors, methods=["GET"]),
+    Route("/api/samples/similar", similar_to_scores, methods=["POST"]),
+    Route("/api/samples/{sample_id:int}/similar", similar_to_sample, methods=["GET"]),
+    Route("/api/calibration/{code}/scores", calibration_scores, methods=["POST"]),
+]
+
+# API on its own: `uvicorn api:app`. Served together with the UI from asgi.py.
+app = Starlette(routes=routes)
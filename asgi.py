@@ -0,0 +1,9 @@
+import streamlit as st
+
+import api
+
+# UI and JSON API in one process:
+#
+#     uvicorn asgi:app --host 0.0.0.0 --port 8501
+
+app = st.App("streamlit_app_complex.py", routes=api.routes)
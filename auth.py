@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import session_store
+import storage
+
+# Credentials: passwords are stored as scrypt hashes ("scrypt$n$r$p$salt$hash").
+# Hashing runs on a small shared pool sized to the CPU count. The pool only
+# limits how many hashes run at once: the calling thread still blocks on the
+# result, but a login burst queues instead of every script thread allocating
+# scrypt memory at once.
+# Verified logins get a short-lived signed token, stored in session_store so
+# every worker accepts it; reruns check the token rather than the password.
+
+SCRYPT_N = int(os.environ.get("CUPPING_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("CUPPING_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("CUPPING_SCRYPT_P", 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+HASH_WORKERS = int(os.environ.get("CUPPING_HASH_WORKERS", os.cpu_count() or 2))
+TOKEN_TTL = session_store.TTL
+
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="kdf")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * r * (n + p + 2), dklen=KEY_BYTES,
+    )
+
+
+def _hash(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def _verify(password, encoded):
+    if not encoded.startswith("scrypt$"):
+        # Rows written before hashing keep plaintext until their next login.
+        return hmac.compare_digest(password.encode("utf-8"), encoded.encode("utf-8"))
+    _, n, r, p, salt, key = encoded.split("$")
+    derived = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(derived, base64.b64decode(key))
+
+
+def hash_password(password):
+    return _pool.submit(_hash, password).result()
+
+
+def verify_password(password, encoded):
+    return _pool.submit(_verify, password, encoded).result()
+
+
+def needs_rehash(encoded):
+    return not encoded.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+# Verified against when the email is unknown, so a miss costs the same as a
+# wrong password and response time doesn't reveal which accounts exist.
+_DUMMY_HASH = _hash(secrets.token_hex(8))
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def register(conn, email, user, password):
+    storage.create_user(conn, normalize_email(email), {**user, "password_hash": hash_password(password)})
+
+
+def authenticate(conn, email, password):
+    # Returns the stored user, or None for an unknown email or wrong password.
+    credentials = storage.get_credentials(conn, normalize_email(email))
+    encoded = credentials["password_hash"] if credentials else _DUMMY_HASH
+    if not verify_password(password, encoded) or credentials is None:
+        return None
+    if needs_rehash(encoded):
+        storage.set_password_hash(conn, credentials["email"], hash_password(password))
+    return storage.get_user(conn, credentials["email"])
+
+
+def ensure_user(conn, email, user, password):
+    if not storage.user_exists(conn, normalize_email(email)):
+        register(conn, email, user, password)
+
+
+# Session tokens
+def issue_token(email, state=None):
+    # `state`: JSON-serializable values a UI session restores on another worker.
+    return session_store.create(email, state)
+
+
+def check_token(token):
+    # Returns the email for a live token and extends its lifetime.
+    record = session_store.load(token)
+    return record["email"] if record else None
+
+
+def revoke_token(token):
+    session_store.revoke(token)
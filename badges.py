@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+import reference
+import storage
+
+# Achievement badges. Rules are data (the "badges" list in
+# data/reference.json): each names the user_stats fields it needs and the
+# minimum value of each. Rules are indexed by those fields, and a save event
+# only evaluates the not-yet-earned rules whose inputs the save changed.
+# When the rule set itself changes, each user gets one full evaluation.
+# Awarding runs as a storage save listener; entry points (app, API, bulk
+# scripts) call register() at startup.
+
+_compiled = {}
+
+
+def rules():
+    snapshot = reference.current()
+    if _compiled.get("version") != snapshot["version"]:
+        badge_rules = snapshot["badges"]
+        by_input = {}
+        for rule in badge_rules:
+            for field in rule["requires"]:
+                by_input.setdefault(field, []).append(rule)
+        digest = hashlib.sha1(json.dumps(badge_rules, sort_keys=True).encode("utf-8")).hexdigest()
+        _compiled.update(
+            version=snapshot["version"], rules=badge_rules, by_input=by_input,
+            by_id={rule["id"]: rule for rule in badge_rules}, hash=digest,
+        )
+    return _compiled
+
+
+def is_met(rule, stats):
+    return all(
+        stats.get(field) is not None and stats[field] >= minimum
+        for field, minimum in rule["requires"].items()
+    )
+
+
+def _award(conn, user_email, candidates, stats, compiled):
+    earned = {row[0] for row in conn.execute(
+        "SELECT badge FROM user_badges WHERE user_email = ?", (user_email,)
+    )}
+    new = [rule for rule in candidates if rule["id"] not in earned and is_met(rule, stats)]
+    now = storage._now()
+    conn.executemany(
+        "INSERT INTO user_badges (user_email, badge, earned) VALUES (?, ?, ?)",
+        [(user_email, rule["id"], now) for rule in new],
+    )
+    # Recounted, not incremented: badges of rules since removed drop out.
+    count = len((earned | {rule["id"] for rule in new}) & compiled["by_id"].keys())
+    conn.execute(
+        "INSERT INTO user_stats (user_email, badges, badge_rules) VALUES (?, ?, ?) "
+        "ON CONFLICT (user_email) DO UPDATE SET "
+        "badges = excluded.badges, badge_rules = excluded.badge_rules",
+        (user_email, count, compiled["hash"]),
+    )
+    return new
+
+
+def on_save(conn, user_email, event, stats, changed):
+    compiled = rules()
+    if stats.get("badge_rules") != compiled["hash"]:
+        candidates = compiled["rules"]
+    else:
+        candidates = {
+            rule["id"]: rule for field in changed for rule in compiled["by_input"].get(field, ())
+        }.values()
+        if not candidates:
+            return []
+    return _award(conn, user_email, candidates, stats, compiled)
+
+
+def register():
+    storage.add_save_listener(on_save)
+
+
+def sync(conn, user_email, stats):
+    # Full evaluation for users whose badges predate the current rule set.
+    compiled = rules()
+    if stats.get("badge_rules") == compiled["hash"]:
+        return []
+    with conn:
+        return _award(conn, user_email, compiled["rules"], stats, compiled)
+
+
+def earned_badges(conn, user_email):
+    # (rule, earned timestamp) pairs, newest first; rules since removed are skipped.
+    by_id = rules()["by_id"]
+    rows = conn.execute(
+        "SELECT badge, earned FROM user_badges WHERE user_email = ? ORDER BY earned DESC, badge",
+        (user_email,),
+    ).fetchall()
+    return [(by_id[row["badge"]], row["earned"]) for row in rows if row["badge"] in by_id]
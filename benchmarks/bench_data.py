@@ -0,0 +1,129 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import analytics
+import badges
+import flavor_profiles
+import flavor_wheel
+import reference
+import scoring
+import similarity
+import storage
+import trends
+
+# Storage and analytics cost as one user's history grows. A single database
+# is grown to each size in turn; writes are timed while growing and the read
+# paths the pages use are timed at every size.
+#
+#     python benchmarks/bench_data.py [sizes...]      (default 1000 10000 100000)
+
+SIZES = (1_000, 10_000, 100_000)
+USER = "bench@coffee.com"
+SAMPLES, CUPS = 3, 5
+READ_REPEATS = 25
+ANALYTICS_REPEATS = 3
+
+
+def generate(rng, start, count):
+    origins = reference.get("origins")
+    for i in range(start, start + count):
+        sheet = scoring.new_sheet(SAMPLES, CUPS)
+        sheet[:, :, scoring.QUALITY] = rng.choice(np.arange(6, 10.25, 0.25), (SAMPLES, CUPS, len(scoring.QUALITY)))
+        samples = [
+            {"name": f"Lot {i}-{s}", "origin": origins[rng.integers(len(origins))], "process": "Washed",
+             "flavors": list(rng.choice(flavor_wheel.DESCRIPTORS, 3, replace=False)), **scores}
+            for s, scores in enumerate(scoring.sample_score_dicts(sheet))
+        ]
+        yield {
+            "name": f"Session {i}", "date": f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "samples": samples, "score_sheet": scoring.dumps(sheet), "cups_per_sample": CUPS,
+            "created": f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d} 09:00",
+        }
+
+
+def timed(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(times) * 1e3, "min_ms": min(times) * 1e3}
+
+
+def grow(conn, rng, current, target):
+    write_times = []
+    for session in generate(rng, current, target - current):
+        start = time.perf_counter()
+        storage.save_session(conn, USER, session)
+        write_times.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(write_times) * 1e3,
+        "min_ms": min(write_times) * 1e3,
+        "per_second": len(write_times) / sum(write_times),
+    }
+
+
+def reads(conn, size):
+    middle = conn.execute(
+        "SELECT date, id FROM cupping_sessions WHERE user_email = ? ORDER BY date DESC, id DESC LIMIT 1 OFFSET ?",
+        (USER, size // 2),
+    ).fetchone()
+    sample_id = conn.execute("SELECT id FROM samples ORDER BY id DESC LIMIT 1").fetchone()[0]
+    similarity.load_index(conn, USER)
+    frame = analytics.load_samples_frame(conn, USER)
+    profiles = flavor_profiles.load_usage(conn, USER)
+    return {
+        "first page": timed(lambda: storage.list_sessions(conn, USER), READ_REPEATS),
+        "middle page": timed(lambda: storage.list_sessions(conn, USER, cursor=tuple(middle)), READ_REPEATS),
+        "score sort": timed(lambda: storage.list_sessions(conn, USER, sort="score"), READ_REPEATS),
+        "origin filter": timed(lambda: storage.list_sessions(conn, USER, origin="Kenya"), READ_REPEATS),
+        "user stats": timed(lambda: storage.get_user_stats(conn, USER), READ_REPEATS),
+        "analytics summary": timed(lambda: analytics.summarize(conn, USER), ANALYTICS_REPEATS),
+        "similarity index": timed(
+            lambda: similarity.build_index([r for b in storage.iter_scored_samples(conn, USER) for r in b]),
+            ANALYTICS_REPEATS,
+        ),
+        "similar samples": timed(lambda: similarity.similar_to_sample(conn, USER, sample_id), READ_REPEATS),
+        "daily score trend": timed(lambda: trends.trend(frame, resolution="day"), READ_REPEATS),
+        "flavor categories": timed(lambda: analytics.flavor_categories(conn, USER), READ_REPEATS),
+        "closest flavor profiles": timed(
+            lambda: flavor_profiles.jaccard(profiles, profiles[0]).argsort()[-3:], READ_REPEATS),
+    }
+
+
+def measure(sizes=SIZES):
+    badges.register()  # saves award badges, as in the app
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = storage.get_connection()
+    rng = np.random.default_rng(0)
+    results = {}
+    current = 0
+    for size in sorted(sizes):
+        results[f"save session @{size}"] = grow(conn, rng, current, size)
+        current = size
+        for label, row in reads(conn, size).items():
+            results[f"{label} @{size}"] = row
+    return results
+
+
+def report(results):
+    print(f"{'operation':32s} {'median ms':>10s} {'min ms':>10s} {'per second':>11s}")
+    for label, row in results.items():
+        rate = f"{row['per_second']:11.0f}" if "per_second" in row else ""
+        print(f"{label:32s} {row['median_ms']:10.3f} {row['min_ms']:10.3f} {rate}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    report(measure(sizes))
+
+
+if __name__ == "__main__":
+    main()
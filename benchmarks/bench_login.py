@@ -0,0 +1,59 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["CUPPING_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+import auth
+import storage
+
+# Login latency for a shift-start burst: USERS accounts log in at random times
+# within WINDOW seconds, each on its own thread like Streamlit script threads.
+#
+#     python benchmarks/bench_login.py [users] [window_seconds]
+
+PASSWORD = "correct horse"
+
+
+def login(email, delay, latencies):
+    time.sleep(delay)
+    start = time.perf_counter()
+    user = auth.authenticate(storage.get_connection(), email, PASSWORD)
+    latencies.append(time.perf_counter() - start)
+    assert user is not None
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    window = float(sys.argv[2]) if len(sys.argv) > 2 else 60.0
+    conn = storage.get_connection()
+    emails = [f"staff{i}@coffee.com" for i in range(users)]
+    for email in emails:
+        storage.create_user(conn, email, {"name": email, "password_hash": auth._hash(PASSWORD)})
+
+    latencies = []
+    threads = [
+        threading.Thread(target=login, args=(email, random.uniform(0, window), latencies))
+        for email in emails
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    print(f"scrypt n={auth.SCRYPT_N} r={auth.SCRYPT_R} p={auth.SCRYPT_P}, "
+          f"{auth.HASH_WORKERS} hash workers, {users} logins over {window:g}s")
+    print(f"p50 {statistics.median(latencies) * 1e3:7.1f} ms")
+    print(f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e3:7.1f} ms")
+    print(f"max {latencies[-1] * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
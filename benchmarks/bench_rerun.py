@@ -0,0 +1,123 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+# Script rerun time per interaction, driven headlessly with AppTest.
+# AppTest replays every interaction as a full script run, so these numbers are
+# the upper bound; in a live server, widgets inside a fragment rerun only it.
+# Timing runs are untraced; one extra run under tracemalloc records the peak
+# Python memory allocated during each interaction.
+#
+#     python benchmarks/bench_rerun.py [repeats] [seed_sessions]
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app_complex.py")
+USER = "demo@coffee.com"
+
+
+def timed(label, results, action):
+    start = time.perf_counter()
+    action()
+    results.setdefault(label, []).append(time.perf_counter() - start)
+
+
+def traced(label, results, action):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    action()
+    results[label] = (tracemalloc.get_traced_memory()[1] - before) / 1024
+
+
+def select_view(at, view):
+    # Lazy views are picked with a segmented control; older layouts used tabs
+    # that rendered everything, so there is nothing to select.
+    controls = [c for c in at.segmented_control if c.key == "cupping_view"]
+    if controls:
+        controls[0].set_value(view).run()
+
+
+def session(results, record=timed):
+    at = AppTest.from_file(APP, default_timeout=120)
+    record("login page", results, at.run)
+
+    at.text_input(key="login_email").input(USER)
+    at.text_input(key="login_password").input("demo123")
+    record("login", results, at.button(key="login_btn").click().run)
+
+    navigation = at.radio(key="navigation")
+    for page in navigation.options:
+        record(f"open {page}", results, lambda: at.radio(key="navigation").set_value(page).run())
+
+    at.radio(key="navigation").set_value(navigation.options[1]).run()
+    name = [t for t in at.text_input if t.label == "Session Name"][0]
+    record("type session name", results, lambda: name.input("Benchmark").run())
+    create = [b for b in at.button if "Create" in b.label][0]
+    record("create session", results, create.click().run)
+
+    select_view(at, "my_sessions")
+    select_view(at, "flavor_wheel")
+    checkbox = [c for c in at.checkbox if c.key and c.key.startswith("flavor_")]
+    if checkbox:
+        record("tick flavor checkbox", results, lambda: checkbox[0].check().run())
+    else:
+        record("search flavor", results, lambda: at.text_input(key="flavor_search").input("jasmne").run())
+        record("select flavor", results, lambda: at.multiselect(key="flavor_selection").select("Jasmine").run())
+
+
+def seed(count):
+    # Gives the demo account some history so list pages and stats have data.
+    conn = storage.get_connection()
+    for i in range(count):
+        storage.save_session(conn, USER, {
+            "name": f"Seed {i}", "date": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "samples": [{"name": f"Lot {i}", "origin": "Kenya", "final_score": 80 + i % 10}],
+        })
+
+
+def measure(repeats=5, seed_sessions=200):
+    # The app runs in this process, so pointing storage at a scratch file is
+    # enough even if another benchmark imported it first.
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(seed_sessions)
+    times = {}
+    for _ in range(repeats):
+        session(times)
+    memory = {}
+    tracemalloc.start()
+    try:
+        session(memory, traced)
+    finally:
+        tracemalloc.stop()
+    return {
+        label: {
+            "median_ms": statistics.median(samples) * 1e3,
+            "min_ms": min(samples) * 1e3,
+            "peak_kib": memory.get(label),
+        }
+        for label, samples in times.items()
+    }
+
+
+def report(results):
+    print(f"{'interaction':36s} {'median ms':>10s} {'min ms':>10s} {'peak KiB':>10s}")
+    for label, row in results.items():
+        peak = "" if row["peak_kib"] is None else f"{row['peak_kib']:10.0f}"
+        print(f"{label:36s} {row['median_ms']:10.1f} {row['min_ms']:10.1f} {peak}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    seed_sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    report(measure(repeats, seed_sessions))
+
+
+if __name__ == "__main__":
+    main()
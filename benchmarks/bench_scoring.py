@@ -0,0 +1,27 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import scoring
+
+# Recompute cost of a full score sheet, i.e. what every slider change pays.
+
+SHAPES = [(3, 5), (8, 5), (64, 5)]
+NUMBER = 2000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for samples, cups in SHAPES:
+        sheet = scoring.new_sheet(samples, cups)
+        sheet[:, :, scoring.QUALITY] = rng.uniform(6, 10, (samples, cups, len(scoring.QUALITY)))
+        best = min(timeit.repeat(lambda: scoring.sample_scores(sheet), number=NUMBER, repeat=5)) / NUMBER
+        print(f"{samples:3d} samples x {cups} cups: {best * 1e6:8.2f} µs per recompute")
+
+
+if __name__ == "__main__":
+    main()
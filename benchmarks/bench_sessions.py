@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["CUPPING_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+import session_store
+
+# Cost per rerun of the shared login sessions: checking a token this worker
+# has cached, checking one it has never seen (as after a load balancer sends
+# the browser to another worker), and a state change queued for the
+# write-behind flush versus written straight to the backend.
+#
+#     python benchmarks/bench_sessions.py [sessions]
+
+STATE = {"user_data": {"name": "Staff", "email": "", "user_type": "registered"}, "language": "en"}
+
+
+def per_call(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tokens = [session_store.create(f"staff{i}@coffee.com", STATE) for i in range(sessions)]
+    results = {"cached check": per_call(session_store.load, tokens)}
+
+    session_store._cache.clear()
+    results["uncached check"] = per_call(session_store.load, tokens)
+
+    language = iter(range(10 ** 9))
+    results["state change (queued)"] = per_call(
+        lambda token: session_store.update(token, {"language": f"x{next(language)}"}), tokens)
+    start = time.perf_counter()
+    session_store.flush()
+    results["flush of queued changes"] = (time.perf_counter() - start) / len(tokens)
+
+    def write_through(token):
+        record = session_store.load(token)
+        session_store.backend().update({session_store.unsign(token): {**record, "state": {"language": "y"}}})
+    results["state change (written at once)"] = per_call(write_through, tokens)
+
+    print(f"{sessions} sessions, backend {type(session_store.backend()).__name__}")
+    for label, seconds in results.items():
+        print(f"{label:32s} {seconds * 1e6:9.1f} µs per session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold-start cost: every repeat is a fresh interpreter, as after a container
+# scales up from zero. Each one times importing Streamlit, the login page's
+# first paint (the app's own imports included), logging in, and the first
+# open of the Analytics page, which needs pandas and plotly. It also records
+# which heavy modules were already loaded at each step.
+#
+# Runs twice: with warm-up off, and with it on and a pause between first
+# paint and login, standing in for the user typing their password.
+#
+#     python benchmarks/bench_startup.py [repeats] [pause_seconds]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app_complex.py")
+HEAVY = ("numpy", "pandas", "pyarrow", "plotly.express")
+
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+import streamlit
+timings = {{"import streamlit": time.perf_counter() - start}}
+from streamlit.testing.v1 import AppTest
+
+def step(label, action):
+    start = time.perf_counter()
+    action()
+    timings[label] = time.perf_counter() - start
+    loaded[label] = [m for m in HEAVY if m in sys.modules]
+
+HEAVY, pause, loaded = {heavy!r}, {pause!r}, {{}}
+at = AppTest.from_file({app!r}, default_timeout=120)
+step("first paint", at.run)
+time.sleep(pause)
+at.text_input(key="login_email").input("demo@coffee.com")
+at.text_input(key="login_password").input("demo123")
+step("login", at.button(key="login_btn").click().run)
+navigation = at.radio(key="navigation")
+page = [p for p in navigation.options if "Analytics" in p][0]
+step("open Analytics", lambda: navigation.set_value(page).run())
+print(json.dumps({{"timings": timings, "loaded": loaded}}))
+"""
+
+
+def cold_start(warmup, pause):
+    env = {
+        **os.environ,
+        "CUPPING_WARMUP": "1" if warmup else "0",
+        "CUPPING_DB_PATH": os.path.join(tempfile.mkdtemp(), "bench.db"),
+    }
+    code = CHILD.format(heavy=HEAVY, pause=pause if warmup else 0.0, app=APP)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True,
+                         text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(repeats=3, pause=2.0):
+    results = {}
+    for warmup in (False, True):
+        mode = "warm-up" if warmup else "no warm-up"
+        runs = [cold_start(warmup, pause) for _ in range(repeats)]
+        for label in runs[0]["timings"]:
+            samples = [run["timings"][label] for run in runs]
+            results[f"{label} ({mode})"] = {
+                "median_ms": statistics.median(samples) * 1e3,
+                "min_ms": min(samples) * 1e3,
+                "loaded": runs[-1]["loaded"].get(label, []),
+            }
+    return results
+
+
+def report(results):
+    print(f"{'step':34s} {'median ms':>10s} {'min ms':>10s}  heavy modules loaded after")
+    for label, row in results.items():
+        print(f"{label:34s} {row['median_ms']:10.1f} {row['min_ms']:10.1f}  {', '.join(row.get('loaded', []))}")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    pause = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    report(measure(repeats, pause))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translations
+
+# Per-rerun translation overhead: the old get_text rebuilt a dict literal of
+# every language on each call; the catalog does one lookup on a frozen dict.
+
+CALLS_PER_RERUN = 40
+RERUNS = 2000
+KEYS = [key for key in translations.RAW_CATALOGS["en"] if key != "language_name"]
+
+# Recreate the original inline literal so the "before" cost is the real one.
+_legacy_source = "def legacy_get_text(language, key):\n    translations = {%s}\n    return translations.get(language, {}).get(key, key)\n" % ", ".join(
+    "%r: {%s}" % (language, ", ".join("%r: %r" % (k, translations.RAW_CATALOGS[language][k]) for k in KEYS))
+    for language in ("en", "es")
+)
+exec(_legacy_source)
+
+
+def rerun_legacy():
+    for i in range(CALLS_PER_RERUN):
+        legacy_get_text("es", KEYS[i % len(KEYS)])
+
+
+def rerun_catalog():
+    for i in range(CALLS_PER_RERUN):
+        translations.get_text("es", KEYS[i % len(KEYS)])
+
+
+def main():
+    results = {}
+    for name, func in (("before (dict rebuilt per call)", rerun_legacy), ("after (frozen catalog)", rerun_catalog)):
+        best = min(timeit.repeat(func, number=RERUNS, repeat=5)) / RERUNS
+        results[name] = best
+        print(f"{name:34s} {best * 1e6:8.2f} µs per rerun ({CALLS_PER_RERUN} lookups)")
+    before, after = results.values()
+    print(f"{'speedup':34s} {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
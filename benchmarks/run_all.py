@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_data
+import bench_rerun
+import bench_startup
+
+# Runs the rerun, data-layer and cold-start benchmarks, writes the numbers to a JSON file
+# and, given a baseline from an earlier run, fails if any median got slower
+# than the tolerance allows. Meant to be run before every deploy:
+#
+#     python benchmarks/run_all.py --output after.json --baseline before.json
+
+# Differences below this are timer noise, whatever the ratio.
+NOISE_MS = 0.05
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for group, rows in results.items():
+        for label, row in rows.items():
+            old = baseline.get(group, {}).get(label)
+            if old is None:
+                continue
+            new_ms, old_ms = row["median_ms"], old["median_ms"]
+            if new_ms > old_ms * (1 + tolerance) and new_ms - old_ms > NOISE_MS:
+                regressions.append((group, label, old_ms, new_ms))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run all benchmarks and check for regressions.")
+    parser.add_argument("--quick", action="store_true", help="1k/10k sessions, 2 rerun repeats, 1 cold start")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = bench_data.SIZES[:2] if args.quick else bench_data.SIZES
+    results = {
+        "rerun": bench_rerun.measure(repeats=2 if args.quick else 5),
+        "data": bench_data.measure(sizes),
+        "startup": bench_startup.measure(repeats=1 if args.quick else 3),
+    }
+    bench_rerun.report(results["rerun"])
+    print()
+    bench_data.report(results["data"])
+    print()
+    bench_startup.report(results["startup"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        print()
+        if not regressions:
+            print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+            return 0
+        print(f"{'regression':44s} {'before ms':>10s} {'after ms':>10s}")
+        for group, label, old_ms, new_ms in regressions:
+            print(f"{group + ': ' + label:44s} {old_ms:10.3f} {new_ms:10.3f}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import secrets
+import sqlite3
+from datetime import datetime
+
+import running_stats
+import scoring
+
+# Shared calibration tables: many cuppers score the same samples at once.
+# Each (session, cupper, sample) score is its own row guarded by a version
+# number (optimistic concurrency), and per-sample panel statistics are kept
+# as running (count, mean, m2) aggregates updated in the same transaction,
+# so the live view only reads aggregates that changed since its last poll.
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+# Std-dev (points) at which panel agreement is considered zero.
+AGREEMENT_TOLERANCE = 2.0
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def create_session(conn, owner_email, name, num_samples, cups_per_sample):
+    while True:
+        code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO calibration_sessions "
+                    "(code, owner_email, name, num_samples, cups_per_sample, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (code, owner_email, name, num_samples, cups_per_sample, _now()),
+                )
+            return code
+        except sqlite3.IntegrityError:
+            continue
+
+
+def get_session(conn, code):
+    row = conn.execute("SELECT * FROM calibration_sessions WHERE code = ?", (code,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_submission(conn, session_id, cupper_email, sample):
+    # Returns (sheet, version); version 0 means nothing submitted yet.
+    row = conn.execute(
+        "SELECT sheet, version FROM calibration_scores "
+        "WHERE session_id = ? AND cupper_email = ? AND sample = ?",
+        (session_id, cupper_email, sample),
+    ).fetchone()
+    if row is None:
+        return None, 0
+    return scoring.loads(row["sheet"]), row["version"]
+
+
+def submit_score(conn, session_id, cupper_email, sample, sheet, expected_version):
+    # `sheet` is one sample's (cups, attributes) grid. Returns the new version,
+    # or None if the row changed since `expected_version` was read.
+    final_score = float(scoring.sample_scores(sheet[None])[0, -1])
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT final_score, version FROM calibration_scores "
+            "WHERE session_id = ? AND cupper_email = ? AND sample = ?",
+            (session_id, cupper_email, sample),
+        ).fetchone()
+        current_version = row["version"] if row else 0
+        if current_version != expected_version:
+            conn.rollback()
+            return None
+
+        aggregate = conn.execute(
+            "SELECT count, mean, m2 FROM calibration_aggregates WHERE session_id = ? AND sample = ?",
+            (session_id, sample),
+        ).fetchone()
+        state = tuple(aggregate) if aggregate else running_stats.EMPTY
+        if row is None:
+            state = running_stats.add(state, final_score)
+        else:
+            state = running_stats.replace(state, row["final_score"], final_score)
+
+        conn.execute(
+            "UPDATE calibration_sessions SET change_seq = change_seq + 1 WHERE id = ?", (session_id,)
+        )
+        seq = conn.execute(
+            "SELECT change_seq FROM calibration_sessions WHERE id = ?", (session_id,)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO calibration_scores "
+            "(session_id, cupper_email, sample, sheet, final_score, version, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (session_id, cupper_email, sample) DO UPDATE SET "
+            "sheet = excluded.sheet, final_score = excluded.final_score, "
+            "version = excluded.version, updated = excluded.updated",
+            (session_id, cupper_email, sample, scoring.dumps(sheet), final_score,
+             current_version + 1, _now()),
+        )
+        conn.execute(
+            "INSERT INTO calibration_aggregates (session_id, sample, count, mean, m2, seq) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (session_id, sample) DO UPDATE SET "
+            "count = excluded.count, mean = excluded.mean, m2 = excluded.m2, seq = excluded.seq",
+            (session_id, sample, *state, seq),
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return current_version + 1
+
+
+def changes_since(conn, session_id, seq=0):
+    rows = conn.execute(
+        "SELECT sample, count, mean, m2, seq FROM calibration_aggregates "
+        "WHERE session_id = ? AND seq > ? ORDER BY seq",
+        (session_id, seq),
+    ).fetchall()
+    changes = []
+    for row in rows:
+        state = (row["count"], row["mean"], row["m2"])
+        std = running_stats.std(state)
+        changes.append({
+            "sample": row["sample"],
+            "cuppers": row["count"],
+            "mean": row["mean"],
+            "std": std,
+            "agreement": max(0.0, 1.0 - std / AGREEMENT_TOLERANCE),
+            "seq": row["seq"],
+        })
+    return changes
@@ -0,0 +1,208 @@
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+import scoring
+import storage
+
+# Exports of sessions, per-cup scores and reviews as Parquet, CSV or NDJSON.
+# Rows are pulled from storage in keyset-paginated batches and each batch is
+# encoded and yielded on its own. The command line writes the chunks as they
+# come, so memory stays flat however large the history. The UI download is
+# not streamed: st.download_button reads the whole file into memory before
+# serving it.
+
+BATCH_SIZE = 500
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# Fixed column types per dataset, so every batch encodes to the same schema.
+SAMPLE_TEXT = ("name", "origin", "process", "lot_id", "variety")
+DATASETS = {
+    "sessions": {
+        "session_id": "int64", "session_name": "string", "date": "string", "type": "string",
+        "is_blind": "bool", "cups_per_sample": "int64", "created": "string", "sample": "int64",
+        **{c: "string" for c in SAMPLE_TEXT},
+        "altitude": "float64", "moisture": "float64",
+        **{c: "float64" for c in storage.SCORE_COLUMNS},
+    },
+    "cup_scores": {
+        "session_id": "int64", "sample": "int64", "cup": "int64",
+        **{a: "float64" for a in scoring.ATTRIBUTES},
+    },
+    "reviews": {
+        "id": "int64", "name": "string", "producer": "string", "origin": "string",
+        "cost": "float64", "roast_level": "string", "form": "string", "preparation": "string",
+        "rating": "int64", "flavor_notes": "string", "recommend": "string",
+        "buy_again": "string", "date": "string", "created": "string",
+    },
+}
+
+
+def _session_frames(conn, user_email, batch_size):
+    for batch in storage.iter_sessions(conn, user_email, batch_size):
+        records = [
+            {
+                "session_id": session["id"], "session_name": session["name"],
+                "date": session["date"], "type": session["type"],
+                "is_blind": bool(session["is_blind"]), "cups_per_sample": session["cups_per_sample"],
+                "created": session["created"], "sample": position, **sample,
+            }
+            for session in batch
+            for position, sample in enumerate(session["samples"])
+        ]
+        yield pd.DataFrame.from_records(records, columns=list(DATASETS["sessions"]))
+
+
+def _cup_score_frames(conn, user_email, batch_size):
+    for rows in storage.iter_score_sheets(conn, user_email, batch_size):
+        frames = []
+        for session_id, blob in rows:
+            sheet = scoring.loads(blob)
+            samples, cups, _ = sheet.shape
+            sample_index, cup_index = np.indices((samples, cups)).reshape(2, -1)
+            frame = pd.DataFrame(sheet.reshape(samples * cups, -1), columns=list(scoring.ATTRIBUTES))
+            frame.insert(0, "cup", cup_index)
+            frame.insert(0, "sample", sample_index)
+            frame.insert(0, "session_id", session_id)
+            frames.append(frame)
+        if frames:
+            yield pd.concat(frames, ignore_index=True)
+
+
+def _review_frames(conn, user_email, batch_size):
+    for batch in storage.iter_reviews(conn, user_email, batch_size):
+        yield pd.DataFrame.from_records(batch, columns=list(DATASETS["reviews"]))
+
+
+FRAME_SOURCES = {
+    "sessions": _session_frames,
+    "cup_scores": _cup_score_frames,
+    "reviews": _review_frames,
+}
+
+
+def iter_frames(conn, user_email, dataset, batch_size=BATCH_SIZE):
+    dtypes = DATASETS[dataset]
+    for frame in FRAME_SOURCES[dataset](conn, user_email, batch_size):
+        yield frame.astype(dtypes)
+
+
+def _csv_chunks(frames, dataset):
+    # Header first, so an empty history still exports a valid CSV.
+    yield (",".join(DATASETS[dataset]) + "\n").encode("utf-8")
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _ndjson_chunks(frames):
+    for frame in frames:
+        if not frame.empty:
+            yield (frame.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only sink that hands back whatever pyarrow wrote since the last drain.
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _parquet_chunks(frames, dataset):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(
+        pd.DataFrame({c: pd.Series(dtype=t) for c, t in DATASETS[dataset].items()}),
+        preserve_index=False,
+    )
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream(conn, user_email, dataset, fmt, batch_size=BATCH_SIZE):
+    frames = iter_frames(conn, user_email, dataset, batch_size)
+    if fmt == "parquet":
+        return _parquet_chunks(frames, dataset)
+    if fmt == "csv":
+        return _csv_chunks(frames, dataset)
+    if fmt == "ndjson":
+        return _ndjson_chunks(frames)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+class ChunkReader(io.RawIOBase):
+    # File-like view over a chunk generator, for APIs that want .read().
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            try:
+                self.buffer = next(self.chunks)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def open_export(user_email, dataset, fmt, path=None):
+    # Opens its own connection: download callables run off the script thread.
+    return io.BufferedReader(ChunkReader(stream(storage.get_connection(path), user_email, dataset, fmt)))
+
+
+def file_name(dataset, fmt):
+    return f"{dataset}.{FORMATS[fmt][1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export cupping data for one user.")
+    parser.add_argument("user_email")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--db", default=None, help="SQLite file (defaults to CUPPING_DB_PATH)")
+    parser.add_argument("--output", default="-", help="output file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in stream(storage.get_connection(args.db), args.user_email, args.dataset, args.format):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Plotly figures as the app sends them. prepare() turns a built figure into
+# its final JSON document once:
+#   - scatter/line traces with more than GL_THRESHOLD points become scattergl,
+#     drawn with WebGL instead of one SVG node per marker;
+#   - the template (Streamlit's, whose placeholder colors the browser swaps
+#     for the active theme) keeps only the entries for trace types and color
+#     scales the figure uses.
+# The app caches the result per (query, data version, language, theme) and
+# st.plotly_chart gets it as a PreparedFigure, so a rerun no longer rebuilds,
+# validates or deep-copies figures: it only JSON-encodes the stored document.
+
+GL_THRESHOLD = 1000
+
+# Colors the app sets itself, per Streamlit theme type.
+THEMES = {
+    "light": {"target": "#C0392B"},
+    "dark": {"target": "#FF8A80"},
+}
+
+
+class PreparedFigure(go.Figure):
+    # st.plotly_chart only asks a figure for to_dict(); this one returns the
+    # stored document as is. Shared between sessions: treat it as read-only.
+    def __init__(self, spec):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return self._spec
+
+
+def theme_type(context_theme):
+    # st.context.theme.type is None until the browser has reported it.
+    return context_theme if context_theme in THEMES else "light"
+
+
+def _points(trace):
+    values = trace.x if trace.x is not None else trace.y
+    return 0 if values is None else len(values)
+
+
+def _strip_template(spec):
+    template = spec.get("layout", {}).get("template")
+    if not template:
+        return
+    types = {trace.get("type", "scatter") for trace in spec["data"]}
+    template["data"] = {t: entry for t, entry in template.get("data", {}).items() if t in types}
+    data = json.dumps(spec["data"])
+    if "coloraxis" not in spec["layout"] and "colorscale" not in data and "coloraxis" not in data:
+        for key in ("coloraxis", "colorscale"):
+            template.get("layout", {}).pop(key, None)
+
+
+def prepare(fig, gl_threshold=GL_THRESHOLD):
+    # Round-trip through JSON: the stored document holds only plain values
+    # (numbers as base64 arrays, dates as strings), so encoding it is cheap.
+    spec = json.loads(pio.to_json(fig, validate=False))
+    for trace, data in zip(fig.data, spec["data"]):
+        if trace.type == "scatter" and _points(trace) > gl_threshold:
+            data["type"] = "scattergl"
+    _strip_template(spec)
+    return PreparedFigure(spec)
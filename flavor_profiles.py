@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+
+import flavor_wheel
+import storage
+
+# Flavor profiles as fixed-width bitsets: WIDTH bits, stored as WORDS uint64
+# words (16 bytes in the database). Bit i stands for descriptor i of
+# data/flavor_bits.json. That list is append-only: a bitset saved today keeps
+# its meaning when the wheel gains, reorders or drops descriptors. A batch of
+# profiles is an (n, WORDS) array, so Jaccard similarity and category
+# roll-ups are a few array operations over thousands of profiles, with no
+# descriptor strings involved.
+
+BITS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "flavor_bits.json")
+WIDTH = 128
+WORDS = WIDTH // 64
+
+
+def load_order(path=BITS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return tuple(json.load(f)["bits"])
+
+
+def build_tables(order):
+    if len(order) > WIDTH:
+        raise ValueError(f"flavor_bits.json lists {len(order)} descriptors; profiles hold {WIDTH}")
+    if len(set(order)) != len(order):
+        raise ValueError("flavor_bits.json lists a descriptor twice")
+    bits = {descriptor: i for i, descriptor in enumerate(order)}
+    missing = [d for d in flavor_wheel.DESCRIPTORS if d not in bits]
+    if missing:
+        raise ValueError(f"Descriptors without a bit (append them to flavor_bits.json): {', '.join(missing)}")
+    # One mask per category; a descriptor sitting in two categories is in both.
+    members = [
+        [bits[d] for subcategory in flavor_wheel.children(category)
+         for d in flavor_wheel.children(category, subcategory)]
+        for category in flavor_wheel.CATEGORIES
+    ]
+    masks = _pack([(c, bit) for c, category_bits in enumerate(members) for bit in category_bits], len(members))
+    return {"order": order, "bits": bits, "categories": flavor_wheel.CATEGORIES,
+            "membership": _unpack(masks).astype(np.int64)}
+
+
+_tables = (None, None, None)
+
+
+def tables():
+    # Rebuilt, with the bit order re-read, when flavor_wheel.reload() swaps in
+    # a new wheel or flavor_bits.json changes. A failed build isn't kept, so
+    # fixing either file is picked up on the next call.
+    global _tables
+    index, stamp, built = _tables
+    current_index, current_stamp = flavor_wheel.INDEX, os.stat(BITS_PATH).st_mtime_ns
+    if index is not current_index or stamp != current_stamp:
+        built = build_tables(load_order(BITS_PATH))
+        _tables = (current_index, current_stamp, built)
+    return built
+
+
+def _pack(cells, count):
+    # (row, bit) pairs -> (count, WORDS) uint64 array.
+    flat = np.zeros((count, WIDTH), dtype=np.uint8)
+    if cells:
+        rows, positions = zip(*cells)
+        flat[list(rows), list(positions)] = 1
+    return np.packbits(flat, axis=1, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def encode_many(flavor_lists):
+    # (n, WORDS) uint64 array; descriptors must be on the wheel.
+    bits = tables()["bits"]
+    return _pack([(row, bits[f]) for row, flavors in enumerate(flavor_lists) for f in flavors], len(flavor_lists))
+
+
+def encode(flavors):
+    return encode_many([flavors])[0]
+
+
+def _unpack(profiles):
+    # (n, WIDTH) 0/1 uint8, bit i in column i.
+    return np.unpackbits(np.ascontiguousarray(profiles, dtype="<u8").view(np.uint8), axis=-1, bitorder="little")
+
+
+def decode(profile):
+    order = tables()["order"]
+    return [order[i] for i in np.flatnonzero(_unpack(profile))]
+
+
+def to_bytes(profile):
+    return np.asarray(profile, dtype="<u8").tobytes()
+
+
+def from_bytes(blobs):
+    if not blobs:
+        return np.zeros((0, WORDS), dtype=np.uint64)
+    return np.frombuffer(b"".join(blobs), dtype="<u8").reshape(-1, WORDS).astype(np.uint64)
+
+
+def popcount(profiles):
+    return np.bitwise_count(profiles).sum(axis=-1, dtype=np.int64)
+
+
+def jaccard(profiles, query):
+    # |a & b| / |a | b| of every profile against one query; 0 when both are empty.
+    common = popcount(profiles & query)
+    union = popcount(profiles | query)
+    return np.divide(common, union, out=np.zeros(len(profiles)), where=union > 0)
+
+
+def bit_counts(profiles):
+    # How many profiles use each bit, as a WIDTH-long array.
+    return _unpack(profiles).sum(axis=0, dtype=np.int64)
+
+
+def category_counts(profiles):
+    # {category: descriptor mentions}, in wheel order.
+    built = tables()
+    mentions = built["membership"] @ bit_counts(profiles)
+    return dict(zip(built["categories"], mentions.tolist()))
+
+
+def backfill(conn, user_email):
+    # Samples saved before flavor bits existed are encoded on first load;
+    # descriptors no longer on the wheel are skipped.
+    rows = storage.samples_missing_flavor_bits(conn, user_email)
+    if not rows:
+        return
+    bits = tables()["bits"]
+    flavor_lists = json.loads("[" + ",".join(row[1] for row in rows) + "]")
+    profiles = encode_many([[f for f in flavors if f in bits] for flavors in flavor_lists])
+    storage.set_flavor_bits(conn, [(to_bytes(profile), row[0]) for profile, row in zip(profiles, rows)])
+
+
+def load_usage(conn, user_email):
+    # Every flavor bitset of the user: sample flavor notes and saved profiles.
+    backfill(conn, user_email)
+    return from_bytes(storage.flavor_bits(conn, user_email))
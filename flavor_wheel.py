@@ -0,0 +1,143 @@
+import bisect
+import json
+import os
+from collections import defaultdict
+from types import MappingProxyType
+
+# SCA flavor wheel, loaded once at import from data/flavor_wheel.json into
+# frozen lookup tables: parent/child links, synonyms, a sorted word-prefix
+# index and a trigram index for fuzzy matching.
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "flavor_wheel.json")
+FUZZY_THRESHOLD = 0.3
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def trigrams(text):
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_wheel(path=WHEEL_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(wheel):
+    descriptors = []
+    parents = defaultdict(list)
+    children = defaultdict(list)
+    icons = {}
+    for category in wheel["categories"]:
+        icons[category["name"]] = category["icon"]
+        for subcategory in category["subcategories"]:
+            children[category["name"]].append(subcategory["name"])
+            for descriptor in subcategory["descriptors"]:
+                if descriptor not in parents:
+                    descriptors.append(descriptor)
+                parents[descriptor].append((category["name"], subcategory["name"]))
+                children[(category["name"], subcategory["name"])].append(descriptor)
+
+    # Every searchable term (descriptor names and synonyms) points at a descriptor.
+    terms = {normalize(d): d for d in descriptors}
+    for synonym, descriptor in wheel.get("synonyms", {}).items():
+        if descriptor not in parents:
+            raise ValueError(f"Synonym {synonym!r} points at unknown descriptor {descriptor!r}")
+        terms.setdefault(normalize(synonym), descriptor)
+
+    # Prefix index over each word of each term, so "choc" finds "Dark Chocolate".
+    prefix_index = sorted(
+        (word, term) for term in terms for word in {term, *term.split()}
+    )
+
+    term_trigrams = {term: trigrams(term) for term in terms}
+    trigram_index = defaultdict(list)
+    for term, grams in term_trigrams.items():
+        for gram in grams:
+            trigram_index[gram].append(term)
+
+    return {
+        "descriptors": tuple(descriptors),
+        "parents": MappingProxyType({d: tuple(p) for d, p in parents.items()}),
+        "children": MappingProxyType({k: tuple(v) for k, v in children.items()}),
+        "icons": MappingProxyType(icons),
+        "terms": MappingProxyType(terms),
+        "prefix_words": tuple(word for word, _ in prefix_index),
+        "prefix_terms": tuple(term for _, term in prefix_index),
+        "term_trigrams": MappingProxyType(term_trigrams),
+        "trigram_index": MappingProxyType({g: tuple(t) for g, t in trigram_index.items()}),
+    }
+
+
+def reload(path=WHEEL_PATH):
+    # Builds the new index first, then swaps it in; lookups never see a
+    # half-built wheel.
+    global WHEEL, INDEX, DESCRIPTORS, CATEGORIES
+    wheel = load_wheel(path)
+    index = build_index(wheel)
+    WHEEL, INDEX, DESCRIPTORS, CATEGORIES = wheel, index, index["descriptors"], tuple(index["icons"])
+
+
+reload()
+
+
+def category_label(category):
+    return f"{INDEX['icons'][category]} {category}"
+
+
+def parents(descriptor):
+    # (category, subcategory) pairs; a few descriptors sit in two places.
+    return INDEX["parents"].get(descriptor, ())
+
+
+def children(category, subcategory=None):
+    key = category if subcategory is None else (category, subcategory)
+    return INDEX["children"].get(key, ())
+
+
+def resolve(term):
+    return INDEX["terms"].get(normalize(term))
+
+
+def _prefix_matches(query):
+    words, terms = INDEX["prefix_words"], INDEX["prefix_terms"]
+    start = bisect.bisect_left(words, query)
+    end = bisect.bisect_left(words, query + "\uffff", lo=start)
+    # Whole-term prefixes ("choc" -> "chocolate") before inner-word ones.
+    matched = sorted({terms[i] for i in range(start, end)},
+                     key=lambda term: (not term.startswith(query), len(term), term))
+    return [INDEX["terms"][term] for term in matched]
+
+
+def _fuzzy_matches(query):
+    grams = trigrams(query)
+    shared = defaultdict(int)
+    for gram in grams:
+        for term in INDEX["trigram_index"].get(gram, ()):
+            shared[term] += 1
+    scored = []
+    for term, common in shared.items():
+        similarity = common / (len(grams) + len(INDEX["term_trigrams"][term]) - common)
+        if similarity >= FUZZY_THRESHOLD:
+            scored.append((-similarity, term))
+    return [INDEX["terms"][term] for _, term in sorted(scored)]
+
+
+def search(query, limit=10):
+    # Exact name/synonym first, then word-prefix matches, then fuzzy matches.
+    query = normalize(query)
+    if not query:
+        return []
+    results = []
+    exact = INDEX["terms"].get(query)
+    if exact:
+        results.append(exact)
+    for match in _prefix_matches(query) + _fuzzy_matches(query):
+        if match not in results:
+            results.append(match)
+        if len(results) >= limit:
+            break
+    return results[:limit]
@@ -0,0 +1,141 @@
+import os
+from itertools import islice
+
+import pandas as pd
+
+import reference
+
+# Bulk import of green-coffee lots from CSV/XLSX offer sheets. Files are read
+# in chunks and each chunk is validated with vectorized column checks; bad
+# rows are reported with their line number instead of aborting the import,
+# and blank rows are skipped. Nothing holds the whole file: check_lots() is a
+# validation pass that keeps only the rejected rows, and iter_samples() feeds
+# valid lots to the writer one chunk at a time.
+
+CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ("lot_id", "origin")
+OPTIONAL_COLUMNS = ("name", "process", "variety", "altitude", "moisture")
+COLUMNS = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+COLUMN_ALIASES = {
+    "lot": "lot_id",
+    "lot_number": "lot_id",
+    "lot_no": "lot_id",
+    "country": "origin",
+    "sample": "name",
+    "sample_name": "name",
+    "processing": "process",
+    "varietal": "variety",
+    "altitude_m": "altitude",
+    "elevation": "altitude",
+    "moisture_%": "moisture",
+    "moisture_content": "moisture",
+}
+ALTITUDE_RANGE = (0, 3500)
+MOISTURE_RANGE = (0, 20)
+
+
+def read_chunks(file, filename, chunk_size=CHUNK_SIZE):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".csv":
+        # Blank lines are kept (and skipped later) so line numbers stay exact.
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                                 skip_blank_lines=False):
+            yield chunk.fillna("")
+    elif ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = ["" if h is None else str(h) for h in next(rows, ())]
+            while chunk := list(islice(rows, chunk_size)):
+                frame = pd.DataFrame(chunk, columns=header, dtype=object)
+                yield frame.where(frame.notna(), "").astype(str)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Unsupported file type: {ext or filename}")
+
+
+def normalize_columns(df):
+    names = df.columns.str.strip().str.lower().str.replace(r"[\s\-]+", "_", regex=True)
+    fields = [COLUMN_ALIASES.get(n, n) for n in names]
+    for field in COLUMNS:
+        sources = [str(header) for header, f in zip(df.columns, fields) if f == field]
+        if len(sources) > 1:
+            raise ValueError(f"Columns {' and '.join(map(repr, sources))} both give {field}; keep one")
+    df = df.set_axis(fields, axis=1)
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    for column in OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+    return df[list(COLUMNS)].apply(lambda column: column.str.strip())
+
+
+def validate_chunk(df, first_line, seen_lots):
+    # `first_line` is the file line number of the chunk's first data row.
+    df = normalize_columns(df).reset_index(drop=True)
+    df = df[(df != "").any(axis=1)]  # blank rows; the index keeps line numbers
+    df["process"] = df["process"].str.title()
+    altitude = pd.to_numeric(df["altitude"].str.replace(r"\s*(m|masl)$", "", regex=True), errors="coerce")
+    moisture = pd.to_numeric(df["moisture"].str.rstrip("% "), errors="coerce")
+
+    checks = [
+        (df["lot_id"] == "", "missing lot ID"),
+        (df["origin"] == "", "missing origin"),
+        ((df["process"] != "") & ~df["process"].isin(reference.get("processes")), "unknown process"),
+        ((df["altitude"] != "") & ~altitude.between(*ALTITUDE_RANGE),
+         f"altitude must be {ALTITUDE_RANGE[0]}-{ALTITUDE_RANGE[1]} m"),
+        ((df["moisture"] != "") & ~moisture.between(*MOISTURE_RANGE),
+         f"moisture must be {MOISTURE_RANGE[0]}-{MOISTURE_RANGE[1]} %"),
+        ((df["lot_id"] != "") & (df["lot_id"].duplicated() | df["lot_id"].isin(seen_lots)),
+         "duplicate lot ID"),
+    ]
+    errors = pd.Series("", index=df.index)
+    for mask, message in checks:
+        errors = errors.mask(mask, errors + message + "; ")
+    bad = errors != ""
+
+    valid = df[~bad].assign(altitude=altitude[~bad], moisture=moisture[~bad])
+    valid["name"] = valid["name"].mask(valid["name"] == "", valid["lot_id"])
+    seen_lots.update(valid["lot_id"])
+    rejected = pd.DataFrame({
+        "line": df.index[bad] + first_line,
+        "lot_id": df.loc[bad, "lot_id"],
+        "error": errors[bad].str.rstrip("; "),
+    })
+    return valid, rejected
+
+
+def iter_import(file, filename, chunk_size=CHUNK_SIZE):
+    # Yields (valid, rejected) frames per chunk.
+    seen_lots = set()
+    first_line = 2  # line 1 is the header
+    for chunk in read_chunks(file, filename, chunk_size):
+        yield validate_chunk(chunk, first_line, seen_lots)
+        first_line += len(chunk)
+
+
+def check_lots(file, filename, chunk_size=CHUNK_SIZE):
+    # Validation pass: (number of valid lots, rejected rows).
+    valid, rejected = 0, []
+    for chunk_valid, chunk_rejected in iter_import(file, filename, chunk_size):
+        valid += len(chunk_valid)
+        if not chunk_rejected.empty:
+            rejected.append(chunk_rejected)
+    rejected = pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame(columns=["line", "lot_id", "error"])
+    return valid, rejected
+
+
+def iter_samples(file, filename, chunk_size=CHUNK_SIZE):
+    # Valid lots as sample dicts, one list per chunk.
+    for valid, _ in iter_import(file, filename, chunk_size):
+        if not valid.empty:
+            yield to_samples(valid)
+
+
+def to_samples(valid):
+    records = valid.astype(object).where(valid.notna(), None).to_dict("records")
+    return [{k: (v if v != "" else None) for k, v in record.items()} for record in records]
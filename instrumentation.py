@@ -0,0 +1,150 @@
+import functools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Opt-in rerun profiling. Enabled for every session with CUPPING_PROFILE=1, or
+# for one browser tab with ?profile=1. Each script run becomes a trace whose
+# spans are the traced page functions and data operations, with wall time and
+# the net number of memory blocks each allocated. Traces are appended to
+# CUPPING_TRACE_FILE as OTLP/JSON lines (what the OpenTelemetry collector's
+# file receiver reads), and the sidebar shows the slowest sections of the last
+# full rerun. When profiling is off, every traced call costs one attribute lookup.
+
+ENV_ENABLED = os.environ.get("CUPPING_PROFILE", "") not in ("", "0")
+TRACE_FILE = os.environ.get("CUPPING_TRACE_FILE", "traces.jsonl")
+SERVICE_NAME = "coffee-cupping"
+PANEL_ROWS = 10
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def enabled():
+    return ENV_ENABLED or st.query_params.get("profile") == "1"
+
+
+def _active():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name):
+    trace = _active()
+    if trace is None:
+        yield
+        return
+    span_id = secrets.token_hex(8)
+    parent = trace["stack"][-1] if trace["stack"] else None
+    trace["stack"].append(span_id)
+    start_ns, blocks = time.time_ns(), sys.getallocatedblocks()
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter_ns() - start
+        trace["stack"].pop()
+        trace["spans"].append({
+            "name": name, "span_id": span_id, "parent": parent, "start_ns": start_ns,
+            "duration_ns": duration, "blocks": sys.getallocatedblocks() - blocks,
+        })
+
+
+@contextmanager
+def trace(name, panel=False):
+    # Root of one script run. Nested calls (a fragment inside a full rerun)
+    # just add a span.
+    if _active() is not None or not enabled():
+        with span(name):
+            yield
+        return
+    _local.trace = {"trace_id": secrets.token_hex(16), "spans": [], "stack": []}
+    completed = False
+    try:
+        with span(name):
+            yield
+        completed = True
+    finally:
+        finished, _local.trace = _local.trace, None
+        export(finished)
+        # st.rerun()/st.stop() end the run early; the next run shows the panel.
+        if panel and completed:
+            show_panel(finished)
+
+
+def traced(function=None, *, fragment=False):
+    # Fragment functions start their own trace when they rerun on their own.
+    def decorator(function):
+        name = function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active() is None:
+                if not fragment:
+                    return function(*args, **kwargs)
+                with trace(name):
+                    return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator(function) if function is not None else decorator
+
+
+def _otlp(trace):
+    spans = [
+        {
+            "traceId": trace["trace_id"],
+            "spanId": s["span_id"],
+            **({"parentSpanId": s["parent"]} if s["parent"] else {}),
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["start_ns"] + s["duration_ns"]),
+            "attributes": [{"key": "memory.allocated_blocks", "value": {"intValue": str(s["blocks"])}}],
+        }
+        for s in trace["spans"]
+    ]
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "instrumentation"}, "spans": spans}],
+    }]}
+
+
+def export(trace):
+    line = json.dumps(_otlp(trace), separators=(",", ":"))
+    with _write_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def summarize(trace):
+    # Per section: calls, total and self time (minus traced children), blocks.
+    import pandas as pd
+    child_ns = {}
+    for s in trace["spans"]:
+        if s["parent"]:
+            child_ns[s["parent"]] = child_ns.get(s["parent"], 0) + s["duration_ns"]
+    frame = pd.DataFrame({
+        "Section": [s["name"] for s in trace["spans"]],
+        "Total ms": [s["duration_ns"] / 1e6 for s in trace["spans"]],
+        "Self ms": [(s["duration_ns"] - child_ns.get(s["span_id"], 0)) / 1e6 for s in trace["spans"]],
+        "Blocks": [s["blocks"] for s in trace["spans"]],
+    })
+    summary = frame.groupby("Section").agg(
+        Calls=("Total ms", "size"), **{"Total ms": ("Total ms", "sum"), "Self ms": ("Self ms", "sum"),
+                                       "Blocks": ("Blocks", "sum")},
+    )
+    return summary.sort_values("Self ms", ascending=False).reset_index()
+
+
+def show_panel(trace):
+    root = trace["spans"][-1]
+    with st.sidebar.expander(f"⏱️ Last rerun: {root['duration_ns'] / 1e6:.0f} ms", expanded=False):
+        st.dataframe(summarize(trace).head(PANEL_ROWS), hide_index=True, use_container_width=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("Total ms", "Self ms")})
+        st.caption(f"Trace {trace['trace_id'][:8]} · {len(trace['spans'])} spans · written to {TRACE_FILE}")
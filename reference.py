@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import flavor_wheel
+
+# Process-wide registry of reference lists (origins, roles, processes, ...)
+# loaded from data/reference.json. Every session reads the same frozen
+# snapshot; when reference.json or the flavor wheel file changes on disk the
+# registry reloads it and bumps `version`.
+
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reference.json")
+# Seconds between checks of the files' modification times.
+CHECK_INTERVAL = 2.0
+
+_lock = threading.Lock()
+_snapshot = None
+_stamp = None
+_checked = 0.0
+
+
+def _file_stamp():
+    return tuple(os.stat(path).st_mtime_ns for path in (REFERENCE_PATH, flavor_wheel.WHEEL_PATH))
+
+
+def load(path=REFERENCE_PATH):
+    with open(path, encoding="utf-8") as f:
+        lists = json.load(f)
+    return {name: tuple(values) for name, values in lists.items()}
+
+
+def current():
+    global _snapshot, _stamp, _checked
+    now = time.monotonic()
+    if _snapshot is not None and now - _checked < CHECK_INTERVAL:
+        return _snapshot
+    with _lock:
+        if _snapshot is not None and now - _checked < CHECK_INTERVAL:
+            return _snapshot
+        stamp = _file_stamp()
+        if stamp != _stamp:
+            if _stamp is not None and stamp[1] != _stamp[1]:
+                flavor_wheel.reload()
+            version = _snapshot["version"] + 1 if _snapshot else 1
+            _snapshot = MappingProxyType({**load(), "version": version})
+            _stamp = stamp
+        _checked = now
+    return _snapshot
+
+
+def get(name):
+    return current()[name]
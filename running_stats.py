@@ -0,0 +1,37 @@
+import math
+
+# Welford running mean/variance. State is a (count, mean, m2) tuple so it can
+# be stored as three columns and updated in O(1) per value added or removed.
+
+EMPTY = (0, 0.0, 0.0)
+
+
+def add(state, value):
+    count, mean, m2 = state
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+
+def remove(state, value):
+    count, mean, m2 = state
+    if count <= 1:
+        return EMPTY
+    new_mean = (count * mean - value) / (count - 1)
+    m2 -= (value - mean) * (value - new_mean)
+    return count - 1, new_mean, max(m2, 0.0)
+
+
+def replace(state, old, new):
+    return add(remove(state, old), new)
+
+
+def variance(state):
+    count, _, m2 = state
+    return m2 / (count - 1) if count > 1 else 0.0
+
+
+def std(state):
+    return math.sqrt(variance(state))
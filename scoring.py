@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+
+import storage
+
+# SCA cupping score sheet. A session's sheet is one float32 array shaped
+# (samples, cups, attributes); every derived number (attribute averages,
+# cup-based points, defects, final score) comes out of a single vectorized
+# pass over it.
+
+# Same order as the per-sample columns in storage (minus final_score).
+ATTRIBUTES = storage.SCORE_COLUMNS[:-1]
+ATTRIBUTE_LABELS = {
+    "fragrance": "Fragrance/Aroma",
+    "flavor": "Flavor",
+    "aftertaste": "Aftertaste",
+    "acidity": "Acidity",
+    "body": "Body",
+    "balance": "Balance",
+    "uniformity": "Uniformity",
+    "clean_cup": "Clean Cup",
+    "sweetness": "Sweetness",
+    "overall": "Overall",
+    "defects": "Defects",
+}
+
+# Quality attributes are scored 6.00-10.00 per cup and averaged over cups.
+QUALITY = [ATTRIBUTES.index(a) for a in (
+    "fragrance", "flavor", "aftertaste", "acidity", "body", "balance", "overall",
+)]
+# Cup attributes are pass/fail per cup (1/0); passing cups share 10 points.
+CUP_FLAGS = [ATTRIBUTES.index(a) for a in ("uniformity", "clean_cup", "sweetness")]
+# Defects are recorded per cup as intensity: 0 none, 2 taint, 4 fault.
+DEFECTS = ATTRIBUTES.index("defects")
+
+QUALITY_MIN, QUALITY_MAX, QUALITY_STEP = 6.0, 10.0, 0.25
+DEFAULT_QUALITY = 7.5
+DEFECT_INTENSITIES = (0, 2, 4)
+
+
+def new_sheet(num_samples, cups_per_sample):
+    sheet = np.zeros((num_samples, cups_per_sample, len(ATTRIBUTES)), dtype=np.float32)
+    sheet[:, :, QUALITY] = DEFAULT_QUALITY
+    sheet[:, :, CUP_FLAGS] = 1
+    return sheet
+
+
+def sample_scores(sheet):
+    # Returns a (samples, len(storage.SCORE_COLUMNS)) array: per-attribute
+    # values on the 10-point scale, total defect deduction and final score.
+    cups = sheet.shape[1]
+    quality = sheet[:, :, QUALITY].mean(axis=1)
+    cup_points = sheet[:, :, CUP_FLAGS].sum(axis=1) * (10.0 / cups)
+    defects = sheet[:, :, DEFECTS].sum(axis=1)
+    final = quality.sum(axis=1) + cup_points.sum(axis=1) - defects
+
+    scores = np.empty((sheet.shape[0], len(storage.SCORE_COLUMNS)), dtype=np.float64)
+    scores[:, QUALITY] = quality
+    scores[:, CUP_FLAGS] = cup_points
+    scores[:, DEFECTS] = defects
+    scores[:, -1] = final
+    return scores
+
+
+def sample_score_dicts(sheet):
+    return [dict(zip(storage.SCORE_COLUMNS, row.round(2).tolist())) for row in sample_scores(sheet)]
+
+
+def dumps(sheet):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(sheet, dtype=np.float32), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def loads(data):
+    return np.load(io.BytesIO(data), allow_pickle=False)
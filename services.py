@@ -0,0 +1,290 @@
+import math
+from datetime import date, datetime
+
+import numpy as np
+
+import badges
+import calibration
+import flavor_profiles
+import flavor_wheel
+import reference
+import scoring
+import similarity
+import storage
+
+# Domain operations shared by the Streamlit pages and the HTTP API: input
+# validation, score sheet handling and the storage calls behind "create a
+# session", "save a review" and "submit calibration scores". Nothing here
+# touches Streamlit.
+
+
+class ValidationError(ValueError):
+    pass
+
+
+CUPS_RANGE = (3, 5)
+RATING_RANGE = (1, 5)
+SAMPLE_NUMBERS = ("altitude", "moisture")
+
+
+def _require(condition, message):
+    if not condition:
+        raise ValidationError(message)
+
+
+def _text(value, field):
+    _require(value is None or isinstance(value, str), f"{field} must be text")
+    return value.strip() if value else value
+
+
+def _number(value, field, minimum=None):
+    # Optional numeric field; numeric strings (as from offer sheets) are accepted.
+    if value is None or value == "":
+        return None
+    _require(not isinstance(value, bool), f"{field} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{field} must be a number")
+    _require(math.isfinite(number), f"{field} must be a number")
+    if minimum is not None:
+        _require(number >= minimum, f"{field} must be at least {minimum:g}")
+    return number
+
+
+def _date(value):
+    # ISO "YYYY-MM-DD"; date objects are accepted, missing means today.
+    if value is None or value == "":
+        return date.today().isoformat()
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    _require(isinstance(value, str), "date must be YYYY-MM-DD")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValidationError("date must be YYYY-MM-DD")
+
+
+def validate_sheet(sheet):
+    quality = sheet[..., scoring.QUALITY]
+    _require(((quality >= scoring.QUALITY_MIN) & (quality <= scoring.QUALITY_MAX)).all(),
+             f"quality scores must be {scoring.QUALITY_MIN:g}-{scoring.QUALITY_MAX:g}")
+    _require(np.isin(sheet[..., scoring.CUP_FLAGS], (0, 1)).all(),
+             "uniformity, clean_cup and sweetness must be 0 or 1 per cup")
+    _require(np.isin(sheet[..., scoring.DEFECTS], scoring.DEFECT_INTENSITIES).all(),
+             f"defects must be one of {scoring.DEFECT_INTENSITIES}")
+
+
+def build_sheet(samples, cups_per_sample):
+    # Each sample may carry "cups": a list of {attribute: value} dicts; missing
+    # cups and attributes keep the new-sheet defaults.
+    sheet = scoring.new_sheet(len(samples), cups_per_sample)
+    for i, sample in enumerate(samples):
+        cups = sample.get("cups") or []
+        _require(isinstance(cups, list) and all(isinstance(cup, dict) for cup in cups),
+                 "cups must be a list of {attribute: value} objects")
+        _require(len(cups) <= cups_per_sample, f"sample {i + 1} has more than {cups_per_sample} cups")
+        for j, cup in enumerate(cups):
+            for attribute, value in cup.items():
+                _require(attribute in scoring.ATTRIBUTES, f"unknown attribute {attribute!r}")
+                _require(isinstance(value, (int, float)), f"{attribute} must be a number")
+                sheet[i, j, scoring.ATTRIBUTES.index(attribute)] = value
+    validate_sheet(sheet)
+    return sheet
+
+
+def _validate_flavors(flavors):
+    _require(isinstance(flavors, list), "flavors must be a list of flavor wheel descriptors")
+    unknown = [f for f in flavors if not flavor_wheel.parents(f)]
+    _require(not unknown, f"unknown flavor descriptors: {', '.join(map(str, unknown))}")
+
+
+def _sample_record(sample):
+    record = {c: _text(sample.get(c), c) for c in storage.SAMPLE_COLUMNS if c not in SAMPLE_NUMBERS}
+    record.update({c: _number(sample.get(c), c) for c in SAMPLE_NUMBERS})
+    record["flavors"] = list(sample.get("flavors") or [])
+    return record
+
+
+def _sample_records(samples):
+    _require(isinstance(samples, list) and all(isinstance(s, dict) for s in samples),
+             "samples must be a list of objects")
+    _require(all(s.get("process") in (None, "", *reference.get("processes")) for s in samples),
+             "unknown process")
+    for sample in samples:
+        _validate_flavors(sample.get("flavors") or [])
+    records = [_sample_record(s) for s in samples]
+    flavored = [r for r in records if r["flavors"]]
+    for record, bits in zip(flavored, flavor_profiles.encode_many([r["flavors"] for r in flavored])):
+        record["flavor_bits"] = flavor_profiles.to_bytes(bits)
+    return records
+
+
+def _session_fields(session):
+    name = _text(session.get("name"), "session name")
+    _require(name, "session name is required")
+    cups_per_sample = session.get("cups_per_sample", CUPS_RANGE[1])
+    _require(isinstance(cups_per_sample, int) and CUPS_RANGE[0] <= cups_per_sample <= CUPS_RANGE[1],
+             f"cups_per_sample must be {CUPS_RANGE[0]}-{CUPS_RANGE[1]}")
+    return {
+        "name": name,
+        "date": _date(session.get("date")),
+        "type": _text(session.get("type"), "type") or reference.get("protocols")[0],
+        "is_blind": bool(session.get("is_blind", True)),
+        "cups_per_sample": cups_per_sample,
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def _session_record(session, sheet):
+    fields = _session_fields(session)
+    samples = session.get("samples") or []
+    records = _sample_records(samples)
+    _require(samples, "a session needs at least one sample")
+
+    cups_per_sample = fields["cups_per_sample"]
+    if sheet is None and any(s.get("cups") for s in samples):
+        sheet = build_sheet(samples, cups_per_sample)
+    if sheet is not None:
+        _require(sheet.shape[:2] == (len(samples), cups_per_sample), "score sheet does not match samples")
+        validate_sheet(sheet)
+        for record, scores in zip(records, scoring.sample_score_dicts(sheet)):
+            record.update(scores)
+
+    return {**fields, "samples": records, "score_sheet": None if sheet is None else scoring.dumps(sheet)}
+
+
+def create_session(conn, user_email, session, sheet=None):
+    return storage.save_session(conn, user_email, _session_record(session, sheet))
+
+
+def import_session(conn, user_email, session, sample_batches):
+    # Bulk imports: samples arrive as an iterable of lists and are validated
+    # and written batch by batch, in one transaction; a bad batch (or none at
+    # all) rolls the whole session back.
+    fields = _session_fields(session)
+
+    def records():
+        count = 0
+        for batch in sample_batches:
+            count += len(batch)
+            yield _sample_records(batch)
+        _require(count, "a session needs at least one sample")
+
+    return storage.save_session(conn, user_email, fields, records())
+
+
+def create_sessions(conn, user_email, sessions):
+    # Everything is validated before anything is saved, then saved in one
+    # transaction: a batch goes in whole or not at all.
+    records = [_session_record(session, None) for session in sessions]
+    return storage.save_sessions(conn, user_email, records)
+
+
+def _review_record(review):
+    name = _text(review.get("name"), "coffee name")
+    _require(name, "coffee name is required")
+    rating = review.get("rating", 3)
+    _require(isinstance(rating, int) and not isinstance(rating, bool) and RATING_RANGE[0] <= rating <= RATING_RANGE[1],
+             f"rating must be {RATING_RANGE[0]}-{RATING_RANGE[1]}")
+    _require(review.get("roast_level") in (None, "", *reference.get("roast_levels")), "unknown roast level")
+    return {
+        **{f: _text(review.get(f), f) for f in storage.REVIEW_FIELDS if f not in ("cost", "rating", "date")},
+        "name": name,
+        "cost": _number(review.get("cost"), "cost", minimum=0),
+        "rating": rating,
+        "date": _date(review.get("date")),
+    }
+
+
+def create_review(conn, user_email, review):
+    return storage.save_review(conn, user_email, _review_record(review))
+
+
+def create_reviews(conn, user_email, reviews):
+    records = [_review_record(review) for review in reviews]
+    return storage.save_reviews(conn, user_email, records)
+
+
+def search_flavors(query, limit=10):
+    return [
+        {
+            "descriptor": descriptor,
+            "parents": [{"category": c, "subcategory": s} for c, s in flavor_wheel.parents(descriptor)],
+        }
+        for descriptor in flavor_wheel.search(query, limit)
+    ]
+
+
+def save_flavor_profile(conn, user_email, name, flavors):
+    name = (name or "").strip()
+    _require(name, "profile name is required")
+    _validate_flavors(flavors)
+    _require(flavors, "select at least one descriptor")
+    return storage.save_flavor_profile(conn, user_email, name, flavor_profiles.to_bytes(flavor_profiles.encode(flavors)))
+
+
+def closest_flavor_profiles(conn, user_email, flavors, k=3):
+    # The user's saved profiles ranked by Jaccard similarity to `flavors`.
+    _validate_flavors(flavors)
+    saved = storage.list_flavor_profiles(conn, user_email)
+    if not saved or not flavors:
+        return []
+    similarities = flavor_profiles.jaccard(flavor_profiles.from_bytes([p["bits"] for p in saved]),
+                                           flavor_profiles.encode(flavors))
+    best = np.argsort(-similarities, kind="stable")[:k]
+    return [
+        {"name": saved[i]["name"], "created": saved[i]["created"],
+         "flavors": flavor_profiles.decode(flavor_profiles.from_bytes([saved[i]["bits"]])[0]),
+         "jaccard": round(float(similarities[i]), 4)}
+        for i in best if similarities[i] > 0
+    ]
+
+
+def similar_samples(conn, user_email, sample_id=None, scores=None, flavors=(), k=10, approximate=False):
+    # Past samples closest to one of the user's samples, or to scores and
+    # flavors of a sample that hasn't been saved (e.g. a new offer).
+    if sample_id is not None:
+        matches = similarity.similar_to_sample(conn, user_email, sample_id, k, approximate)
+        _require(matches is not None, f"no scored sample with id {sample_id}")
+        return matches
+    scores = scores or {}
+    _require(isinstance(scores, dict) and scores, "send scores as {attribute: value}")
+    for attribute, value in scores.items():
+        _require(attribute in scoring.ATTRIBUTES, f"unknown attribute {attribute!r}")
+        _require(isinstance(value, (int, float)), f"{attribute} must be a number")
+    _validate_flavors(flavors)
+    return similarity.similar_to_scores(conn, user_email, scores, flavors, k, approximate)
+
+
+def submit_calibration_scores(conn, code, cupper_email, submissions):
+    # `submissions` is a list of {"sample", "version", "cups"}; each is applied
+    # with optimistic concurrency and reported back as saved or conflicting.
+    session = calibration.get_session(conn, code)
+    _require(session is not None, f"no calibration table with code {code!r}")
+    sheets = []
+    for submission in submissions:
+        sample = submission.get("sample")
+        _require(isinstance(sample, int) and 0 <= sample < session["num_samples"],
+                 f"sample must be 0-{session['num_samples'] - 1}")
+        sheets.append((sample, submission.get("version", 0),
+                       build_sheet([submission], session["cups_per_sample"])[0]))
+
+    results = []
+    for sample, expected_version, sheet in sheets:
+        version = calibration.submit_score(conn, session["id"], cupper_email, sample, sheet, expected_version)
+        results.append({"sample": sample, "version": version, "conflict": version is None})
+    return results
+
+
+def user_summary(conn, user_email):
+    stats = storage.get_user_stats(conn, user_email)
+    return {
+        **{k: stats[k] for k in ("sessions", "reviews", "score_mean", "score_std", "max_score", "origins", "badges")},
+        "earned_badges": [
+            {"id": badge["id"], "name": badge["name"], "earned": earned}
+            for badge, earned in badges.earned_badges(conn, user_email)
+        ],
+    }
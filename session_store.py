@@ -0,0 +1,307 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import storage
+
+# Login sessions shared by every app worker, so the UI and the API can run as
+# several processes behind a load balancer without sticky sessions. A session
+# is a record {email, state, expires} kept in a backend all workers reach: the
+# app's SQLite database (the default) or a Redis-compatible server
+# (CUPPING_SESSION_URL=redis://host:6379/0, needs the redis package).
+#
+# Clients hold a signed token "<id>.<signature>"; a forged or mangled token is
+# rejected without touching the backend. The signing key is
+# CUPPING_SESSION_SECRET, or one generated by the first worker and stored in
+# the backend for the others.
+#
+# Reads go through a per-process cache, refetched once an entry is CACHE_TTL
+# seconds old (so a logout on another worker takes at most that long to
+# reach this one). Creating and revoking a session are written at once; state
+# changes and expiry extensions are queued and written in one batch every
+# FLUSH_INTERVAL seconds by a background thread, and at exit. Queued writes
+# only update sessions that still exist, so a flush never brings back a
+# session another worker revoked.
+#
+# Tokens never go into URLs. For that there are handles: single-use,
+# HANDLE_TTL-second references to a token, redeemed for the token itself.
+
+URL = os.environ.get("CUPPING_SESSION_URL", "sqlite")
+TTL = int(os.environ.get("CUPPING_TOKEN_TTL", 30 * 60))
+CACHE_TTL = 5.0
+CACHE_SIZE = 4096
+FLUSH_INTERVAL = 1.0
+EXTEND_AFTER = 60  # seconds of use before a session's expiry is pushed back
+PURGE_INTERVAL = 600
+HANDLE_TTL = int(os.environ.get("CUPPING_HANDLE_TTL", 10 * 60))
+HANDLE_PREFIX = "h:"  # handle ids; token ids (token_urlsafe) never contain ":"
+
+
+class SQLiteBackend:
+    def __init__(self, path=None):
+        self.path = path
+
+    def _conn(self):
+        # Thread-local, so the flusher thread has its own connection.
+        return storage.get_connection(self.path)
+
+    def get(self, token_id):
+        return storage.get_app_session(self._conn(), token_id)
+
+    def insert(self, token_id, record):
+        storage.insert_app_session(self._conn(), token_id, record)
+
+    def update(self, records):
+        storage.update_app_sessions(self._conn(), records)
+
+    def take(self, token_id):
+        return storage.take_app_session(self._conn(), token_id)
+
+    def delete(self, token_id):
+        storage.delete_app_session(self._conn(), token_id)
+
+    def purge(self, now):
+        storage.purge_app_sessions(self._conn(), now)
+
+    def secret(self, value):
+        return storage.get_or_create_secret(self._conn(), "session", value)
+
+
+class RedisBackend:
+    PREFIX = "cupping:session:"
+    SECRET_KEY = "cupping:secret:session"
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, token_id):
+        value = self.client.get(self.PREFIX + token_id)
+        return None if value is None else json.loads(value)
+
+    @staticmethod
+    def _ex(record):
+        # Redis drops the key itself once the session expires.
+        return max(1, int(record["expires"] - time.time()) + 1)
+
+    def insert(self, token_id, record):
+        self.client.set(self.PREFIX + token_id, json.dumps(record), ex=self._ex(record))
+
+    def update(self, records):
+        pipe = self.client.pipeline(transaction=False)
+        for token_id, record in records.items():
+            pipe.set(self.PREFIX + token_id, json.dumps(record), ex=self._ex(record), xx=True)
+        pipe.execute()
+
+    def take(self, token_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self.PREFIX + token_id)
+        pipe.delete(self.PREFIX + token_id)
+        value, deleted = pipe.execute()
+        return json.loads(value) if deleted else None
+
+    def delete(self, token_id):
+        self.client.delete(self.PREFIX + token_id)
+
+    def purge(self, now):
+        pass
+
+    def secret(self, value):
+        self.client.set(self.SECRET_KEY, value, nx=True)
+        return self.client.get(self.SECRET_KEY).decode()
+
+
+def make_backend(url=URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return SQLiteBackend(None if url == "sqlite" else url)
+
+
+_backend = None
+_key = None
+_cache = OrderedDict()  # token_id -> (record, monotonic time fetched)
+_pending = {}  # token_id -> record not yet written
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # a revoke must not interleave with a flush
+_flusher = None
+
+
+def backend():
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = make_backend()
+        return _backend
+
+
+def _signing_key():
+    global _key
+    if _key is None:
+        secret = os.environ.get("CUPPING_SESSION_SECRET") or backend().secret(secrets.token_hex(32))
+        _key = secret.encode()
+    return _key
+
+
+def sign(token_id):
+    digest = hmac.new(_signing_key(), token_id.encode(), hashlib.sha256).digest()
+    return f"{token_id}.{base64.urlsafe_b64encode(digest).rstrip(b'=').decode()}"
+
+
+def unsign(token):
+    # The token's id, or None if the signature doesn't match.
+    if not isinstance(token, str) or "." not in token:
+        return None
+    token_id = token.rsplit(".", 1)[0]
+    return token_id if hmac.compare_digest(sign(token_id), token) else None
+
+
+def _remember(token_id, record):
+    # Caller holds _lock.
+    _cache[token_id] = (record, time.monotonic())
+    _cache.move_to_end(token_id)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _queue(token_id, record):
+    global _flusher
+    with _lock:
+        _remember(token_id, record)
+        _pending[token_id] = record
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="session-flush", daemon=True)
+            _flusher.start()
+
+
+def _fetch(token_id):
+    with _lock:
+        if token_id in _pending:
+            return _pending[token_id]
+        cached = _cache.get(token_id)
+        if cached is not None and time.monotonic() - cached[1] < CACHE_TTL:
+            return cached[0]
+    record = backend().get(token_id)
+    if record is not None:
+        with _lock:
+            _remember(token_id, record)
+    return record
+
+
+def create(email, state=None):
+    # Written through: the browser's next request may reach another worker.
+    token_id = secrets.token_urlsafe(24)
+    record = {"email": email, "state": state or {}, "expires": time.time() + TTL}
+    backend().insert(token_id, record)
+    with _lock:
+        _remember(token_id, record)
+    return sign(token_id)
+
+
+def load(token):
+    # The live record for a token, or None. Treat it as read-only. Use pushes
+    # the expiry back, at most once every EXTEND_AFTER seconds.
+    token_id = unsign(token)
+    if token_id is None or token_id.startswith(HANDLE_PREFIX):
+        return None
+    record = _fetch(token_id)
+    now = time.time()
+    if record is None or record["expires"] < now:
+        with _lock:
+            _cache.pop(token_id, None)
+        return None
+    if record["expires"] - now < TTL - EXTEND_AFTER:
+        record = {**record, "expires": now + TTL}
+        _queue(token_id, record)
+    return record
+
+
+def update(token, state):
+    # Merges `state` into the session's; returns False for a dead token.
+    token_id = unsign(token)
+    record = load(token)
+    if record is None:
+        return False
+    if any(record["state"].get(key) != value for key, value in state.items()):
+        _queue(token_id, {**record, "state": {**record["state"], **state}})
+    return True
+
+
+def revoke(token):
+    token_id = unsign(token)
+    if token_id is None:
+        return
+    with _flush_lock:
+        with _lock:
+            _cache.pop(token_id, None)
+            _pending.pop(token_id, None)
+        backend().delete(token_id)
+
+
+def issue_handle(token):
+    # A URL-safe stand-in for `token`: redeemable once, within HANDLE_TTL.
+    handle_id = HANDLE_PREFIX + secrets.token_urlsafe(24)
+    record = load(token)
+    if record is None:
+        return None
+    backend().insert(handle_id, {"email": record["email"], "state": {"token": token},
+                                 "expires": time.time() + HANDLE_TTL})
+    return sign(handle_id)
+
+
+def redeem_handle(handle):
+    # The live token behind a handle, or None; the handle is used up either way.
+    handle_id = unsign(handle)
+    if handle_id is None or not handle_id.startswith(HANDLE_PREFIX):
+        return None
+    record = backend().take(handle_id)
+    if record is None or record["expires"] < time.time():
+        return None
+    token = record["state"]["token"]
+    return token if load(token) is not None else None
+
+
+def discard_handle(handle):
+    handle_id = unsign(handle)
+    if handle_id is not None and handle_id.startswith(HANDLE_PREFIX):
+        backend().delete(handle_id)
+
+
+def flush():
+    with _flush_lock:
+        with _lock:
+            batch = dict(_pending)
+            _pending.clear()
+        if not batch:
+            return
+        try:
+            backend().update(batch)
+        except Exception:
+            # Retried on the next flush unless a newer write replaced it.
+            with _lock:
+                for token_id, record in batch.items():
+                    _pending.setdefault(token_id, record)
+            raise
+
+
+def _run():
+    last_purge = 0.0
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+            if time.monotonic() - last_purge > PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                backend().purge(time.time())
+        except Exception:
+            # Backend unreachable: keep the queue and try again next round.
+            pass
+
+
+atexit.register(flush)
@@ -0,0 +1,841 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import running_stats
+
+# Persistent storage for users, cupping sessions and coffee reviews.
+# One SQLite file in WAL mode so readers never wait on the writer; every list
+# query is backed by an index so "latest N" reads don't grow with history.
+
+DB_PATH = os.environ.get("CUPPING_DB_PATH", "cupping.db")
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+MIGRATIONS = [
+    """
+    CREATE TABLE users (
+        email TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        password TEXT NOT NULL,
+        company TEXT,
+        role TEXT,
+        member_since TEXT,
+        profile TEXT NOT NULL DEFAULT '{}',
+        created TEXT NOT NULL
+    );
+
+    CREATE TABLE cupping_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        type TEXT,
+        is_blind INTEGER NOT NULL DEFAULT 1,
+        cups_per_sample INTEGER NOT NULL DEFAULT 5,
+        created TEXT NOT NULL
+    );
+    CREATE INDEX idx_sessions_user_date ON cupping_sessions (user_email, date DESC, id DESC);
+
+    CREATE TABLE samples (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER NOT NULL REFERENCES cupping_sessions (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        name TEXT,
+        origin TEXT,
+        process TEXT
+    );
+    CREATE INDEX idx_samples_session ON samples (session_id, position);
+    CREATE INDEX idx_samples_origin ON samples (origin);
+
+    CREATE TABLE coffee_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        producer TEXT,
+        origin TEXT,
+        cost REAL,
+        roast_level TEXT,
+        form TEXT,
+        preparation TEXT,
+        rating INTEGER,
+        flavor_notes TEXT,
+        recommend TEXT,
+        buy_again TEXT,
+        date TEXT NOT NULL,
+        created TEXT NOT NULL
+    );
+    CREATE INDEX idx_reviews_user_date ON coffee_reviews (user_email, date DESC, id DESC);
+    CREATE INDEX idx_reviews_origin ON coffee_reviews (origin);
+
+    CREATE TABLE guests (
+        email TEXT PRIMARY KEY,
+        created TEXT NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_guests_created ON guests (created);
+    """,
+    """
+    ALTER TABLE samples ADD COLUMN fragrance REAL;
+    ALTER TABLE samples ADD COLUMN flavor REAL;
+    ALTER TABLE samples ADD COLUMN aftertaste REAL;
+    ALTER TABLE samples ADD COLUMN acidity REAL;
+    ALTER TABLE samples ADD COLUMN body REAL;
+    ALTER TABLE samples ADD COLUMN balance REAL;
+    ALTER TABLE samples ADD COLUMN uniformity REAL;
+    ALTER TABLE samples ADD COLUMN clean_cup REAL;
+    ALTER TABLE samples ADD COLUMN sweetness REAL;
+    ALTER TABLE samples ADD COLUMN overall REAL;
+    ALTER TABLE samples ADD COLUMN defects REAL;
+    ALTER TABLE samples ADD COLUMN final_score REAL;
+
+    CREATE TABLE data_versions (
+        user_email TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    ALTER TABLE cupping_sessions ADD COLUMN score_sheet BLOB;
+    """,
+    """
+    CREATE TABLE calibration_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT NOT NULL UNIQUE,
+        owner_email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        num_samples INTEGER NOT NULL,
+        cups_per_sample INTEGER NOT NULL,
+        change_seq INTEGER NOT NULL DEFAULT 0,
+        created TEXT NOT NULL
+    );
+
+    CREATE TABLE calibration_scores (
+        session_id INTEGER NOT NULL REFERENCES calibration_sessions (id) ON DELETE CASCADE,
+        cupper_email TEXT NOT NULL,
+        sample INTEGER NOT NULL,
+        sheet BLOB NOT NULL,
+        final_score REAL NOT NULL,
+        version INTEGER NOT NULL,
+        updated TEXT NOT NULL,
+        PRIMARY KEY (session_id, cupper_email, sample)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE calibration_aggregates (
+        session_id INTEGER NOT NULL REFERENCES calibration_sessions (id) ON DELETE CASCADE,
+        sample INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        m2 REAL NOT NULL,
+        seq INTEGER NOT NULL,
+        PRIMARY KEY (session_id, sample)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_calibration_aggregates_seq ON calibration_aggregates (session_id, seq);
+    """,
+    """
+    ALTER TABLE samples ADD COLUMN lot_id TEXT;
+    ALTER TABLE samples ADD COLUMN variety TEXT;
+    ALTER TABLE samples ADD COLUMN altitude REAL;
+    ALTER TABLE samples ADD COLUMN moisture REAL;
+    CREATE INDEX idx_samples_lot ON samples (lot_id);
+    """,
+    """
+    ALTER TABLE cupping_sessions ADD COLUMN avg_score REAL;
+    UPDATE cupping_sessions SET avg_score = (
+        SELECT AVG(final_score) FROM samples WHERE samples.session_id = cupping_sessions.id
+    );
+    CREATE INDEX idx_sessions_user_score ON cupping_sessions (user_email, IFNULL(avg_score, -1), id);
+    CREATE INDEX idx_samples_session_origin ON samples (session_id, origin);
+    CREATE INDEX idx_reviews_user_rating ON coffee_reviews (user_email, rating, id);
+    """,
+    """
+    ALTER TABLE users RENAME COLUMN password TO password_hash;
+    CREATE INDEX idx_users_email_nocase ON users (email COLLATE NOCASE);
+    """,
+    """
+    CREATE TABLE user_stats (
+        user_email TEXT PRIMARY KEY,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        score_mean REAL NOT NULL DEFAULT 0,
+        score_m2 REAL NOT NULL DEFAULT 0,
+        previous_mean REAL,
+        max_score REAL,
+        origins INTEGER NOT NULL DEFAULT 0,
+        badges INTEGER NOT NULL DEFAULT 0,
+        month TEXT,
+        month_sessions INTEGER NOT NULL DEFAULT 0,
+        month_origins INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TABLE user_origins (
+        user_email TEXT NOT NULL,
+        origin TEXT NOT NULL,
+        PRIMARY KEY (user_email, origin)
+    ) WITHOUT ROWID;
+
+    INSERT INTO user_origins (user_email, origin)
+    SELECT DISTINCT s.user_email, p.origin
+    FROM cupping_sessions s JOIN samples p ON p.session_id = s.id
+    WHERE p.origin IS NOT NULL AND p.origin != '';
+
+    INSERT INTO user_stats (user_email, sessions, score_count, score_mean, score_m2, max_score, origins)
+    SELECT
+        s.user_email,
+        (SELECT COUNT(*) FROM cupping_sessions WHERE user_email = s.user_email),
+        COUNT(p.final_score),
+        IFNULL(AVG(p.final_score), 0),
+        IFNULL(MAX(SUM(p.final_score * p.final_score) - COUNT(p.final_score) * AVG(p.final_score) * AVG(p.final_score), 0), 0),
+        MAX(p.final_score),
+        (SELECT COUNT(*) FROM user_origins WHERE user_email = s.user_email)
+    FROM cupping_sessions s LEFT JOIN samples p ON p.session_id = s.id
+    GROUP BY s.user_email;
+    """,
+    """
+    ALTER TABLE user_stats ADD COLUMN reviews INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE user_stats ADD COLUMN badge_rules TEXT;
+    INSERT INTO user_stats (user_email, reviews)
+    SELECT user_email, COUNT(*) FROM coffee_reviews WHERE true GROUP BY user_email
+    ON CONFLICT (user_email) DO UPDATE SET reviews = excluded.reviews;
+
+    CREATE TABLE user_badges (
+        user_email TEXT NOT NULL,
+        badge TEXT NOT NULL,
+        earned TEXT NOT NULL,
+        PRIMARY KEY (user_email, badge)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE drafts (
+        user_email TEXT NOT NULL,
+        form TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        updated TEXT NOT NULL,
+        PRIMARY KEY (user_email, form, field)
+    ) WITHOUT ROWID;
+    """,
+    """
+    ALTER TABLE samples ADD COLUMN flavors TEXT;
+    """,
+    """
+    CREATE TABLE app_sessions (
+        token_id TEXT PRIMARY KEY,
+        email TEXT NOT NULL,
+        state TEXT NOT NULL,
+        expires REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_app_sessions_expires ON app_sessions (expires);
+
+    CREATE TABLE app_secrets (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID;
+    """,
+    """
+    ALTER TABLE samples ADD COLUMN flavor_bits BLOB;
+
+    CREATE TABLE flavor_profiles (
+        id INTEGER PRIMARY KEY,
+        user_email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        bits BLOB NOT NULL,
+        created TEXT NOT NULL
+    );
+    CREATE INDEX idx_flavor_profiles_user ON flavor_profiles (user_email, id);
+    CREATE INDEX idx_samples_flavor_bits ON samples (session_id, flavor_bits) WHERE flavor_bits IS NOT NULL;
+    CREATE INDEX idx_samples_unencoded ON samples (session_id) WHERE flavors IS NOT NULL AND flavor_bits IS NULL;
+    """,
+]
+
+# Descriptive per-sample columns (lot data comes from bulk imports).
+SAMPLE_COLUMNS = ("name", "origin", "process", "lot_id", "variety", "altitude", "moisture")
+
+# Per-sample score columns, averaged over the cups of that sample.
+SCORE_COLUMNS = (
+    "fragrance", "flavor", "aftertaste", "acidity", "body", "balance",
+    "uniformity", "clean_cup", "sweetness", "overall", "defects", "final_score",
+)
+
+# Session columns for list views, without the score sheet blob.
+SESSION_COLUMNS = "id, user_email, name, date, type, is_blind, cups_per_sample, created, avg_score"
+
+# Sortable columns for list views; NULL scores sort below every real score.
+SESSION_SORTS = {"date": "date", "score": "IFNULL(avg_score, -1)"}
+REVIEW_SORTS = {"date": "date", "rating": "rating"}
+
+_local = threading.local()
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def connect(path=None):
+    path = path or DB_PATH
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    with _migrate_lock:
+        if path not in _migrated:
+            migrate(conn)
+            _migrated.add(path)
+    return conn
+
+
+def get_connection(path=None):
+    # SQLite connections must not be shared across threads mid-transaction,
+    # and Streamlit runs each session's script on its own thread.
+    path = path or DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        connections[path] = connect(path)
+    return connections[path]
+
+
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            conn.executescript(script)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _average(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _keyset_page(conn, table, columns, user_email, sort_expr, descending, limit, cursor, filters):
+    # Keyset pagination: `cursor` is the (sort_key, id) of the last row of the
+    # previous page, so every page is an index range scan, never an OFFSET.
+    where = ["user_email = ?"]
+    params = [user_email]
+    for clause, value in filters:
+        where.append(clause)
+        params.append(value)
+    if cursor is not None:
+        # The plain bound lets SQLite range-scan expression indexes too.
+        where.append(f"{sort_expr} {'<=' if descending else '>='} ?")
+        where.append(f"({sort_expr}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend((cursor[0], *cursor))
+    order = "DESC" if descending else "ASC"
+    rows = conn.execute(
+        f"SELECT {columns}, {sort_expr} AS sort_key FROM {table} WHERE {' AND '.join(where)} "
+        f"ORDER BY {sort_expr} {order}, id {order} LIMIT ?",
+        (*params, limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def next_cursor(rows):
+    return (rows[-1]["sort_key"], rows[-1]["id"]) if rows else None
+
+
+# Data versions: bumped inside every write transaction so caches can key on
+# (user, version) and only recompute after new data is saved.
+def _bump_data_version(conn, user_email):
+    conn.execute(
+        "INSERT INTO data_versions (user_email, version) VALUES (?, 1) "
+        "ON CONFLICT (user_email) DO UPDATE SET version = version + 1",
+        (user_email,),
+    )
+
+
+def get_data_version(conn, user_email):
+    row = conn.execute(
+        "SELECT version FROM data_versions WHERE user_email = ?", (user_email,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+# Users
+# Emails match case-insensitively; accounts created before normalization may
+# still be stored with mixed case.
+def get_user(conn, email):
+    row = conn.execute("SELECT * FROM users WHERE email = ? COLLATE NOCASE", (email,)).fetchone()
+    if row is None:
+        return None
+    user = dict(row)
+    del user["password_hash"]
+    user.update(json.loads(user.pop("profile")))
+    return user
+
+
+def user_exists(conn, email):
+    return conn.execute(
+        "SELECT 1 FROM users WHERE email = ? COLLATE NOCASE", (email,)
+    ).fetchone() is not None
+
+
+def get_credentials(conn, email):
+    return conn.execute(
+        "SELECT email, password_hash FROM users WHERE email = ? COLLATE NOCASE", (email,)
+    ).fetchone()
+
+
+def set_password_hash(conn, email, password_hash):
+    with conn:
+        conn.execute("UPDATE users SET password_hash = ? WHERE email = ?", (password_hash, email))
+
+
+def create_user(conn, email, user):
+    columns = ("name", "password_hash", "company", "role", "member_since")
+    profile = {k: v for k, v in user.items() if k not in columns}
+    with conn:
+        conn.execute(
+            "INSERT INTO users (email, name, password_hash, company, role, member_since, profile, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (email, *(user.get(c) for c in columns), json.dumps(profile), _now()),
+        )
+
+
+# Save events: listeners run inside the save transaction as
+# listener(conn, user_email, event, stats, changed), where `changed` is the set
+# of user_stats fields the save modified.
+_save_listeners = []
+
+
+def add_save_listener(listener):
+    if listener not in _save_listeners:
+        _save_listeners.append(listener)
+
+
+def _emit_save(conn, user_email, event, stats, changed):
+    for listener in _save_listeners:
+        listener(conn, user_email, event, stats, changed)
+
+
+# Per-user aggregates, updated in the save transaction so reading them is a
+# single row lookup. Scores are per sample final score (Welford running
+# mean/variance); "month" counters reset on the first save of a new month.
+USER_STATS_DEFAULTS = {
+    "sessions": 0, "score_count": 0, "score_mean": 0.0, "score_m2": 0.0, "previous_mean": None,
+    "max_score": None, "origins": 0, "badges": 0, "month": None, "month_sessions": 0, "month_origins": 0,
+    "reviews": 0, "badge_rules": None,
+}
+
+
+def _load_user_stats(conn, user_email):
+    row = conn.execute("SELECT * FROM user_stats WHERE user_email = ?", (user_email,)).fetchone()
+    return dict(row) if row else {"user_email": user_email, **USER_STATS_DEFAULTS}
+
+
+def _write_user_stats(conn, stats, before):
+    conn.execute(
+        f"INSERT OR REPLACE INTO user_stats ({', '.join(stats)}) VALUES ({', '.join('?' * len(stats))})",
+        tuple(stats.values()),
+    )
+    return {k for k, v in stats.items() if before.get(k) != v}
+
+
+def _update_user_stats(conn, user_email, samples, created):
+    before = _load_user_stats(conn, user_email)
+    stats = dict(before)
+    if stats["month"] != created[:7]:
+        stats.update(month=created[:7], month_sessions=0, month_origins=0)
+
+    state = (stats["score_count"], stats["score_mean"], stats["score_m2"])
+    scores = [s["final_score"] for s in samples if s.get("final_score") is not None]
+    if scores:
+        stats["previous_mean"] = stats["score_mean"] if stats["score_count"] else None
+        for score in scores:
+            state = running_stats.add(state, score)
+        best = max(scores)
+        stats["max_score"] = best if stats["max_score"] is None else max(stats["max_score"], best)
+    stats["score_count"], stats["score_mean"], stats["score_m2"] = state
+
+    new_origins = conn.executemany(
+        "INSERT OR IGNORE INTO user_origins (user_email, origin) VALUES (?, ?)",
+        [(user_email, o) for o in {s.get("origin") for s in samples} if o],
+    ).rowcount
+    stats["origins"] += new_origins
+    stats["month_origins"] += new_origins
+    stats["sessions"] += 1
+    stats["month_sessions"] += 1
+    _emit_save(conn, user_email, "session", stats, _write_user_stats(conn, stats, before))
+
+
+def _update_review_stats(conn, user_email):
+    before = _load_user_stats(conn, user_email)
+    stats = {**before, "reviews": before["reviews"] + 1}
+    _emit_save(conn, user_email, "review", stats, _write_user_stats(conn, stats, before))
+
+
+def get_user_stats(conn, user_email):
+    stats = _load_user_stats(conn, user_email)
+    if stats["month"] != _now()[:7]:
+        stats.update(month_sessions=0, month_origins=0)
+    state = (stats["score_count"], stats["score_mean"], stats["score_m2"])
+    stats["score_std"] = running_stats.std(state)
+    if not stats["score_count"]:
+        stats["score_mean"] = None
+    return stats
+
+
+# Cupping sessions
+def _insert_samples(conn, session_id, samples, start):
+    columns = SAMPLE_COLUMNS + SCORE_COLUMNS
+    conn.executemany(
+        f"INSERT INTO samples (session_id, position, {', '.join(columns)}, flavors, flavor_bits) "
+        f"VALUES (?, ?, {', '.join('?' * len(columns))}, ?, ?)",
+        [
+            (session_id, start + i, *(s.get(c) for c in columns),
+             json.dumps(s["flavors"]) if s.get("flavors") else None, s.get("flavor_bits"))
+            for i, s in enumerate(samples)
+        ],
+    )
+
+
+def _insert_session(conn, user_email, session, sample_batches=None):
+    # Caller holds the transaction. Samples are session["samples"], or come
+    # as an iterable of lists (bulk imports) so they are never all in memory.
+    if sample_batches is None:
+        sample_batches = [session.get("samples", [])]
+    created = session.get("created") or _now()
+    cursor = conn.execute(
+        "INSERT INTO cupping_sessions "
+        "(user_email, name, date, type, is_blind, cups_per_sample, created, score_sheet) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            user_email,
+            session["name"],
+            session["date"],
+            session.get("type"),
+            int(session.get("is_blind", True)),
+            session.get("cups_per_sample", 5),
+            created,
+            session.get("score_sheet"),
+        ),
+    )
+    session_id = cursor.lastrowid
+    # Only what the stats need is kept per sample.
+    written = []
+    for batch in sample_batches:
+        _insert_samples(conn, session_id, batch, len(written))
+        written.extend({"origin": s.get("origin"), "final_score": s.get("final_score")} for s in batch)
+    average = _average([s["final_score"] for s in written])
+    if average is not None:
+        conn.execute("UPDATE cupping_sessions SET avg_score = ? WHERE id = ?", (average, session_id))
+    _update_user_stats(conn, user_email, written, created)
+    _bump_data_version(conn, user_email)
+    return session_id
+
+
+def save_session(conn, user_email, session, sample_batches=None):
+    with conn:
+        return _insert_session(conn, user_email, session, sample_batches)
+
+
+def save_sessions(conn, user_email, sessions):
+    # All or nothing: one transaction for the whole batch.
+    with conn:
+        return [_insert_session(conn, user_email, session) for session in sessions]
+
+
+def list_sessions(conn, user_email, limit=20, cursor=None, sort="date", descending=True,
+                  origin=None, min_score=None):
+    filters = []
+    if origin:
+        filters.append((
+            "EXISTS (SELECT 1 FROM samples WHERE samples.session_id = cupping_sessions.id "
+            "AND samples.origin = ?)", origin,
+        ))
+    if min_score is not None:
+        filters.append(("avg_score >= ?", min_score))
+    sessions = _keyset_page(
+        conn, "cupping_sessions", SESSION_COLUMNS, user_email, SESSION_SORTS[sort],
+        descending, limit, cursor, filters,
+    )
+    _attach_samples(conn, sessions)
+    return sessions
+
+
+def iter_sessions(conn, user_email, batch_size=500):
+    # Whole history in keyset-paginated batches, newest first.
+    cursor = None
+    while batch := list_sessions(conn, user_email, limit=batch_size, cursor=cursor):
+        yield batch
+        cursor = next_cursor(batch)
+
+
+def iter_score_sheets(conn, user_email, batch_size=500):
+    cursor = conn.execute(
+        "SELECT id, score_sheet FROM cupping_sessions "
+        "WHERE user_email = ? AND score_sheet IS NOT NULL ORDER BY date DESC, id DESC",
+        (user_email,),
+    )
+    while rows := cursor.fetchmany(batch_size):
+        yield rows
+
+
+def _attach_samples(conn, sessions):
+    if not sessions:
+        return
+    by_id = {s["id"]: s for s in sessions}
+    for s in sessions:
+        s["samples"] = []
+    placeholders = ",".join("?" * len(by_id))
+    # Explicit columns: internal ones (flavor_bits) stay out of page and API dicts.
+    rows = conn.execute(
+        f"SELECT session_id, {', '.join(SAMPLE_COLUMNS + SCORE_COLUMNS)}, flavors FROM samples "
+        f"WHERE session_id IN ({placeholders}) ORDER BY session_id, position",
+        list(by_id),
+    )
+    for row in rows:
+        sample = dict(row)
+        sample["flavors"] = json.loads(sample["flavors"]) if sample["flavors"] else []
+        by_id[sample.pop("session_id")]["samples"].append(sample)
+
+
+def scored_samples_query(user_email):
+    # Flat (one row per sample) view used by the analytics pipeline.
+    return (
+        "SELECT cs.id AS session_id, cs.date, s.origin, s.process, s.lot_id, "
+        + ", ".join(f"s.{c}" for c in SCORE_COLUMNS)
+        + " FROM cupping_sessions cs JOIN samples s ON s.session_id = cs.id "
+        "WHERE cs.user_email = ? ORDER BY cs.date, cs.id, s.position"
+    ), (user_email,)
+
+
+def iter_scored_samples(conn, user_email, batch_size=5000):
+    # Every scored sample with what the similarity index needs, newest first.
+    cursor = conn.execute(
+        "SELECT s.id, cs.id, cs.date, cs.name, s.name, s.origin, s.lot_id, s.flavors, "
+        + ", ".join(f"s.{c}" for c in SCORE_COLUMNS)
+        + " FROM cupping_sessions cs JOIN samples s ON s.session_id = cs.id "
+        "WHERE cs.user_email = ? AND s.final_score IS NOT NULL "
+        "ORDER BY cs.date DESC, cs.id DESC, s.position",
+        (user_email,),
+    )
+    while rows := cursor.fetchmany(batch_size):
+        yield rows
+
+
+def session_origins(conn, user_email):
+    rows = conn.execute(
+        "SELECT DISTINCT s.origin FROM cupping_sessions cs JOIN samples s ON s.session_id = cs.id "
+        "WHERE cs.user_email = ? AND s.origin IS NOT NULL AND s.origin != '' ORDER BY s.origin",
+        (user_email,),
+    )
+    return [row[0] for row in rows]
+
+
+# Coffee reviews
+REVIEW_FIELDS = (
+    "name", "producer", "origin", "cost", "roast_level", "form", "preparation",
+    "rating", "flavor_notes", "recommend", "buy_again", "date",
+)
+
+
+def _insert_review(conn, user_email, review):
+    # Caller holds the transaction.
+    cursor = conn.execute(
+        f"INSERT INTO coffee_reviews (user_email, {', '.join(REVIEW_FIELDS)}, created) "
+        f"VALUES (?, {', '.join('?' * len(REVIEW_FIELDS))}, ?)",
+        (user_email, *(review.get(f) for f in REVIEW_FIELDS), _now()),
+    )
+    _update_review_stats(conn, user_email)
+    _bump_data_version(conn, user_email)
+    return cursor.lastrowid
+
+
+def save_review(conn, user_email, review):
+    with conn:
+        return _insert_review(conn, user_email, review)
+
+
+def save_reviews(conn, user_email, reviews):
+    with conn:
+        return [_insert_review(conn, user_email, review) for review in reviews]
+
+
+def list_reviews(conn, user_email, limit=20, cursor=None, sort="date", descending=True,
+                 origin=None, roast_level=None, min_rating=None):
+    filters = []
+    if origin:
+        filters.append(("origin = ?", origin))
+    if roast_level:
+        filters.append(("roast_level = ?", roast_level))
+    if min_rating is not None:
+        filters.append(("rating >= ?", min_rating))
+    return _keyset_page(
+        conn, "coffee_reviews", "*", user_email, REVIEW_SORTS[sort],
+        descending, limit, cursor, filters,
+    )
+
+
+def iter_reviews(conn, user_email, batch_size=500):
+    cursor = None
+    while batch := list_reviews(conn, user_email, limit=batch_size, cursor=cursor):
+        yield batch
+        cursor = next_cursor(batch)
+
+
+def review_origins(conn, user_email):
+    rows = conn.execute(
+        "SELECT DISTINCT origin FROM coffee_reviews "
+        "WHERE user_email = ? AND origin IS NOT NULL AND origin != '' ORDER BY origin",
+        (user_email,),
+    )
+    return [row[0] for row in rows]
+
+
+# Drafts: in-progress form fields, one row per field so a save only writes
+# the fields that changed.
+def save_draft(conn, user_email, form, fields):
+    now = _now()
+    with conn:
+        conn.executemany(
+            "INSERT INTO drafts (user_email, form, field, value, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (user_email, form, field) DO UPDATE SET "
+            "value = excluded.value, updated = excluded.updated",
+            [(user_email, form, field, json.dumps(value), now) for field, value in fields.items()],
+        )
+
+
+def load_draft(conn, user_email, form):
+    rows = conn.execute(
+        "SELECT field, value FROM drafts WHERE user_email = ? AND form = ?", (user_email, form)
+    ).fetchall()
+    return {row["field"]: json.loads(row["value"]) for row in rows}
+
+
+def delete_draft(conn, user_email, form):
+    with conn:
+        conn.execute("DELETE FROM drafts WHERE user_email = ? AND form = ?", (user_email, form))
+
+
+# Login sessions shared by every app worker (see session_store). Expiry is
+# wall-clock epoch seconds, comparable across processes.
+def get_app_session(conn, token_id):
+    row = conn.execute(
+        "SELECT email, state, expires FROM app_sessions WHERE token_id = ?", (token_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"email": row["email"], "state": json.loads(row["state"]), "expires": row["expires"]}
+
+
+def insert_app_session(conn, token_id, record):
+    # Only a login creates a row.
+    with conn:
+        conn.execute(
+            "INSERT INTO app_sessions (token_id, email, state, expires) VALUES (?, ?, ?, ?)",
+            (token_id, record["email"], json.dumps(record["state"]), record["expires"]),
+        )
+
+
+def update_app_sessions(conn, records):
+    # {token_id: record}, written in one transaction. Rows deleted meanwhile
+    # (a logout on another worker, a purge) stay deleted.
+    with conn:
+        conn.executemany(
+            "UPDATE app_sessions SET state = ?, expires = ? WHERE token_id = ?",
+            [(json.dumps(r["state"]), r["expires"], token_id) for token_id, r in records.items()],
+        )
+
+
+def take_app_session(conn, token_id):
+    # Reads and deletes a row; of two concurrent callers only one gets it.
+    record = get_app_session(conn, token_id)
+    with conn:
+        deleted = conn.execute("DELETE FROM app_sessions WHERE token_id = ?", (token_id,)).rowcount
+    return record if deleted else None
+
+
+def delete_app_session(conn, token_id):
+    with conn:
+        conn.execute("DELETE FROM app_sessions WHERE token_id = ?", (token_id,))
+
+
+def purge_app_sessions(conn, now):
+    with conn:
+        conn.execute("DELETE FROM app_sessions WHERE expires < ?", (now,))
+
+
+def get_or_create_secret(conn, name, value):
+    # The first worker to ask stores `value`; every worker then reads the same one.
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO app_secrets (name, value) VALUES (?, ?)", (name, value))
+    return conn.execute("SELECT value FROM app_secrets WHERE name = ?", (name,)).fetchone()[0]
+
+
+# Flavor profiles: descriptor sets as fixed-width bitsets (see flavor_profiles).
+def save_flavor_profile(conn, user_email, name, bits):
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO flavor_profiles (user_email, name, bits, created) VALUES (?, ?, ?, ?)",
+            (user_email, name, bits, _now()),
+        )
+        _bump_data_version(conn, user_email)
+    return cursor.lastrowid
+
+
+def list_flavor_profiles(conn, user_email):
+    rows = conn.execute(
+        "SELECT id, name, bits, created FROM flavor_profiles WHERE user_email = ? ORDER BY id DESC",
+        (user_email,),
+    )
+    return [dict(row) for row in rows]
+
+
+def samples_missing_flavor_bits(conn, user_email):
+    # (sample id, flavors JSON) for samples with flavor notes but no bitset.
+    return conn.execute(
+        "SELECT s.id, s.flavors FROM samples s JOIN cupping_sessions cs ON cs.id = s.session_id "
+        "WHERE cs.user_email = ? AND s.flavors IS NOT NULL AND s.flavor_bits IS NULL",
+        (user_email,),
+    ).fetchall()
+
+
+def set_flavor_bits(conn, rows):
+    # rows: (bits, sample id)
+    with conn:
+        conn.executemany("UPDATE samples SET flavor_bits = ? WHERE id = ?", rows)
+
+
+def flavor_bits(conn, user_email):
+    # Every bitset of the user: sample flavor notes and saved profiles.
+    rows = conn.execute(
+        "SELECT s.flavor_bits FROM samples s JOIN cupping_sessions cs ON cs.id = s.session_id "
+        "WHERE cs.user_email = ? AND s.flavor_bits IS NOT NULL "
+        "UNION ALL SELECT bits FROM flavor_profiles WHERE user_email = ?",
+        (user_email, user_email),
+    )
+    return [row[0] for row in rows]
+
+
+# Guests: a throwaway identity per guest visit, deleted with all its data on
+# logout, or after a while when the tab was just closed.
+GUEST_TABLES = (
+    "cupping_sessions", "coffee_reviews", "flavor_profiles", "user_stats",
+    "user_origins", "user_badges", "drafts", "data_versions",
+)
+
+
+def create_guest(conn):
+    email = f"guest-{secrets.token_hex(8)}@guest.invalid"
+    with conn:
+        conn.execute("INSERT INTO guests (email, created) VALUES (?, ?)", (email, _now()))
+    return email
+
+
+def delete_guest(conn, email):
+    # Samples go with their sessions (ON DELETE CASCADE).
+    with conn:
+        for table in GUEST_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE user_email = ?", (email,))
+        conn.execute("DELETE FROM guests WHERE email = ?", (email,))
+
+
+def purge_guests(conn, max_age):
+    cutoff = (datetime.now() - timedelta(seconds=max_age)).isoformat(timespec="seconds")
+    for (email,) in conn.execute("SELECT email FROM guests WHERE created < ?", (cutoff,)).fetchall():
+        delete_guest(conn, email)
@@ -1,9 +1,27 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, date
+import hashlib
 import json
+import time
+import auth
+import badges
+import calibration
+import flavor_wheel
+import instrumentation
+import reference
+import scoring
+import services
+import session_store
+import similarity
+import storage
+import theme
+import translations
+import warmup
+
+# pandas, plotly and the modules built on them (analytics, exporter, importer,
+# trends) are imported inside the functions that use them, so the login page
+# and dashboard render without loading them; warmup preloads them in the
+# background once the login page is up.
 
 # Page configuration
 st.set_page_config(
@@ -14,143 +32,330 @@ st.set_page_config(
 )
 
 # Hide Streamlit branding and add responsive CSS
-st.markdown("""
-<style>
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    [data-testid="stToolbar"] {display: none;}
-    [data-testid="stDecoration"] {display: none;}
-    [data-testid="stHeader"] {display: none;}
-    
-    /* Responsive Design */
-    .main-header {
-        background: linear-gradient(135deg, #8B4513, #D2B48C);
-        padding: clamp(1rem, 3vw, 2rem);
-        border-radius: 15px;
-        margin-bottom: clamp(1rem, 3vw, 2rem);
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(139, 69, 19, 0.3);
-    }
-    
-    .main-header h1 {
-        color: white;
-        margin: 0;
-        font-size: clamp(1.5rem, 5vw, 3rem);
-        font-weight: 700;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .coffee-card {
-        background: linear-gradient(145deg, #F5F5DC, #E6E6D3);
-        padding: clamp(1rem, 3vw, 2rem);
-        border-radius: 15px;
-        border-left: 5px solid #8B4513;
-        margin: clamp(0.5rem, 2vw, 1rem) 0;
-        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .coffee-card:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 8px 24px rgba(0,0,0,0.15);
-    }
-    
-    .metric-card {
-        background: linear-gradient(145deg, #FFFFFF, #F8F8F8);
-        padding: clamp(1rem, 2.5vw, 1.5rem);
-        border-radius: 12px;
-        text-align: center;
-        border: 2px solid #8B4513;
-        margin: 0.5rem 0;
-        transition: transform 0.2s ease;
-    }
-    
-    .metric-card:hover {
-        transform: scale(1.02);
-    }
-    
-    .stButton > button {
-        background: linear-gradient(45deg, #8B4513, #A0522D);
-        color: white;
-        border-radius: 25px;
-        border: none;
-        padding: clamp(0.5rem, 2vw, 0.8rem) clamp(1rem, 3vw, 1.5rem);
-        font-size: clamp(0.8rem, 2vw, 1rem);
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 12px rgba(139, 69, 19, 0.3);
-        width: 100%;
-    }
-    
-    .stButton > button:hover {
-        background: linear-gradient(45deg, #A0522D, #CD853F);
-        transform: translateY(-2px);
-        box-shadow: 0 6px 16px rgba(139, 69, 19, 0.4);
-    }
-    
-    .language-selector {
-        position: fixed;
-        top: 10px;
-        right: 10px;
-        z-index: 999;
-        background: rgba(139, 69, 19, 0.95);
-        padding: 0.5rem;
-        border-radius: 10px;
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Mobile Responsive */
-    @media (max-width: 768px) {
-        .language-selector {
-            position: relative;
-            top: auto;
-            right: auto;
-            margin-bottom: 1rem;
-            width: 100%;
-        }
-        
-        .stColumns > div {
-            margin-bottom: 1rem;
-        }
-        
-        .main-header {
-            margin-bottom: 1rem;
-        }
-    }
-    
-    /* Tablet Responsive */
-    @media (min-width: 769px) and (max-width: 1024px) {
-        .main-header h1 {
-            font-size: 2.5rem;
-        }
-    }
-    
-    /* Desktop Responsive */
-    @media (min-width: 1025px) {
-        .main-header {
-            padding: 2rem;
-        }
-    }
-    
-    .flavor-category {
-        background: linear-gradient(145deg, #FFF8DC, #F0E68C);
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-left: 4px solid #DAA520;
+@instrumentation.traced
+def inject_css():
+    # A <link> to the cached static stylesheet (inline CSS without static serving)
+    st.markdown(theme.stylesheet(st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
+
+COPYRIGHT = "© 2025 Rodrigo Bermudez - Cafe Cultura LLC. All rights reserved."
+
+# Storage
+GUEST_TTL = 24 * 60 * 60
+
+def get_db():
+    return storage.get_connection()
+
+def current_user_email():
+    return st.session_state.get('user_data', {}).get('email', '')
+
+def is_guest():
+    return st.session_state.get('user_data', {}).get('user_type') == 'guest'
+
+# Authentication
+DEMO_EMAIL = "demo@coffee.com"
+DEMO_USER = {
+    'name': 'Demo User',
+    'company': 'Coffee Cultura LLC',
+    'role': 'Q Grader',
+    'member_since': 'January 2025',
+}
+
+# The login lives in session_store, not in this process. The token itself
+# stays in session state; the URL carries a single-use handle for it, so a
+# reload that lands on another worker (or follows a restart) logs back in.
+# The handle is swapped for a fresh one on redeem and every HANDLE_TTL / 2 of
+# use, and each swap discards the old one: only the URL currently shown can
+# log in, once, until it is used or expires. SHARED_STATE is what such a
+# reload restores.
+SESSION_PARAM = "session"
+SHARED_STATE = ("user_data", "language")
+
+@st.cache_resource(show_spinner=False)
+def register_listeners():
+    # Once per process: badges are awarded inside every save transaction.
+    badges.register()
+
+@st.cache_resource(show_spinner=False)
+def ensure_demo_user():
+    auth.ensure_user(get_db(), DEMO_EMAIL, DEMO_USER, "demo123")
+
+def start_session(user):
+    st.session_state.logged_in = True
+    st.session_state.user_data = {
+        'name': user['name'],
+        'email': user['email'],
+        'company': user['company'],
+        'role': user['role'],
+        'member_since': user['member_since'],
+        'user_type': 'demo' if user['email'] == DEMO_EMAIL else 'registered'
     }
-    
-    .sca-scoring {
-        background: linear-gradient(145deg, #E6F3FF, #CCE7FF);
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-left: 4px solid #4169E1;
+    st.session_state.auth_token = auth.issue_token(user['email'], shared_state())
+    publish_handle()
+
+def shared_state():
+    return {key: st.session_state[key] for key in SHARED_STATE if key in st.session_state}
+
+def publish_handle():
+    session_store.discard_handle(st.session_state.pop('session_handle', None))
+    handle = session_store.issue_handle(st.session_state.get('auth_token'))
+    if handle is None:
+        st.query_params.pop(SESSION_PARAM, None)
+        return
+    st.session_state.session_handle = handle
+    st.session_state.handle_issued = time.time()
+    st.query_params[SESSION_PARAM] = handle
+
+def restore_session():
+    handle = st.query_params.get(SESSION_PARAM)
+    if st.session_state.get('logged_in'):
+        stale = time.time() - st.session_state.get('handle_issued', 0) > session_store.HANDLE_TTL / 2
+        if stale and st.session_state.get('auth_token'):
+            publish_handle()
+        return
+    if not handle:
+        return
+    token = session_store.redeem_handle(handle)
+    if token is None:
+        del st.query_params[SESSION_PARAM]
+        return
+    st.session_state.update(session_store.load(token)['state'])
+    st.session_state.auth_token = token
+    st.session_state.logged_in = True
+    publish_handle()
+
+def sync_session():
+    # Queued, not written: session_store flushes changes in the background.
+    token = st.session_state.get('auth_token')
+    if st.session_state.get('logged_in') and token:
+        session_store.update(token, shared_state())
+
+def end_session():
+    # Typed-in drafts outlive the login; the next account must not see them.
+    if drafts_enabled():
+        flush_drafts()
+    for form in DRAFT_FORMS:
+        forget_draft_state(form)
+    if is_guest():
+        storage.delete_guest(get_db(), current_user_email())
+    auth.revoke_token(st.session_state.pop('auth_token', None))
+    session_store.discard_handle(st.session_state.pop('session_handle', None))
+    st.query_params.pop(SESSION_PARAM, None)
+    st.session_state.logged_in = False
+
+def session_is_valid():
+    # Guests have no account and so no token.
+    if is_guest():
+        return True
+    return auth.check_token(st.session_state.get('auth_token')) is not None
+
+# Analytics (cached per user until a save bumps the data version)
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_analytics(user_email, data_version):
+    import analytics
+    return analytics.summarize(get_db(), user_email)
+
+# Figures are cached prepared (see figures.py) per query, data version,
+# language and theme. cache_resource hands out the cached object itself:
+# a cache_data copy would unpickle every figure on every rerun.
+CHART_LAYOUT = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def build_analytics_figures(user_email, data_version, language, theme_type):
+    import pandas as pd
+    import plotly.express as px
+    import figures
+    import trends
+    text = lambda key: translations.get_text(language, key)
+    summary = load_analytics(user_email, data_version)
+    prepared = {}
+    
+    scores = summary["session_scores"]["score"].to_numpy()
+    kept = trends.lttb(range(len(scores)), scores)
+    score_df = pd.DataFrame({text('chart_session'): kept + 1, text('chart_score'): scores[kept]})
+    fig = px.line(score_df, x=text('chart_session'), y=text('chart_score'),
+                 title=text('chart_scores_over_time'),
+                 markers=True)
+    fig.update_layout(**CHART_LAYOUT)
+    prepared["session_scores"] = figures.prepare(fig)
+    
+    counts = summary["origin_counts"]
+    fig = px.pie(values=counts.values, names=counts.index, title=text('chart_origins_cupped'))
+    fig.update_layout(**CHART_LAYOUT)
+    prepared["origin_counts"] = figures.prepare(fig)
+    
+    return prepared
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_samples_frame(user_email, data_version):
+    import analytics
+    # Shared and read-only: cache_resource hands out the frame itself, not a copy.
+    return analytics.load_samples_frame(get_db(), user_email)
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def build_trend_figure(user_email, data_version, scope, key, resolution, window, language, theme_type):
+    import plotly.graph_objects as go
+    import figures
+    import trends
+    text = lambda key: translations.get_text(language, key)
+    frame = load_samples_frame(user_email, data_version)
+    points, total = trends.trend(frame, scope, key, resolution, window, span=2 * window)
+    # Day strings are half the size of full timestamps in the chart JSON
+    dates = points['date'].dt.strftime('%Y-%m-%d')
+    fig = go.Figure()
+    fig.add_scatter(x=dates, y=points['score'], mode='markers', name=text('chart_score'),
+                    marker=dict(size=5, opacity=0.5))
+    fig.add_scatter(x=dates, y=points['rolling'], mode='lines',
+                    name=text('chart_rolling_average').format(window=window))
+    fig.add_scatter(x=dates, y=points['ema'], mode='lines', name='EMA', line=dict(dash='dot'))
+    fig.add_hline(y=85, line_dash="dash", line_color=figures.THEMES[theme_type]["target"],
+                 annotation_text=text('chart_target'))
+    fig.update_layout(title=text('chart_score_evolution'), xaxis_title=text('chart_date'),
+                      yaxis_title=text('chart_score'), legend=dict(orientation='h', y=-0.2), **CHART_LAYOUT)
+    return figures.prepare(fig), len(points), total
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def build_flavor_figure(user_email, data_version, language, theme_type):
+    import plotly.express as px
+    import figures
+    # Share of descriptor mentions per wheel category (sample notes and saved profiles)
+    counts = load_analytics(user_email, data_version)["flavor_categories"]
+    percentages = (100 * counts / counts.sum()).round(1)
+    
+    fig = px.bar(x=[flavor_wheel.category_label(c) for c in counts.index], y=percentages.to_numpy(), 
+                title=translations.get_text(language, 'chart_flavor_categories'),
+                labels={'x': '', 'y': '%'},
+                color=percentages.to_numpy(),
+                color_continuous_scale='Viridis')
+    fig.update_layout(showlegend=False, coloraxis_showscale=False, **CHART_LAYOUT)
+    return figures.prepare(fig)
+
+def chart_context():
+    # The language and theme a cached figure was built for.
+    import figures
+    return get_language(), figures.theme_type(st.context.theme.type)
+
+@instrumentation.traced
+def get_trend_choices(scope):
+    import trends
+    email = current_user_email()
+    return trends.choices(load_samples_frame(email, storage.get_data_version(get_db(), email)), scope)
+
+@instrumentation.traced
+def get_analytics():
+    email = current_user_email()
+    return load_analytics(email, storage.get_data_version(get_db(), email))
+
+@instrumentation.traced
+def get_analytics_figures():
+    email = current_user_email()
+    return build_analytics_figures(email, storage.get_data_version(get_db(), email), *chart_context())
+
+@instrumentation.traced
+def show_chart(fig):
+    st.plotly_chart(fig, use_container_width=True)
+
+# Per-user stats (one row lookup; maintained by storage on every save)
+@instrumentation.traced
+def get_user_metrics():
+    stats = storage.get_user_stats(get_db(), current_user_email())
+    if stats['badge_rules'] != badges.rules()['hash']:
+        # Rules changed since this user's last evaluation: award and recount.
+        badges.sync(get_db(), current_user_email(), stats)
+        stats = storage.get_user_stats(get_db(), current_user_email())
+    mean, previous, best = stats['score_mean'], stats['previous_mean'], stats['max_score']
+    return {
+        'sessions': (f"{stats['sessions']}", f"+{stats['month_sessions']}" if stats['month_sessions'] else None),
+        'average_score': ("—" if mean is None else f"{mean:.1f}",
+                          None if mean is None or previous is None else f"{mean - previous:+.1f}"),
+        'highest_score': ("—" if best is None else f"{best:.1f}", None),
+        'origins': (f"{stats['origins']}", f"+{stats['month_origins']}" if stats['month_origins'] else None),
+        'badges': (f"{stats['badges']}", None),
     }
-</style>
-""", unsafe_allow_html=True)
+
+def flash(message, celebrate=False):
+    # Shown after the full rerun that refreshes sidebar stats following a save.
+    st.session_state.flash = (message, celebrate)
+
+def show_flash():
+    if 'flash' in st.session_state:
+        message, celebrate = st.session_state.pop('flash')
+        st.success(message)
+        if celebrate:
+            st.balloons()
+
+# Drafts: form fields are saved as they are typed, so a reconnect, logout or
+# trip to another page doesn't lose them. Widget keys are "<form>.<field>".
+DRAFT_FORMS = ("new_session", "review")
+DRAFT_DEBOUNCE = 2.0  # seconds between draft writes
+
+def drafts_enabled():
+    return not is_guest()
+
+def draft_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+def restore_draft(form, defaults):
+    # Seeds widget state when the form's widgets have none (fresh login,
+    # reconnect, back from another page), judged by the first default's key.
+    # Returns the restored fields, or None if the widgets are already live.
+    if next(iter(defaults)) in st.session_state:
+        return None
+    pending = st.session_state.setdefault('draft_pending', {}).setdefault(form, {})
+    saved = storage.load_draft(get_db(), current_user_email(), form) if drafts_enabled() else {}
+    draft = {**saved, **pending}
+    for key, value in {**defaults, **draft}.items():
+        if isinstance(defaults.get(key), date) and isinstance(value, str):
+            value = date.fromisoformat(value)
+        st.session_state[key] = value
+    # The first tracked run after a restore is the baseline, so untouched
+    # defaults are never written.
+    st.session_state.setdefault('draft_saved', {})[form] = None
+    return draft
+
+def track_draft(form, fields):
+    # Queues fields that changed since the last write; writes at most once
+    # per DRAFT_DEBOUNCE, and the autosave timer picks up the rest.
+    if not drafts_enabled():
+        return
+    saved = st.session_state.setdefault('draft_saved', {}).get(form)
+    pending = st.session_state.setdefault('draft_pending', {}).setdefault(form, {})
+    if saved is None:
+        st.session_state.draft_saved[form] = {key: draft_value(value) for key, value in fields.items()}
+        return
+    for key, value in fields.items():
+        value = draft_value(value)
+        if saved.get(key) != value:
+            saved[key] = pending[key] = value
+    if pending:
+        if time.monotonic() - st.session_state.get('draft_flushed', 0.0) >= DRAFT_DEBOUNCE:
+            flush_drafts()
+        else:
+            autosave_drafts()
+
+def flush_drafts():
+    pending = st.session_state.get('draft_pending', {})
+    for form, fields in pending.items():
+        if fields:
+            storage.save_draft(get_db(), current_user_email(), form, fields)
+            fields.clear()
+    st.session_state.draft_flushed = time.monotonic()
+
+@st.fragment(run_every=DRAFT_DEBOUNCE)
+def autosave_drafts():
+    if any(st.session_state.get('draft_pending', {}).values()):
+        flush_drafts()
+
+def clear_draft(form):
+    storage.delete_draft(get_db(), current_user_email(), form)
+    forget_draft_state(form)
+
+def forget_draft_state(form):
+    # Widget keys for the form; they are seeded again from the stored draft
+    # the next time the form is shown.
+    for key in [k for k in st.session_state if k.startswith(f"{form}.")]:
+        del st.session_state[key]
+    for store in ('draft_pending', 'draft_saved'):
+        st.session_state.get(store, {}).pop(form, None)
 
 # Language management
 def get_language():
@@ -158,101 +363,43 @@ def get_language():
         st.session_state.language = 'en'
     return st.session_state.language
 
+@instrumentation.traced
 def get_text(key):
-    translations = {
-        'en': {
-            'app_title': '☕ Professional Coffee Cupping App',
-            'subtitle': 'SCA Protocol Implementation',
-            'login': 'Login',
-            'logout': 'Logout',
-            'email': 'Email Address',
-            'password': 'Password',
-            'demo_credentials': 'Demo Credentials',
-            'dashboard': 'Dashboard',
-            'cupping_sessions': 'Cupping Sessions', 
-            'profile': 'My Profile',
-            'flavor_wheel': 'SCA Flavor Wheel',
-            'analytics': 'Analytics',
-            'total_sessions': 'Total Sessions',
-            'average_score': 'Average Score',
-            'coffee_origins': 'Coffee Origins',
-            'badges_earned': 'Badges Earned',
-            'create_new_session': 'Create New Session',
-            'session_name': 'Session Name',
-            'cupping_date': 'Cupping Date',
-            'number_of_samples': 'Number of Samples',
-            'cups_per_sample': 'Cups per Sample',
-            'welcome_user': 'Welcome',
-            'new_session': 'New Session',
-            'my_sessions': 'My Sessions',
-            'analysis': 'Analysis',
-            'recent_sessions': 'Recent Sessions',
-            'score_trends': 'Score Trends',
-            'flavor_profile': 'Flavor Profile Distribution',
-            'coffee_reviews': 'Coffee Reviews'
-        },
-        'es': {
-            'app_title': '☕ App Profesional de Cata de Café',
-            'subtitle': 'Implementación Protocolo SCA',
-            'login': 'Iniciar Sesión',
-            'logout': 'Cerrar Sesión',
-            'email': 'Correo Electrónico',
-            'password': 'Contraseña',
-            'demo_credentials': 'Credenciales Demo',
-            'dashboard': 'Panel Principal',
-            'cupping_sessions': 'Sesiones de Cata',
-            'profile': 'Mi Perfil',
-            'flavor_wheel': 'Rueda de Sabores SCA',
-            'analytics': 'Analíticas',
-            'total_sessions': 'Total Sesiones',
-            'average_score': 'Puntaje Promedio',
-            'coffee_origins': 'Orígenes de Café',
-            'badges_earned': 'Insignias Obtenidas',
-            'create_new_session': 'Crear Nueva Sesión',
-            'session_name': 'Nombre de la Sesión',
-            'cupping_date': 'Fecha de Cata',
-            'number_of_samples': 'Número de Muestras',
-            'cups_per_sample': 'Tazas por Muestra',
-            'welcome_user': 'Bienvenido',
-            'new_session': 'Nueva Sesión',
-            'my_sessions': 'Mis Sesiones',
-            'analysis': 'Análisis',
-            'recent_sessions': 'Sesiones Recientes',
-            'score_trends': 'Tendencias de Puntaje',
-            'flavor_profile': 'Distribución de Perfil de Sabor',
-            'coffee_reviews': 'Reseñas de Café'
-        }
-    }
-    return translations.get(get_language(), {}).get(key, key)
+    return translations.get_text(get_language(), key)
 
 def main():
+    register_listeners()
+    inject_css()
+    restore_session()
+    
     # Language selector
     with st.container():
         col1, col2 = st.columns([4, 1])
         with col2:
-            language_options = {"🇺🇸 English": "en", "🇪🇸 Español": "es"}
+            language_codes = list(translations.LANGUAGES)
             selected_lang = st.selectbox(
                 "🌐",
-                options=list(language_options.keys()),
-                index=0 if get_language() == 'en' else 1,
+                options=language_codes,
+                index=language_codes.index(get_language()) if get_language() in language_codes else 0,
+                format_func=translations.LANGUAGES.get,
                 key="language_selector"
             )
-            if language_options[selected_lang] != get_language():
-                st.session_state.language = language_options[selected_lang]
+            if selected_lang != get_language():
+                st.session_state.language = selected_lang
                 st.rerun()
     
     # Header
-    st.markdown(f'''
-    <div class="main-header">
-        <h1>{get_text("app_title")}</h1>
-        <p style="color: #F5F5DC; margin: 0; font-size: 1.2rem;">{get_text("subtitle")}</p>
-    </div>
-    ''', unsafe_allow_html=True)
+    st.markdown(theme.card("header", title=get_text("app_title"), subtitle=get_text("subtitle")),
+                unsafe_allow_html=True)
     
     # Authentication
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
     
+    if st.session_state.logged_in and not session_is_valid():
+        end_session()
+        st.warning("⏰ Your session expired. Please log in again.")
+    
     if not st.session_state.logged_in:
         show_login()
     else:
@@ -260,13 +407,15 @@ def main():
     
     # Footer with copyright - appears on all pages including login
     st.markdown("---")
-    st.markdown(
-        "<div style='text-align: center; color: #666; font-size: 0.8rem; padding: 1rem;'>"
-        "© 2025 Rodrigo Bermudez - Cafe Cultura LLC. All rights reserved."
-        "</div>", 
-        unsafe_allow_html=True
-    )
+    st.markdown(theme.card("footer", text=COPYRIGHT), unsafe_allow_html=True)
+    
+    sync_session()
+    
+    # The page is out; load the heavy page modules while the user reads it
+    # (once per process, a no-op after that).
+    warmup.start()
 
+@instrumentation.traced
 def show_login():
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -291,6 +440,7 @@ def show_login():
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+@instrumentation.traced
 def show_login_form():
     st.markdown("### 🔐 Login to Your Account")
     
@@ -301,40 +451,16 @@ def show_login_form():
     remember_me = st.checkbox("🔒 Remember me", key="remember_login")
     
     if st.button(f"🚀 {get_text('login')}", use_container_width=True, key="login_btn"):
-        # Check demo credentials
-        if email == "demo@coffee.com" and password == "demo123":
-            st.session_state.logged_in = True
-            st.session_state.user_data = {
-                'name': 'Demo User',
-                'email': email,
-                'company': 'Coffee Cultura LLC',
-                'role': 'Q Grader',
-                'member_since': 'January 2025',
-                'user_type': 'demo'
-            }
-            st.success("✅ Demo login successful!")
+        ensure_demo_user()
+        user = auth.authenticate(get_db(), email, password)
+        if user is not None:
+            start_session(user)
+            st.success("✅ Login successful!")
             st.rerun()
-        
-        # Check registered users
-        elif 'registered_users' in st.session_state and email in st.session_state.registered_users:
-            stored_user = st.session_state.registered_users[email]
-            if stored_user['password'] == password:  # In production, use hashed passwords
-                st.session_state.logged_in = True
-                st.session_state.user_data = {
-                    'name': stored_user['name'],
-                    'email': email,
-                    'company': stored_user['company'],
-                    'role': stored_user['role'],
-                    'member_since': stored_user['member_since'],
-                    'user_type': 'registered'
-                }
-                st.success("✅ Login successful!")
-                st.rerun()
-            else:
-                st.error("❌ Invalid password")
         else:
-            st.error("❌ User not found. Please register first or use demo credentials.")
+            st.error("❌ Invalid email or password. Please register first or use demo credentials.")
 
+@instrumentation.traced
 def show_register_form():
     st.markdown("### 🆕 Create New Account")
     
@@ -349,32 +475,12 @@ def show_register_form():
         
         st.markdown("#### ☕ Professional Information")
         company = st.text_input("Company/Organization", help="Optional: Your workplace or organization")
-        role = st.selectbox("Your Role", [
-            "Coffee Enthusiast",
-            "Home Barista", 
-            "Professional Barista",
-            "Q Grader",
-            "Coffee Roaster",
-            "Café Owner",
-            "Coffee Trader",
-            "Coffee Producer",
-            "Coffee Consultant",
-            "Other"
-        ])
+        role = st.selectbox("Your Role", reference.get("roles"))
         
         st.markdown("#### ☕ Coffee Experience")
-        experience_level = st.selectbox("Cupping Experience", [
-            "Beginner (New to cupping)",
-            "Intermediate (Some experience)",
-            "Advanced (Regular cupper)",
-            "Expert (Professional level)"
-        ])
+        experience_level = st.selectbox("Cupping Experience", reference.get("experience_levels"))
         
-        favorite_origins = st.multiselect("Favorite Coffee Origins", [
-            "Ethiopia", "Colombia", "Brazil", "Guatemala", "Kenya", 
-            "Costa Rica", "Jamaica", "Yemen", "Panama", "Honduras",
-            "El Salvador", "Nicaragua", "Peru", "Bolivia", "Mexico"
-        ])
+        favorite_origins = st.multiselect("Favorite Coffee Origins", reference.get("origins"))
         
         st.markdown("#### 📋 Preferences")
         newsletter = st.checkbox("📧 Subscribe to cupping tips and updates")
@@ -408,25 +514,20 @@ def show_register_form():
                 errors.append("❌ You must accept the Terms of Service")
             
             # Check if email already exists
-            if 'registered_users' in st.session_state and email in st.session_state.registered_users:
+            if storage.user_exists(get_db(), auth.normalize_email(email)):
                 errors.append("❌ Email already registered. Please use a different email or login.")
             
             # Check if demo email
-            if email == "demo@coffee.com":
+            if auth.normalize_email(email) == DEMO_EMAIL:
                 errors.append("❌ This email is reserved for demo purposes. Please use a different email.")
             
             if errors:
                 for error in errors:
                     st.error(error)
             else:
-                # Initialize registered users if not exists
-                if 'registered_users' not in st.session_state:
-                    st.session_state.registered_users = {}
-                
                 # Create new user
                 new_user = {
                     'name': full_name.strip(),
-                    'password': password,  # In production, hash this!
                     'company': company.strip() if company else "Independent",
                     'role': role,
                     'experience_level': experience_level,
@@ -434,14 +535,11 @@ def show_register_form():
                     'newsletter': newsletter,
                     'public_profile': public_profile,
                     'member_since': datetime.now().strftime('%B %Y'),
-                    'registration_date': datetime.now().isoformat(),
-                    'total_sessions': 0,
-                    'average_score': 0,
-                    'badges': []
+                    'registration_date': datetime.now().isoformat()
                 }
                 
                 # Store user
-                st.session_state.registered_users[email] = new_user
+                auth.register(get_db(), email, new_user, password)
                 
                 st.success("✅ Account created successfully!")
                 st.success("🎉 Welcome to the Coffee Cupping Community!")
@@ -456,6 +554,7 @@ def show_register_form():
                 if favorite_origins:
                     st.markdown(f"**Favorite Origins:** {', '.join(favorite_origins)}")
 
+@instrumentation.traced
 def show_guest_mode():
     st.markdown("### 👥 Guest Mode")
     
@@ -472,10 +571,13 @@ def show_guest_mode():
     guest_name = st.text_input("Your Name (Optional)", placeholder="Coffee Lover")
     
     if st.button("🚀 Enter as Guest", use_container_width=True):
+        # Every guest gets an identity of their own; nothing is shared with
+        # the next visitor, and abandoned guest data is purged after a day.
+        storage.purge_guests(get_db(), GUEST_TTL)
         st.session_state.logged_in = True
         st.session_state.user_data = {
             'name': guest_name if guest_name else 'Guest User',
-            'email': 'guest@demo.com',
+            'email': storage.create_guest(get_db()),
             'company': 'Guest Session',
             'role': 'Coffee Enthusiast',
             'member_since': 'Today',
@@ -484,6 +586,7 @@ def show_guest_mode():
         st.success("✅ Welcome, Guest!")
         st.rerun()
 
+@instrumentation.traced
 def show_main_app():
     user_data = st.session_state.get('user_data', {})
     
@@ -499,7 +602,7 @@ def show_main_app():
     
     with col3:
         if st.button(get_text("logout")):
-            st.session_state.logged_in = False
+            end_session()
             st.rerun()
     
     # Sidebar navigation
@@ -520,9 +623,12 @@ def show_main_app():
         
         # User stats in sidebar
         st.markdown("### 📊 Quick Stats")
-        st.metric(get_text("total_sessions"), "15", "3")
-        st.metric(get_text("average_score"), "87.2", "2.1")
-        st.metric(get_text("badges_earned"), "8", "2")
+        metrics = get_user_metrics()
+        st.metric(get_text("total_sessions"), *metrics['sessions'])
+        st.metric(get_text("average_score"), *metrics['average_score'])
+        st.metric(get_text("badges_earned"), *metrics['badges'])
+    
+    show_flash()
     
     # Main content routing
     if selected_page.endswith(get_text('dashboard')):
@@ -536,29 +642,28 @@ def show_main_app():
     elif selected_page.endswith(get_text('analytics')):
         show_analytics()
 
+RECENT_SESSIONS = 4
+
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_dashboard():
     st.title(f"📊 {get_text('dashboard')}")
     
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
+    metrics = get_user_metrics()
     metrics_data = [
-        (get_text("total_sessions"), "15", "3", "↗️"),
-        (get_text("average_score"), "87.2", "2.1", "📈"),
-        (get_text("coffee_origins"), "12", "2", "🌍"),
-        (get_text("badges_earned"), "8", "2", "🏆")
+        (get_text("total_sessions"), *metrics['sessions'], "↗️"),
+        (get_text("average_score"), *metrics['average_score'], "📈"),
+        (get_text("coffee_origins"), *metrics['origins'], "🌍"),
+        (get_text("badges_earned"), *metrics['badges'], "🏆")
     ]
     
     for i, (metric, value, delta, icon) in enumerate(metrics_data):
         with [col1, col2, col3, col4][i]:
-            st.markdown(f'''
-            <div class="metric-card">
-                <h3 style="margin: 0; color: #8B4513;">{icon}</h3>
-                <h2 style="margin: 0; color: #2C1810;">{value}</h2>
-                <p style="margin: 0; color: #666; font-size: 0.9rem;">{metric}</p>
-                <p style="margin: 0; color: #28a745; font-size: 0.8rem;">+{delta}</p>
-            </div>
-            ''', unsafe_allow_html=True)
+            st.markdown(theme.card("metric", icon=icon, value=value, label=metric, delta=delta),
+                        unsafe_allow_html=True)
     
     st.markdown("---")
     
@@ -568,28 +673,16 @@ def show_dashboard():
     with col1:
         st.subheader(f"📅 {get_text('recent_sessions')}")
         
-        # Sample recent sessions data
-        recent_sessions = [
-            {"name": "Ethiopian Yirgacheffe", "date": "2025-01-15", "score": 89.5, "origin": "Ethiopia"},
-            {"name": "Colombian Supremo", "date": "2025-01-12", "score": 85.2, "origin": "Colombia"},
-            {"name": "Brazilian Santos", "date": "2025-01-10", "score": 82.8, "origin": "Brazil"},
-            {"name": "Guatemalan Antigua", "date": "2025-01-08", "score": 91.0, "origin": "Guatemala"},
-        ]
+        # Latest sessions, newest first (one indexed page read)
+        recent_sessions = storage.list_sessions(get_db(), current_user_email(), limit=RECENT_SESSIONS)
+        if not recent_sessions:
+            st.info("No cupping sessions yet. Create your first one under Cupping Sessions.")
         
         for session in recent_sessions:
-            st.markdown(f'''
-            <div class="coffee-card">
-                <div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap;">
-                    <div>
-                        <h4 style="margin: 0; color: #8B4513;">☕ {session["name"]}</h4>
-                        <p style="margin: 0; color: #666;">🌍 {session["origin"]} | 📅 {session["date"]}</p>
-                    </div>
-                    <div style="text-align: right;">
-                        <h3 style="margin: 0; color: #2C1810;">⭐ {session["score"]}</h3>
-                    </div>
-                </div>
-            </div>
-            ''', unsafe_allow_html=True)
+            origins = sorted({s['origin'] for s in session['samples'] if s['origin']})
+            score = "—" if session['avg_score'] is None else f"{session['avg_score']:.1f}"
+            st.markdown(theme.card("recent_session", name=session["name"], date=session["date"],
+                                   origin=", ".join(origins) or "—", score=score), unsafe_allow_html=True)
     
     with col2:
         st.subheader("🎯 Quick Actions")
@@ -606,54 +699,71 @@ def show_dashboard():
         st.markdown("---")
         
         st.subheader("🏆 Latest Achievement")
-        st.markdown('''
-        <div style="background: linear-gradient(45deg, #FFD700, #FFA500); padding: 1rem; border-radius: 10px; text-align: center; color: white;">
-            <h3 style="margin: 0;">🏅 Master Cupper</h3>
-            <p style="margin: 0;">Completed 10 sessions with 85+ score</p>
-        </div>
-        ''', unsafe_allow_html=True)
+        earned = badges.earned_badges(get_db(), current_user_email())
+        if earned:
+            badge = earned[0][0]
+            st.markdown(theme.card("badge", icon=badge["icon"], name=badge["name"],
+                                   description=badge["description"]), unsafe_allow_html=True)
+        else:
+            st.info("Complete your first cupping session to earn a badge.")
 
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_cupping_sessions():
     st.title(f"☕ {get_text('cupping_sessions')}")
     
-    # Tabs for different session views
-    tab1, tab2, tab3, tab4 = st.tabs([
-        get_text("new_session"),
-        get_text("my_sessions"), 
-        get_text("analysis"),
-        get_text("flavor_wheel")
-    ])
-    
-    with tab1:
-        show_new_session_form()
-    
-    with tab2:
-        show_my_sessions()
-    
-    with tab3:
-        show_session_analysis()
+    # Only the selected view runs; each view is its own fragment so its widgets
+    # rerun just that view instead of the whole script
+    views = {
+        "new_session": show_new_session_form,
+        "my_sessions": show_my_sessions,
+        "analysis": show_session_analysis,
+        "flavor_wheel": show_flavor_wheel,
+        "similar_lots": show_similar_lots,
+        "calibration": show_calibration,
+    }
+    selected_view = st.segmented_control(
+        get_text("cupping_sessions"),
+        options=list(views),
+        format_func=get_text,
+        default="new_session",
+        required=True,
+        key="cupping_view",
+        label_visibility="collapsed"
+    )
     
-    with tab4:
-        show_flavor_wheel()
+    views[selected_view]()
 
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_new_session_form():
+    import pandas as pd
+    import importer
     st.subheader(f"🆕 {get_text('create_new_session')}")
     
+    restore_draft("new_session", {
+        'new_session.samples': 3,
+        'new_session.cups': 5,
+        'new_session.date': date.today(),
+        'new_session.blind': True,
+        'new_session.notes': True,
+    })
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown('<div class="sca-scoring">', unsafe_allow_html=True)
         st.markdown("### 📋 Session Details")
         
-        session_name = st.text_input(get_text("session_name"))
-        cupping_date = st.date_input(get_text("cupping_date"), value=date.today())
-        num_samples = st.number_input(get_text("number_of_samples"), 1, 8, 3)
-        cups_per_sample = st.number_input(get_text("cups_per_sample"), 3, 5, 5)
+        session_name = st.text_input(get_text("session_name"), key="new_session.name")
+        cupping_date = st.date_input(get_text("cupping_date"), key="new_session.date")
+        num_samples = st.number_input(get_text("number_of_samples"), 1, 8, key="new_session.samples")
+        cups_per_sample = st.number_input(get_text("cups_per_sample"), 3, 5, key="new_session.cups")
         
         st.markdown("### ⚙️ Session Settings")
-        evaluation_type = st.selectbox("Evaluation Protocol", ["SCA Standard", "COE Protocol", "Custom"])
-        is_blind = st.checkbox("Blind Cupping", value=True)
-        allow_notes = st.checkbox("Allow Tasting Notes", value=True)
+        evaluation_type = st.selectbox("Evaluation Protocol", reference.get("protocols"), key="new_session.protocol")
+        is_blind = st.checkbox("Blind Cupping", key="new_session.blind")
+        allow_notes = st.checkbox("Allow Tasting Notes", key="new_session.notes")
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -664,14 +774,17 @@ def show_new_session_form():
         samples_data = []
         for i in range(num_samples):
             st.markdown(f"**Sample {i+1}:**")
-            sample_name = st.text_input(f"Name", key=f"sample_name_{i}")
-            origin = st.text_input(f"Origin", key=f"origin_{i}")
-            process = st.selectbox(f"Process", ["Washed", "Natural", "Honey", "Pulped Natural"], key=f"process_{i}")
+            sample_name = st.text_input(f"Name", key=f"new_session.sample_name.{i}")
+            origin = st.text_input(f"Origin", key=f"new_session.origin.{i}")
+            process = st.selectbox(f"Process", reference.get("processes"), key=f"new_session.process.{i}")
+            flavors = st.multiselect("Flavor notes", flavor_wheel.DESCRIPTORS, key=f"new_session.flavors.{i}",
+                                     placeholder="Descriptors from the flavor wheel")
             
             samples_data.append({
                 'name': sample_name,
                 'origin': origin,
-                'process': process
+                'process': process,
+                'flavors': flavors
             })
             
             if i < num_samples - 1:
@@ -681,155 +794,494 @@ def show_new_session_form():
     
     st.markdown("---")
     
+    # Score sheet: one editable cups x attributes grid per sample
+    st.markdown('<div class="sca-scoring">', unsafe_allow_html=True)
+    st.markdown("### 🎯 Score Sheet")
+    
+    sheet = scoring.new_sheet(num_samples, cups_per_sample)
+    for i in range(num_samples):
+        # Editors start from the sheet restored with the draft, if it fits.
+        restored = st.session_state.get(f"new_session.sheet.{i}")
+        if restored is not None and len(restored) == cups_per_sample:
+            sheet[i] = restored
+    sample_tabs = st.tabs([
+        samples_data[i]['name'] or f"Sample {i+1}" for i in range(num_samples)
+    ])
+    for i, tab in enumerate(sample_tabs):
+        with tab:
+            edited = st.data_editor(
+                score_sheet_frame(sheet[i]),
+                column_config=score_sheet_column_config(),
+                key=f"new_session.editor.{i}.{cups_per_sample}",
+                use_container_width=True
+            )
+            sheet[i] = edited.to_numpy(dtype='float32')
+    
+    draft_fields = {
+        'new_session.name': session_name,
+        'new_session.date': cupping_date,
+        'new_session.samples': num_samples,
+        'new_session.cups': cups_per_sample,
+        'new_session.protocol': evaluation_type,
+        'new_session.blind': is_blind,
+        'new_session.notes': allow_notes,
+    }
+    for i, sample in enumerate(samples_data):
+        draft_fields[f"new_session.sample_name.{i}"] = sample['name']
+        draft_fields[f"new_session.origin.{i}"] = sample['origin']
+        draft_fields[f"new_session.process.{i}"] = sample['process']
+        draft_fields[f"new_session.flavors.{i}"] = sample['flavors']
+        draft_fields[f"new_session.sheet.{i}"] = sheet[i].tolist()
+    track_draft("new_session", draft_fields)
+    
+    scores = scoring.sample_score_dicts(sheet)
+    st.dataframe(pd.DataFrame({
+        'Sample': [s['name'] or f"Sample {i+1}" for i, s in enumerate(samples_data)],
+        'Defects': [s['defects'] for s in scores],
+        'Final Score': [s['final_score'] for s in scores],
+    }), hide_index=True, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
     if st.button(f"🚀 {get_text('create_new_session')}", use_container_width=True):
         if session_name:
-            st.success(f"✅ Created session: '{session_name}' with {num_samples} samples")
-            st.balloons()
-            
-            # Store session in session state
-            if 'cupping_sessions' not in st.session_state:
-                st.session_state.cupping_sessions = []
-            
             new_session = {
                 'name': session_name,
                 'date': cupping_date.strftime('%Y-%m-%d'),
                 'samples': samples_data,
                 'type': evaluation_type,
-                'created': datetime.now().strftime('%Y-%m-%d %H:%M')
+                'is_blind': is_blind,
+                'cups_per_sample': cups_per_sample
             }
             
-            st.session_state.cupping_sessions.append(new_session)
+            try:
+                services.create_session(get_db(), current_user_email(), new_session, sheet)
+            except services.ValidationError as e:
+                st.error(f"❌ {e}")
+            else:
+                clear_draft("new_session")
+                flash(f"✅ Created session: '{session_name}' with {num_samples} samples", celebrate=True)
+                st.rerun()
         else:
             st.error("❌ Please enter a session name")
+    
+    # Bulk import for offer sheets too large to type in
+    with st.expander("📥 Bulk Import Lots (CSV/Excel)", expanded=False):
+        st.caption("Columns: lot_id, origin (required) · name, process, variety, altitude, moisture (optional)")
+        upload = st.file_uploader("Offer sheet", type=["csv", "xlsx"], key="lot_import_file")
+        
+        if upload is not None:
+            try:
+                valid_lots, rejected_lots = check_lot_file(hashlib.sha256(upload.getbuffer()).hexdigest(),
+                                                           upload.name, upload)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            
+            st.success(f"✅ {valid_lots} valid lots")
+            if not rejected_lots.empty:
+                st.warning(f"⚠️ {len(rejected_lots)} rows skipped")
+                st.dataframe(rejected_lots, hide_index=True, use_container_width=True)
+            
+            if st.button(f"🚀 Create session from {valid_lots} lots",
+                         disabled=not valid_lots, use_container_width=True):
+                if session_name:
+                    upload.seek(0)
+                    try:
+                        services.import_session(get_db(), current_user_email(), {
+                            'name': session_name,
+                            'date': cupping_date.strftime('%Y-%m-%d'),
+                            'type': evaluation_type,
+                            'is_blind': is_blind,
+                            'cups_per_sample': cups_per_sample
+                        }, importer.iter_samples(upload, upload.name))
+                    except services.ValidationError as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        flash(f"✅ Created session: '{session_name}' with {valid_lots} samples")
+                        st.rerun()
+                else:
+                    st.error("❌ Please enter a session name")
 
+@st.cache_data(max_entries=8, show_spinner="Validating lots...")
+def check_lot_file(digest, filename, _upload):
+    # Keyed on the file's hash; only the lot count and rejected rows are cached.
+    import importer
+    _upload.seek(0)
+    return importer.check_lots(_upload, filename)
+
+@instrumentation.traced
+def score_sheet_frame(cups):
+    import pandas as pd
+    frame = pd.DataFrame(cups, columns=scoring.ATTRIBUTES,
+                         index=[f"Cup {c+1}" for c in range(len(cups))])
+    for flag in scoring.CUP_FLAGS:
+        column = scoring.ATTRIBUTES[flag]
+        frame[column] = frame[column].astype(bool)
+    frame[scoring.ATTRIBUTES[scoring.DEFECTS]] = frame[scoring.ATTRIBUTES[scoring.DEFECTS]].astype(int)
+    return frame
+
+def score_sheet_column_config():
+    config = {}
+    for i, attribute in enumerate(scoring.ATTRIBUTES):
+        label = scoring.ATTRIBUTE_LABELS[attribute]
+        if i in scoring.CUP_FLAGS:
+            config[attribute] = st.column_config.CheckboxColumn(label)
+        elif i == scoring.DEFECTS:
+            config[attribute] = st.column_config.SelectboxColumn(
+                label, options=scoring.DEFECT_INTENSITIES, required=True,
+                help="0 = none, 2 = taint, 4 = fault")
+        else:
+            config[attribute] = st.column_config.NumberColumn(
+                label, min_value=scoring.QUALITY_MIN, max_value=scoring.QUALITY_MAX,
+                step=scoring.QUALITY_STEP, format="%.2f", required=True)
+    return config
+
+@st.fragment
+@instrumentation.traced(fragment=True)
+def show_calibration():
+    st.subheader(f"👥 {get_text('calibration')}")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        with st.form("calibration_create"):
+            st.markdown("### 🆕 New Calibration Table")
+            table_name = st.text_input("Table Name")
+            num_samples = st.number_input(get_text("number_of_samples"), 1, 12, 6)
+            cups_per_sample = st.number_input(get_text("cups_per_sample"), 3, 5, 5)
+            
+            if st.form_submit_button("🚀 Create Table", use_container_width=True):
+                if table_name:
+                    code = calibration.create_session(
+                        get_db(), current_user_email(), table_name, num_samples, cups_per_sample
+                    )
+                    st.session_state.calibration_code = code
+                    st.success(f"✅ Table created. Share join code **{code}** with your panel.")
+                else:
+                    st.error("❌ Please enter a table name")
+    
+    with col2:
+        with st.form("calibration_join"):
+            st.markdown("### 🔗 Join Table")
+            join_code = st.text_input("Join Code")
+            
+            if st.form_submit_button("🔗 Join", use_container_width=True):
+                if calibration.get_session(get_db(), join_code.strip().upper()):
+                    st.session_state.calibration_code = join_code.strip().upper()
+                else:
+                    st.error("❌ No calibration table with that code")
+    
+    code = st.session_state.get('calibration_code')
+    if not code:
+        st.info("📝 Create a calibration table or join one with its code.")
+        return
+    
+    session = calibration.get_session(get_db(), code)
+    st.markdown("---")
+    st.markdown(f"### ☕ {session['name']} · `{code}`")
+    
+    col1, col2 = st.columns([3, 2])
+    
+    with col1:
+        show_calibration_scoring(session)
+    
+    with col2:
+        show_calibration_panel(session['id'])
+
+@instrumentation.traced
+def show_calibration_scoring(session):
+    sample = st.selectbox("Sample", range(session['num_samples']),
+                          format_func=lambda i: f"Sample {i+1}", key="calibration_sample")
+    
+    versions = st.session_state.setdefault('calibration_versions', {})
+    version_key = (session['id'], sample)
+    sheet, version = calibration.get_submission(get_db(), session['id'], current_user_email(), sample)
+    versions.setdefault(version_key, version)
+    if sheet is None:
+        sheet = scoring.new_sheet(1, session['cups_per_sample'])[0]
+    
+    edited = st.data_editor(
+        score_sheet_frame(sheet),
+        column_config=score_sheet_column_config(),
+        key=f"calibration_sheet_{session['id']}_{sample}_{version}",
+        use_container_width=True
+    )
+    sheet = edited.to_numpy(dtype='float32')
+    st.markdown(f"**Final Score:** {scoring.sample_scores(sheet[None])[0, -1]:.2f}")
+    
+    if st.button("📤 Submit Score", use_container_width=True, key="calibration_submit"):
+        new_version = calibration.submit_score(
+            get_db(), session['id'], current_user_email(), sample, sheet, versions[version_key]
+        )
+        if new_version is None:
+            del versions[version_key]
+            st.warning("⚠️ This score was changed from another device. Reloaded the latest version.")
+        else:
+            versions[version_key] = new_version
+            st.success("✅ Score submitted!")
+
+@st.fragment(run_every=5)
+@instrumentation.traced(fragment=True)
+def show_calibration_panel(session_id):
+    import pandas as pd
+    st.markdown("### 📡 Live Panel")
+    
+    # Only aggregates changed since the last poll are read back
+    panel = st.session_state.setdefault(f"calibration_panel_{session_id}", {'seq': 0, 'samples': {}})
+    for change in calibration.changes_since(get_db(), session_id, panel['seq']):
+        panel['samples'][change['sample']] = change
+        panel['seq'] = change['seq']
+    
+    if not panel['samples']:
+        st.info("⏳ Waiting for the first scores...")
+        return
+    
+    rows = [panel['samples'][sample] for sample in sorted(panel['samples'])]
+    st.dataframe(pd.DataFrame({
+        'Sample': [f"Sample {r['sample']+1}" for r in rows],
+        'Cuppers': [r['cuppers'] for r in rows],
+        'Mean': [round(r['mean'], 2) for r in rows],
+        'Std Dev': [round(r['std'], 2) for r in rows],
+        'Agreement': [r['agreement'] for r in rows],
+    }), column_config={
+        'Agreement': st.column_config.ProgressColumn('Agreement', min_value=0.0, max_value=1.0, format="%.2f")
+    }, hide_index=True, use_container_width=True)
+
+# Paginated lists
+PAGE_SIZES = [10, 20, 50]
+SESSION_SORT_OPTIONS = {
+    ("date", True): "📅 Newest first",
+    ("date", False): "📅 Oldest first",
+    ("score", True): "⭐ Highest score",
+    ("score", False): "⭐ Lowest score",
+}
+REVIEW_SORT_OPTIONS = {
+    ("date", True): "📅 Newest first",
+    ("date", False): "📅 Oldest first",
+    ("rating", True): "⭐ Top rated",
+    ("rating", False): "⭐ Lowest rated",
+}
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_origins(user_email, data_version, kind):
+    if kind == "sessions":
+        return storage.session_origins(get_db(), user_email)
+    return storage.review_origins(get_db(), user_email)
+
+@instrumentation.traced
+def load_page(key, fetch, filters, page_size):
+    # Cursor stack per list; any filter/sort/page-size change starts over
+    pager = st.session_state.setdefault(key, {'filters': None, 'cursors': [None]})
+    if pager['filters'] != (filters, page_size):
+        pager['filters'], pager['cursors'] = (filters, page_size), [None]
+    
+    # One extra row tells us whether there is a next page without counting
+    rows = fetch(limit=page_size + 1, cursor=pager['cursors'][-1], **filters)
+    return rows[:page_size], len(rows) > page_size, pager
+
+@instrumentation.traced
+def show_page_controls(key, pager, rows, has_next):
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(pager['cursors']) == 1,
+                  on_click=pager['cursors'].pop, use_container_width=True)
+    with col2:
+        st.markdown(theme.card("page_label", text=f"Page {len(pager['cursors'])}"), unsafe_allow_html=True)
+    with col3:
+        st.button("Next ➡️", key=f"{key}_next", disabled=not has_next,
+                  on_click=pager['cursors'].append, args=(storage.next_cursor(rows),),
+                  use_container_width=True)
+
+def show_list_view_toggle(key):
+    return st.segmented_control("View", ["cards", "table"], default="cards", required=True,
+                                format_func={"cards": "🗂️ Cards", "table": "📋 Table"}.get,
+                                key=key, label_visibility="collapsed")
+
+EXPORT_DATASET_LABELS = {
+    "sessions": "Sessions & samples",
+    "cup_scores": "Per-cup scores",
+    "reviews": "Coffee reviews",
+}
+
+@instrumentation.traced
+def show_export_controls(datasets, key):
+    import exporter
+    col1, col2, col3 = st.columns([2, 1, 1], vertical_alignment="bottom")
+    
+    with col1:
+        dataset = st.selectbox("Dataset", datasets, format_func=EXPORT_DATASET_LABELS.get,
+                               key=f"{key}_dataset", disabled=len(datasets) == 1)
+    with col2:
+        fmt = st.selectbox("Format", list(exporter.FORMATS), format_func=str.upper, key=f"{key}_format")
+    
+    # Generated only on click; Streamlit holds the finished file in memory
+    email = current_user_email()
+    with col3:
+        st.download_button(
+            "📤 Export",
+            data=lambda: exporter.open_export(email, dataset, fmt),
+            file_name=exporter.file_name(dataset, fmt),
+            mime=exporter.FORMATS[fmt][0],
+            on_click="ignore",
+            key=f"{key}_download",
+            use_container_width=True
+        )
+
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_my_sessions():
+    import pandas as pd
     st.subheader(f"📋 {get_text('my_sessions')}")
     
-    if 'cupping_sessions' in st.session_state and st.session_state.cupping_sessions:
-        for i, session in enumerate(st.session_state.cupping_sessions):
-            st.markdown(f'''
-            <div class="coffee-card">
-                <h4 style="margin: 0; color: #8B4513;">☕ {session["name"]}</h4>
-                <p style="margin: 0; color: #666;">📅 {session["date"]} | 🌱 {len(session["samples"])} samples | 🔬 {session["type"]}</p>
-                <p style="margin: 0; color: #888; font-size: 0.8rem;">Created: {session["created"]}</p>
-            </div>
-            ''', unsafe_allow_html=True)
-    else:
+    with st.expander("📤 Export", expanded=False):
+        show_export_controls(["sessions", "cup_scores", "reviews"], key="session_export")
+    
+    email = current_user_email()
+    version = storage.get_data_version(get_db(), email)
+    
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        sort, descending = st.selectbox("Sort by", list(SESSION_SORT_OPTIONS),
+                                        format_func=SESSION_SORT_OPTIONS.get, key="session_sort")
+    with col2:
+        origin = st.selectbox("Origin", ["All"] + list(load_origins(email, version, "sessions")),
+                              key="session_origin")
+    with col3:
+        min_score = st.number_input("Min score", 0.0, 100.0, 0.0, step=1.0, key="session_min_score")
+    with col4:
+        page_size = st.selectbox("Per page", PAGE_SIZES, index=1, key="session_page_size")
+    
+    filters = {
+        'sort': sort,
+        'descending': descending,
+        'origin': None if origin == "All" else origin,
+        'min_score': min_score or None,
+    }
+    sessions, has_next, pager = load_page(
+        "session_pager", lambda **kw: storage.list_sessions(get_db(), email, **kw), filters, page_size
+    )
+    
+    if not sessions:
         st.info("📝 No sessions yet. Create your first cupping session!")
+        return
+    
+    if show_list_view_toggle("session_view") == "table":
+        st.dataframe(pd.DataFrame({
+            'Session': [s['name'] for s in sessions],
+            'Date': [s['date'] for s in sessions],
+            'Samples': [len(s['samples']) for s in sessions],
+            'Origins': [', '.join(sorted({x['origin'] for x in s['samples'] if x['origin']})) for s in sessions],
+            'Protocol': [s['type'] for s in sessions],
+            'Avg Score': [s['avg_score'] for s in sessions],
+        }), hide_index=True, use_container_width=True,
+           column_config={'Avg Score': st.column_config.NumberColumn(format="%.2f")})
+    else:
+        for session in sessions:
+            score = f" | ⭐ {session['avg_score']:.2f}" if session['avg_score'] is not None else ""
+            st.markdown(theme.card("session", name=session["name"], date=session["date"],
+                                   samples=len(session["samples"]), type=session["type"], score=score,
+                                   created=session["created"]), unsafe_allow_html=True)
+    
+    show_page_controls("session_pager", pager, sessions, has_next)
 
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_session_analysis():
     st.subheader(f"📊 {get_text('analysis')}")
     
-    # Sample analysis data
+    summary = get_analytics()
+    figures = get_analytics_figures()
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 📈 Score Distribution")
         
-        # Sample data for score distribution
-        scores = [82, 85, 87, 89, 91, 84, 86, 88, 90, 83, 85, 87]
-        score_df = pd.DataFrame({'Session': range(1, len(scores)+1), 'Score': scores})
-        
-        fig = px.line(score_df, x='Session', y='Score', 
-                     title='Cupping Scores Over Time',
-                     markers=True)
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        if summary["session_scores"].empty:
+            st.info("📝 No scored sessions yet.")
+        else:
+            show_chart(figures["session_scores"])
     
     with col2:
         st.markdown("### 🌍 Origin Distribution")
         
-        # Sample data for origins
-        origins = ['Ethiopia', 'Colombia', 'Brazil', 'Guatemala', 'Kenya', 'Costa Rica']
-        counts = [4, 3, 2, 2, 2, 2]
-        
-        fig = px.pie(values=counts, names=origins, title='Coffee Origins Cupped')
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        if summary["origin_counts"].empty:
+            st.info("📝 No origins recorded yet.")
+        else:
+            show_chart(figures["origin_counts"])
 
+def add_flavor_matches():
+    selection = list(st.session_state.get('flavor_selection', []))
+    for flavor in st.session_state.flavor_matches or []:
+        if flavor not in selection:
+            selection.append(flavor)
+    st.session_state.flavor_selection = selection
+    st.session_state.flavor_matches = []
+
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_flavor_wheel():
     st.subheader(f"🎨 {get_text('flavor_wheel')}")
     
     st.success("✅ SCA Flavor Wheel - Professional Implementation")
     
-    # SCA Flavor Wheel Categories
-    flavor_categories = {
-        "🍊 Fruity": {
-            "Citrus Fruit": ["Grapefruit", "Orange", "Lemon", "Lime"],
-            "Berry": ["Blackberry", "Raspberry", "Blueberry", "Strawberry"],
-            "Dried Fruit": ["Raisin", "Prune", "Fig", "Date"],
-            "Other Fruit": ["Coconut", "Cherry", "Pomegranate", "Pineapple"]
-        },
-        "🌸 Floral": {
-            "Black Tea": ["Black Tea"],
-            "Floral": ["Chamomile", "Rose", "Jasmine", "Lavender"]
-        },
-        "🍯 Sweet": {
-            "Brown Sugar": ["Molasses", "Maple Syrup", "Caramelized", "Honey"],
-            "Vanilla": ["Vanilla"],
-            "Cocoa": ["Chocolate", "Dark Chocolate"]
-        },
-        "🥜 Nutty/Cocoa": {
-            "Nutty": ["Peanuts", "Hazelnut", "Almond", "Walnut"],
-            "Cocoa": ["Cocoa", "Dark Chocolate"]
-        },
-        "🌿 Green/Vegetative": {
-            "Olive Oil": ["Olive Oil"],
-            "Raw": ["Green", "Underripe"],
-            "Beany": ["Fresh", "Dark Green"]
-        },
-        "🔥 Roasted": {
-            "Pipe Tobacco": ["Pipe Tobacco"],
-            "Burnt": ["Acrid", "Ashy", "Smoky"],
-            "Cereal": ["Grain", "Malt"]
-        },
-        "🌶️ Spices": {
-            "Pungent": ["Pepper", "Brown Spice"],
-            "Brown Spice": ["Anise", "Nutmeg", "Cinnamon", "Clove"]
-        },
-        "🧪 Other": {
-            "Sour/Fermented": ["Sour", "Alcohol", "Winey", "Fermented"],
-            "Chemical": ["Bitter", "Salty", "Medicinal", "Petroleum"]
-        }
-    }
-    
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.markdown("### 🎯 Select Flavor Descriptors")
         
-        selected_flavors = []
+        search = st.text_input("🔍 Search descriptors", placeholder="e.g. jasmine, cacao, lemn",
+                               key="flavor_search")
+        if search:
+            matches = flavor_wheel.search(search)
+            if matches:
+                st.pills("Matches", matches, selection_mode="multi",
+                         key="flavor_matches", on_change=add_flavor_matches)
+            else:
+                st.caption("No matching descriptors")
         
-        for main_category, subcategories in flavor_categories.items():
-            with st.expander(f"{main_category}", expanded=False):
-                for subcategory, flavors in subcategories.items():
-                    st.markdown(f"**{subcategory}:**")
-                    
-                    # Create columns for better layout
-                    cols = st.columns(min(len(flavors), 3))
-                    for i, flavor in enumerate(flavors):
-                        with cols[i % len(cols)]:
-                            if st.checkbox(flavor, key=f"flavor_{main_category}_{subcategory}_{flavor}"):
-                                selected_flavors.append(flavor)
+        selected_flavors = st.multiselect(
+            "Selected descriptors",
+            flavor_wheel.DESCRIPTORS,
+            key="flavor_selection",
+            placeholder="Type to filter the full wheel"
+        )
+        
+        with st.expander("📚 Browse the wheel", expanded=False):
+            for category in flavor_wheel.CATEGORIES:
+                st.markdown(f"**{flavor_wheel.category_label(category)}**")
+                for subcategory in flavor_wheel.children(category):
+                    st.markdown(f"- *{subcategory}:* {', '.join(flavor_wheel.children(category, subcategory))}")
     
     with col2:
         st.markdown("### 📋 Selected Descriptors")
         
         if selected_flavors:
             for flavor in selected_flavors:
-                st.markdown(f"🏷️ **{flavor}**")
+                category, subcategory = flavor_wheel.parents(flavor)[0]
+                st.markdown(f"🏷️ **{flavor}** · {category} › {subcategory}")
             
             st.markdown("---")
             st.markdown(f"**Total Selected:** {len(selected_flavors)}")
             
+            profile_name = st.text_input("Profile name", placeholder="e.g. Washed Kenya", key="flavor_profile_name")
             if st.button("💾 Save Flavor Profile"):
-                st.success("✅ Flavor profile saved!")
+                try:
+                    services.save_flavor_profile(get_db(), current_user_email(), profile_name, selected_flavors)
+                except services.ValidationError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    flash(f"✅ Flavor profile '{profile_name.strip()}' saved!")
+                    st.rerun()
+            
+            closest = services.closest_flavor_profiles(get_db(), current_user_email(), selected_flavors)
+            if closest:
+                st.markdown("**Closest saved profiles**")
+                for profile in closest:
+                    st.markdown(f"- **{profile['name']}** · {profile['jaccard']:.0%} shared · "
+                                f"{', '.join(profile['flavors'])}")
         else:
             st.info("Select flavors from the wheel to build your profile")
         
@@ -842,6 +1294,50 @@ def show_flavor_wheel():
         - **Maximum 8-10 descriptors** recommended
         """)
 
+SIMILAR_CHOICES = 200  # newest samples offered as the reference
+
+@st.fragment
+@instrumentation.traced(fragment=True)
+def show_similar_lots():
+    import pandas as pd
+    st.subheader(f"🔎 {get_text('similar_lots')}")
+    st.caption("Past samples closest to a reference sample by SCA attribute scores and flavor notes")
+    
+    index = similarity.load_index(get_db(), current_user_email())
+    if not index["rows"]:
+        st.info("Score some samples to search your cupping history")
+        return
+    
+    # Options are sample ids, so the selection survives new samples shifting the list.
+    recent = {row[0]: row for row in index["rows"][:SIMILAR_CHOICES]}
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        reference_id = st.selectbox(
+            "Reference sample", list(recent), key="similar_reference",
+            format_func=lambda i: f"{recent[i][4] or 'Sample'} · {recent[i][3]} ({recent[i][2]}) · {recent[i][8]:.2f}"
+        )
+    with col2:
+        k = st.number_input("Matches", 1, 50, 10, key="similar_count")
+    
+    matches = services.similar_samples(get_db(), current_user_email(), sample_id=reference_id, k=k)
+    if not matches:
+        st.info("No other scored samples yet")
+        return
+    st.dataframe(pd.DataFrame({
+        'Similarity': [m['similarity'] for m in matches],
+        'Sample': [m['name'] for m in matches],
+        'Session': [m['session'] for m in matches],
+        'Date': [m['date'] for m in matches],
+        'Origin': [m['origin'] for m in matches],
+        'Lot': [m['lot_id'] for m in matches],
+        'Score': [m['final_score'] for m in matches],
+        'Flavors': [", ".join(m['flavors']) for m in matches],
+    }), hide_index=True, use_container_width=True, column_config={
+        'Similarity': st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="%.2f"),
+    })
+
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_profile():
     st.title(f"👤 {get_text('profile')}")
     
@@ -859,10 +1355,8 @@ def show_profile():
             role = st.text_input("Role/Position", value=user_data.get('role', ''))
             
             st.markdown("### ☕ Coffee Preferences")
-            favorite_origin = st.selectbox("Favorite Origin", 
-                ["Ethiopia", "Colombia", "Brazil", "Guatemala", "Kenya", "Costa Rica", "Other"])
-            brewing_methods = st.multiselect("Preferred Brewing Methods",
-                ["Pour Over", "French Press", "Espresso", "Aeropress", "Cold Brew", "Chemex"])
+            favorite_origin = st.selectbox("Favorite Origin", reference.get("origins"))
+            brewing_methods = st.multiselect("Preferred Brewing Methods", reference.get("preparations"))
             
             if st.form_submit_button("💾 Update Profile"):
                 st.success("✅ Profile updated successfully!")
@@ -870,77 +1364,53 @@ def show_profile():
     with col2:
         st.subheader("📊 Your Statistics")
         
-        st.markdown(f'''
-        <div class="metric-card">
-            <h3 style="margin: 0;">👤 {user_data.get("name", "User")}</h3>
-            <p style="margin: 0; color: #666;">{user_data.get("role", "Coffee Enthusiast")}</p>
-            <p style="margin: 0; color: #666;">📅 Member since: {user_data.get("member_since", "2025")}</p>
-        </div>
-        ''', unsafe_allow_html=True)
+        st.markdown(theme.card("profile", name=user_data.get("name", "User"),
+                               role=user_data.get("role", "Coffee Enthusiast"),
+                               member_since=user_data.get("member_since", "2025")), unsafe_allow_html=True)
         
-        st.metric("Total Sessions", "15", "3")
-        st.metric("Average Score", "87.2", "2.1")
-        st.metric("Highest Score", "94.5", "")
-        st.metric("Countries Cupped", "8", "1")
+        metrics = get_user_metrics()
+        st.metric("Total Sessions", *metrics['sessions'])
+        st.metric("Average Score", *metrics['average_score'])
+        st.metric("Highest Score", *metrics['highest_score'])
+        st.metric("Countries Cupped", *metrics['origins'])
         
         st.markdown("---")
         st.subheader("🏆 Achievements")
         
-        achievements = [
-            ("🥇 First Cup", "Complete your first cupping"),
-            ("⭐ High Scorer", "Score above 90 points"),
-            ("🌍 World Explorer", "Cup from 5+ countries"),
-            ("🔬 Analyst", "Complete 10+ sessions")
-        ]
-        
-        for icon, desc in achievements:
-            st.markdown(f"✅ **{icon}** {desc}")
+        earned = {badge["id"]: when for badge, when in badges.earned_badges(get_db(), current_user_email())}
+        for badge in badges.rules()["rules"]:
+            if badge["id"] in earned:
+                st.markdown(f"✅ **{badge['icon']} {badge['name']}** {badge['description']} · {earned[badge['id']][:10]}")
+            else:
+                st.markdown(f"🔒 **{badge['icon']} {badge['name']}** {badge['description']}")
 
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_analytics():
+    import pandas as pd
     st.title(f"📈 {get_text('analytics')}")
     
+    summary = get_analytics()
+    
     # Advanced analytics dashboard
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader(f"📊 {get_text('score_trends')}")
         
-        # Generate sample trend data
-        import numpy as np
-        dates = pd.date_range('2024-12-01', '2025-01-15', freq='2D')
-        scores = 85 + np.random.normal(0, 3, len(dates)).cumsum() * 0.1
-        scores = np.clip(scores, 75, 95)
-        
-        trend_df = pd.DataFrame({'Date': dates, 'Score': scores})
-        
-        fig = px.line(trend_df, x='Date', y='Score', 
-                     title='Your Cupping Score Evolution',
-                     markers=True)
-        fig.add_hline(y=85, line_dash="dash", line_color="red", 
-                     annotation_text="Target: 85 points")
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        if summary["session_scores"].empty:
+            st.info("📝 Score some cups to see your trend.")
+        else:
+            show_score_trend()
     
     with col2:
         st.subheader(f"🎨 {get_text('flavor_profile')}")
         
-        # Sample flavor distribution
-        flavors = ['Fruity', 'Floral', 'Sweet', 'Nutty', 'Spicy', 'Roasted']
-        percentages = [25, 15, 20, 18, 12, 10]
-        
-        fig = px.bar(x=flavors, y=percentages, 
-                    title='Your Most Used Flavor Categories',
-                    color=percentages,
-                    color_continuous_scale='Viridis')
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            showlegend=False
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        if summary["flavor_categories"].empty:
+            st.info("🎨 Add flavor notes to your samples or save a flavor profile to see your categories.")
+        else:
+            email = current_user_email()
+            show_chart(build_flavor_figure(email, storage.get_data_version(get_db(), email), *chart_context()))
     
     # Detailed analytics
     st.markdown("---")
@@ -950,90 +1420,170 @@ def show_analytics():
     
     with col1:
         st.markdown("### 🎯 SCA Categories Average")
-        categories = ['Fragrance/Aroma', 'Flavor', 'Aftertaste', 'Acidity', 'Body', 'Balance', 'Overall']
-        scores = [8.2, 8.5, 8.1, 8.7, 8.3, 8.4, 8.6]
         
-        for cat, score in zip(categories, scores):
-            st.metric(cat, f"{score}/10", f"+{round(score-8, 1)}")
+        for cat, score in summary["attribute_means"].items():
+            st.metric(cat, f"{score:.1f}/10", f"{score - 8:+.1f}")
     
     with col2:
         st.markdown("### 🌍 Origin Performance")
-        origins = ['Ethiopia', 'Colombia', 'Brazil', 'Guatemala']
-        avg_scores = [89.2, 87.5, 84.8, 91.0]
         
-        for origin, score in zip(origins, avg_scores):
-            st.metric(f"{origin}", f"{score}", f"+{round(score-85, 1)}")
+        for origin, score in summary["origin_averages"].head(4).items():
+            st.metric(f"{origin}", f"{score:.1f}", f"{score - 85:+.1f}")
     
     with col3:
         st.markdown("### 📅 Monthly Progress")
-        months = ['Nov 2024', 'Dec 2024', 'Jan 2025']
-        monthly_avg = [84.2, 86.1, 87.8]
         
-        for month, avg in zip(months, monthly_avg):
-            st.metric(month, f"{avg}", f"+{round(avg-84, 1)}")
+        monthly = summary["monthly_progress"].tail(4)
+        deltas = monthly.diff()
+        for month, avg in monthly.tail(3).items():
+            delta = deltas[month]
+            st.metric(month, f"{avg:.1f}", None if pd.isna(delta) else f"{delta:+.1f}")
+
+TREND_SCOPES = {"all": "All samples", "origin": "By origin", "lot": "By lot"}
+
+@instrumentation.traced
+def show_score_trend():
+    import trends
+    col1, col2 = st.columns(2)
+    with col1:
+        scope = st.selectbox("Series", list(TREND_SCOPES), format_func=TREND_SCOPES.get, key="trend_scope")
+    key = None
+    if scope != "all":
+        options = get_trend_choices(scope)
+        if not options:
+            st.info(f"No {scope}s recorded yet")
+            return
+        with col2:
+            key = st.selectbox(scope.capitalize(), options, key=f"trend_{scope}")
+    
+    col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+    with col1:
+        resolution = st.segmented_control("Resolution", list(trends.RESOLUTIONS), default="session",
+                                          required=True, format_func=str.capitalize, key="trend_resolution")
+    with col2:
+        window = st.number_input("Window", 2, 52, 4, key="trend_window")
+    
+    email = current_user_email()
+    fig, shown, total = build_trend_figure(email, storage.get_data_version(get_db(), email),
+                                          scope, key, resolution, window, *chart_context())
+    show_chart(fig)
+    if shown < total:
+        st.caption(f"Showing {shown} of {total} points; peaks and dips are kept")
 
+@st.fragment
+@instrumentation.traced(fragment=True)
 def show_coffee_reviews():
     st.title(f"📝 {get_text('coffee_reviews')}")
     
     st.markdown("### ☕ Coffee Bag Evaluation")
     
-    with st.form("simple_coffee_review"):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            coffee_name = st.text_input("Coffee Name")
-            producer = st.text_input("Producer/Roaster")
-            origin = st.selectbox("Origin", ["", "Ethiopia", "Colombia", "Brazil", "Guatemala", "Other"])
-            cost = st.number_input("Cost (USD)", min_value=0.0, step=0.50, format="%.2f")
-            
-        with col2:
-            roast_level = st.selectbox("Roast Level", ["", "Light", "Medium", "Dark"])
-            coffee_form = st.radio("Form", ["Whole Bean", "Pre-Ground"])
-            preparation = st.selectbox("Preparation", ["", "Pour Over", "French Press", "Espresso", "Other"])
-            rating = st.select_slider("Rating", options=[1,2,3,4,5], value=3, format_func=lambda x: "⭐" * x)
-        
-        flavor_notes = st.text_area("Flavor Notes")
-        would_recommend = st.radio("Would recommend?", ["Yes", "Maybe", "No"])
-        would_buy_again = st.radio("Buy again?", ["Yes", "Maybe", "No"])
+    restore_draft("review", {'review.rating': 3})
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        coffee_name = st.text_input("Coffee Name", key="review.name")
+        producer = st.text_input("Producer/Roaster", key="review.producer")
+        origin = st.selectbox("Origin", ("", *reference.get("origins")), key="review.origin")
+        cost = st.number_input("Cost (USD)", min_value=0.0, step=0.50, format="%.2f", key="review.cost")
         
-        if st.form_submit_button("Save Review"):
-            if coffee_name:
-                if 'coffee_reviews' not in st.session_state:
-                    st.session_state.coffee_reviews = []
-                
-                review = {
-                    'name': coffee_name,
-                    'producer': producer,
-                    'origin': origin,
-                    'cost': cost,
-                    'roast_level': roast_level,
-                    'form': coffee_form,
-                    'preparation': preparation,
-                    'rating': rating,
-                    'flavor_notes': flavor_notes,
-                    'recommend': would_recommend,
-                    'buy_again': would_buy_again,
-                    'date': datetime.now().strftime('%Y-%m-%d')
-                }
-                
-                st.session_state.coffee_reviews.append(review)
-                st.success("✅ Review saved!")
+    with col2:
+        roast_level = st.selectbox("Roast Level", ("", *reference.get("roast_levels")), key="review.roast_level")
+        coffee_form = st.radio("Form", reference.get("forms"), key="review.form")
+        preparation = st.selectbox("Preparation", ("", *reference.get("preparations")), key="review.preparation")
+        rating = st.select_slider("Rating", options=[1,2,3,4,5], format_func=lambda x: "⭐" * x, key="review.rating")
+    
+    flavor_notes = st.text_area("Flavor Notes", key="review.flavor_notes")
+    would_recommend = st.radio("Would recommend?", ["Yes", "Maybe", "No"], key="review.recommend")
+    would_buy_again = st.radio("Buy again?", ["Yes", "Maybe", "No"], key="review.buy_again")
+    
+    review = {
+        'name': coffee_name,
+        'producer': producer,
+        'origin': origin,
+        'cost': cost,
+        'roast_level': roast_level,
+        'form': coffee_form,
+        'preparation': preparation,
+        'rating': rating,
+        'flavor_notes': flavor_notes,
+        'recommend': would_recommend,
+        'buy_again': would_buy_again,
+    }
+    track_draft("review", {f"review.{field}": value for field, value in review.items()})
+    
+    if st.button("Save Review"):
+        if coffee_name:
+            review['date'] = datetime.now().strftime('%Y-%m-%d')
+            try:
+                services.create_review(get_db(), current_user_email(), review)
+            except services.ValidationError as e:
+                st.error(f"❌ {e}")
             else:
-                st.error("Please enter a coffee name")
-    
-    # Show reviews
-    if 'coffee_reviews' in st.session_state and st.session_state.coffee_reviews:
-        st.markdown("### 📋 My Reviews")
-        for review in st.session_state.coffee_reviews:
-            st.markdown(f'''
-            <div class="coffee-card">
-                <h4>☕ {review["name"]}</h4>
-                <p>🌍 {review["origin"]} | 🏷️ {review["producer"]} | {'⭐' * review["rating"]}</p>
-                <p>💰 ${review["cost"]:.2f} | 🔥 {review["roast_level"]} | ☕ {review["preparation"]}</p>
-                <p><em>"{review["flavor_notes"]}"</em></p>
-                <p>👍 Recommend: {review["recommend"]} | 🔄 Buy again: {review["buy_again"]}</p>
-            </div>
-            ''', unsafe_allow_html=True)
+                clear_draft("review")
+                flash("✅ Review saved!")
+                st.rerun()
+        else:
+            st.error("Please enter a coffee name")
+    
+    show_my_reviews()
+
+@st.fragment
+@instrumentation.traced(fragment=True)
+def show_my_reviews():
+    import pandas as pd
+    email = current_user_email()
+    version = storage.get_data_version(get_db(), email)
+    if not storage.list_reviews(get_db(), email, limit=1):
+        return
+    
+    st.markdown("### 📋 My Reviews")
+    show_export_controls(["reviews"], key="review_export")
+    
+    col1, col2, col3, col4, col5 = st.columns([2, 2, 1, 1, 1])
+    with col1:
+        sort, descending = st.selectbox("Sort by", list(REVIEW_SORT_OPTIONS),
+                                        format_func=REVIEW_SORT_OPTIONS.get, key="review_sort")
+    with col2:
+        origin = st.selectbox("Origin", ["All"] + list(load_origins(email, version, "reviews")),
+                              key="review_origin")
+    with col3:
+        roast_level = st.selectbox("Roast", ("All", *reference.get("roast_levels")), key="review_roast")
+    with col4:
+        min_rating = st.selectbox("Min rating", [1, 2, 3, 4, 5], key="review_min_rating")
+    with col5:
+        page_size = st.selectbox("Per page", PAGE_SIZES, index=1, key="review_page_size")
+    
+    filters = {
+        'sort': sort,
+        'descending': descending,
+        'origin': None if origin == "All" else origin,
+        'roast_level': None if roast_level == "All" else roast_level,
+        'min_rating': None if min_rating == 1 else min_rating,
+    }
+    reviews, has_next, pager = load_page(
+        "review_pager", lambda **kw: storage.list_reviews(get_db(), email, **kw), filters, page_size
+    )
+    
+    if not reviews:
+        st.info("No reviews match these filters.")
+    elif show_list_view_toggle("review_view") == "table":
+        columns = ['name', 'origin', 'producer', 'roast_level', 'preparation', 'rating', 'cost', 'date',
+                   'recommend', 'buy_again', 'flavor_notes']
+        st.dataframe(pd.DataFrame(reviews, columns=columns), hide_index=True, use_container_width=True,
+                     column_config={'cost': st.column_config.NumberColumn(format="$%.2f")})
+    else:
+        for review in reviews:
+            st.markdown(theme.card("review", name=review["name"], origin=review["origin"],
+                                   producer=review["producer"], stars='⭐' * review["rating"],
+                                   cost="—" if review['cost'] is None else f"${review['cost']:.2f}",
+                                   roast_level=review["roast_level"],
+                                   preparation=review["preparation"], flavor_notes=review["flavor_notes"],
+                                   recommend=review["recommend"], buy_again=review["buy_again"]),
+                        unsafe_allow_html=True)
+    
+    show_page_controls("review_pager", pager, reviews, has_next)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with instrumentation.trace("rerun", panel=True):
+        main()
\ No newline at end of file
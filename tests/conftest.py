@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+# Every test gets its own SQLite file; storage opens one connection per
+# thread and path, so switching DB_PATH is enough to isolate them.
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", str(tmp_path / "cupping.db"))
+    return storage.get_connection()
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import api
+import auth
+
+EMAIL = "api@coffee.com"
+
+
+@pytest.fixture
+def client(conn):
+    client = TestClient(api.app)
+    client.headers["Authorization"] = f"Bearer {auth.issue_token(EMAIL)}"
+    return client
+
+
+def test_requires_token(conn):
+    assert TestClient(api.app).get("/api/sessions").status_code == 401
+
+
+def test_flavored_sample_round_trip(client):
+    session = {
+        "name": "Kenya table",
+        "date": "2025-03-01",
+        "cups_per_sample": 3,
+        "samples": [
+            {"name": "Lot 1", "origin": "Kenya", "flavors": ["Jasmine", "Black Tea"], "cups": [{"flavor": 8.5}]},
+            {"name": "Lot 2", "origin": "Kenya"},
+        ],
+    }
+    created = client.post("/api/sessions", json=session)
+    assert created.status_code == 200, created.text
+
+    listed = client.get("/api/sessions")
+    assert listed.status_code == 200, listed.text
+    [saved] = listed.json()["sessions"]
+    assert saved["id"] == created.json()["ids"][0]
+    assert [s["flavors"] for s in saved["samples"]] == [["Jasmine", "Black Tea"], []]
+    assert "flavor_bits" not in saved["samples"][0]
+    assert saved["samples"][0]["final_score"] is not None
+
+
+@pytest.mark.parametrize("cursor", ["5", "[1]", "not json", '["2025-01-01", "x"]', "{}"])
+def test_malformed_cursor_is_a_bad_request(client, cursor):
+    response = client.get("/api/sessions", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert "cursor" in response.json()["error"]
+
+
+def test_cursor_pages_through_sessions(client):
+    client.post("/api/sessions", json=[
+        {"name": f"Table {i}", "date": f"2025-03-0{i}", "samples": [{"name": "Lot"}]} for i in range(1, 4)
+    ])
+    first = client.get("/api/sessions", params={"limit": 2}).json()
+    second = client.get("/api/sessions", params={"limit": 2, "cursor": json.dumps(first["cursor"])}).json()
+    assert [s["name"] for s in first["sessions"] + second["sessions"]] == ["Table 3", "Table 2", "Table 1"]
+
+
+@pytest.mark.parametrize("body", [
+    {"name": "Bad", "samples": ["Lot 1"]},
+    {"name": "Bad", "date": "garbage", "samples": [{"name": "Lot 1"}]},
+    [{"name": "Good", "samples": [{"name": "Lot 1"}]}, {"name": "Bad", "samples": [{"altitude": "high"}]}],
+])
+def test_invalid_sessions_are_bad_requests(client, body):
+    response = client.post("/api/sessions", json=body)
+    assert response.status_code == 400
+    assert client.get("/api/sessions").json()["sessions"] == []
+
+
+def test_invalid_review_is_a_bad_request(client):
+    response = client.post("/api/reviews", json={"name": "Kenya AA", "cost": "abc"})
+    assert response.status_code == 400
+    assert response.json() == {"error": "cost must be a number"}
+
+
+def test_login_issues_a_working_token(conn):
+    auth.register(conn, EMAIL, {"name": "QC"}, "secret")
+    client = TestClient(api.app)
+    assert client.post("/api/login", json={"email": EMAIL, "password": "wrong"}).status_code == 400
+    response = client.post("/api/login", json={"email": EMAIL.upper(), "password": "secret"})
+    assert response.status_code == 200, response.text
+    stats = client.get("/api/stats", headers={"Authorization": f"Bearer {response.json()['token']}"})
+    assert stats.status_code == 200
+    assert stats.json()["sessions"] == 0
+
+
+def test_flavor_search(client):
+    flavors = client.get("/api/flavors", params={"q": "jasm"}).json()["flavors"]
+    assert [f["descriptor"] for f in flavors] == ["Jasmine"]
+
+
+def test_similar_samples(client, conn):
+    client.post("/api/sessions", json={"name": "Table", "date": "2025-03-01", "samples": [
+        {"name": f"Lot {i}", "flavors": ["Jasmine"], "cups": [{"flavor": 7 + i / 4}]} for i in range(4)
+    ]})
+    sample_id = conn.execute("SELECT id FROM samples WHERE name = 'Lot 0'").fetchone()[0]
+    response = client.get(f"/api/samples/{sample_id}/similar", params={"limit": 2, "approximate": "1"})
+    assert response.status_code == 200, response.text
+    matches = response.json()["matches"]
+    assert len(matches) == 2 and sample_id not in [m["sample_id"] for m in matches]
+
+    by_scores = client.post("/api/samples/similar", json={"scores": {"flavor": 7}, "flavors": ["Jasmine"]})
+    assert [m["name"] for m in by_scores.json()["matches"]][0] == "Lot 0"
+
+
+@pytest.mark.parametrize("request_args, error", [
+    (("get", "/api/samples/999/similar", {}), "no scored sample with id 999"),
+    (("post", "/api/samples/similar", {"json": {"scores": {"bogus": 8}}}), "unknown attribute 'bogus'"),
+    (("post", "/api/calibration/nope/scores", {"json": [{"sample": 1}]}), "no calibration table with code 'NOPE'"),
+])
+def test_unknown_references_are_bad_requests(client, request_args, error):
+    method, url, kwargs = request_args
+    response = getattr(client, method)(url, **kwargs)
+    assert response.status_code == 400
+    assert response.json() == {"error": error}
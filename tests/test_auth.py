@@ -0,0 +1,58 @@
+import auth
+import storage
+
+EMAIL = "cupper@coffee.com"
+USER = {"name": "Cupper", "company": "Lab", "role": "Q Grader", "member_since": "2025"}
+
+
+def stored_hash(conn, email=EMAIL):
+    return storage.get_credentials(conn, email)["password_hash"]
+
+
+def test_hash_format_and_verify():
+    encoded = auth.hash_password("secret")
+    _, n, r, p, salt, key = encoded.split("$")
+    assert encoded.startswith("scrypt$")
+    assert (int(n), int(r), int(p)) == (auth.SCRYPT_N, auth.SCRYPT_R, auth.SCRYPT_P)
+    assert auth.verify_password("secret", encoded)
+    assert not auth.verify_password("Secret", encoded)
+    assert not auth.needs_rehash(encoded)
+
+
+def test_same_password_gets_a_fresh_salt():
+    assert auth.hash_password("secret") != auth.hash_password("secret")
+
+
+def test_register_and_authenticate(conn):
+    auth.register(conn, " Cupper@Coffee.com ", USER, "secret")
+    assert stored_hash(conn).startswith("scrypt$")
+    assert auth.authenticate(conn, "CUPPER@coffee.com", "secret")["email"] == EMAIL
+    assert auth.authenticate(conn, EMAIL, "wrong") is None
+    assert auth.authenticate(conn, "nobody@coffee.com", "secret") is None
+
+
+def test_plaintext_row_is_upgraded_at_login(conn):
+    storage.create_user(conn, EMAIL, {**USER, "password_hash": "secret"})
+    assert auth.authenticate(conn, EMAIL, "wrong") is None
+    assert stored_hash(conn) == "secret"
+    assert auth.authenticate(conn, EMAIL, "secret") is not None
+    assert stored_hash(conn).startswith("scrypt$")
+    assert auth.authenticate(conn, EMAIL, "secret") is not None
+
+
+def test_hash_with_old_parameters_is_upgraded_at_login(conn):
+    old = auth._hash("secret", n=2 ** 10)
+    storage.create_user(conn, EMAIL, {**USER, "password_hash": old})
+    assert auth.needs_rehash(old)
+    assert auth.authenticate(conn, EMAIL, "secret") is not None
+    upgraded = stored_hash(conn)
+    assert upgraded != old and not auth.needs_rehash(upgraded)
+    assert auth.verify_password("secret", upgraded)
+
+
+def test_tokens(conn):
+    token = auth.issue_token(EMAIL)
+    assert auth.check_token(token) == EMAIL
+    assert auth.check_token(token + "x") is None
+    auth.revoke_token(token)
+    assert auth.check_token(token) is None
@@ -0,0 +1,74 @@
+from itertools import count
+
+import pytest
+
+import badges
+import reference
+import services
+import storage
+
+EMAIL = "qc@coffee.com"
+FIRST_CUP = {"id": "first_cup", "icon": "🥇", "name": "First Cup", "description": "", "requires": {"sessions": 1}}
+REGULAR = {"id": "regular", "icon": "☕", "name": "Regular", "description": "", "requires": {"sessions": 2}}
+VERSIONS = count(10 ** 6)  # above any real reference version
+
+
+@pytest.fixture
+def rules(monkeypatch):
+    # Swaps the badge rules as an edit of reference.json would.
+    snapshot = dict(reference.current())
+
+    def use(*badge_rules):
+        snapshot.update(badges=list(badge_rules), version=next(VERSIONS))
+
+    monkeypatch.setattr(reference, "current", lambda: snapshot)
+    monkeypatch.setattr(storage, "_save_listeners", [])
+    return use
+
+
+def save(conn):
+    services.create_session(conn, EMAIL, {"name": "Table", "samples": [{"name": "Lot"}]})
+
+
+def earned(conn):
+    return [badge["id"] for badge, _ in badges.earned_badges(conn, EMAIL)]
+
+
+def test_nothing_is_awarded_until_registered(conn, rules):
+    rules(FIRST_CUP)
+    save(conn)
+    assert earned(conn) == []
+    badges.register()
+    save(conn)
+    assert earned(conn) == ["first_cup"]
+
+
+def test_badges_are_awarded_on_save(conn, rules):
+    rules(FIRST_CUP, REGULAR)
+    badges.register()
+    save(conn)
+    assert storage.get_user_stats(conn, EMAIL)["badges"] == 1
+    save(conn)
+    assert sorted(earned(conn)) == ["first_cup", "regular"]
+    assert storage.get_user_stats(conn, EMAIL)["badges"] == 2
+
+
+def test_count_drops_when_a_rule_is_removed(conn, rules):
+    rules(FIRST_CUP, REGULAR)
+    badges.register()
+    save(conn)
+    save(conn)
+    rules(FIRST_CUP)
+    badges.sync(conn, EMAIL, storage.get_user_stats(conn, EMAIL))
+    assert storage.get_user_stats(conn, EMAIL)["badges"] == 1
+    assert earned(conn) == ["first_cup"]
+
+
+def test_sync_awards_existing_users_new_rules(conn, rules):
+    rules(FIRST_CUP)
+    badges.register()
+    save(conn)
+    rules(FIRST_CUP, REGULAR)
+    assert badges.sync(conn, EMAIL, storage.get_user_stats(conn, EMAIL)) == []
+    save(conn)
+    assert storage.get_user_stats(conn, EMAIL)["badges"] == 2
@@ -0,0 +1,63 @@
+import statistics
+
+import pytest
+
+import calibration
+import scoring
+import storage
+
+FLAVOR = scoring.ATTRIBUTES.index("flavor")
+
+
+def sheet(flavor=7.5, cups=5):
+    grid = scoring.new_sheet(1, cups)[0]
+    grid[:, FLAVOR] = flavor
+    return grid
+
+
+@pytest.fixture
+def table(conn):
+    code = calibration.create_session(conn, "host@coffee.com", "Panel", 2, 5)
+    return calibration.get_session(conn, code)["id"]
+
+
+def test_first_submission_creates_version_one(conn, table):
+    assert calibration.submit_score(conn, table, "a@coffee.com", 0, sheet(8.0), 0) == 1
+    grid, version = calibration.get_submission(conn, table, "a@coffee.com", 0)
+    assert version == 1
+    assert grid[0, FLAVOR] == 8.0
+
+
+def test_stale_version_is_rejected_and_changes_nothing(conn, table):
+    # Two tabs of the same cupper both read version 0; the second save loses.
+    other = storage.connect(storage.DB_PATH)
+    assert calibration.submit_score(other, table, "a@coffee.com", 0, sheet(8.0), 0) == 1
+    assert calibration.submit_score(conn, table, "a@coffee.com", 0, sheet(9.0), 0) is None
+    grid, version = calibration.get_submission(conn, table, "a@coffee.com", 0)
+    assert (grid[0, FLAVOR], version) == (8.0, 1)
+    [change] = calibration.changes_since(conn, table)
+    assert change["cuppers"] == 1 and change["seq"] == 1
+    # Retrying with the version just read goes through.
+    assert calibration.submit_score(conn, table, "a@coffee.com", 0, sheet(9.0), version) == 2
+
+
+def test_panel_statistics_follow_resubmissions(conn, table):
+    finals = {}
+    for cupper, flavor in (("a", 7.0), ("b", 8.0), ("c", 9.0)):
+        calibration.submit_score(conn, table, f"{cupper}@coffee.com", 1, sheet(flavor), 0)
+        finals[cupper] = 82.5 - 7.5 + flavor
+    calibration.submit_score(conn, table, "c@coffee.com", 1, sheet(7.25), 1)
+    finals["c"] = 82.5 - 7.5 + 7.25
+    [change] = calibration.changes_since(conn, table)
+    assert change["sample"] == 1 and change["cuppers"] == 3
+    assert change["mean"] == pytest.approx(statistics.mean(finals.values()))
+    assert change["std"] == pytest.approx(statistics.stdev(finals.values()))
+    assert change["agreement"] == pytest.approx(max(0.0, 1 - change["std"] / calibration.AGREEMENT_TOLERANCE))
+
+
+def test_changes_since_returns_only_newer_samples(conn, table):
+    calibration.submit_score(conn, table, "a@coffee.com", 0, sheet(), 0)
+    seen = calibration.changes_since(conn, table)[-1]["seq"]
+    assert calibration.changes_since(conn, table, seen) == []
+    calibration.submit_score(conn, table, "a@coffee.com", 1, sheet(), 0)
+    assert [c["sample"] for c in calibration.changes_since(conn, table, seen)] == [1]
@@ -0,0 +1,42 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import exporter
+import scoring
+import storage
+
+EMAIL = "export@coffee.com"
+
+
+def export(conn, dataset, fmt, batch_size=exporter.BATCH_SIZE):
+    return b"".join(exporter.stream(conn, EMAIL, dataset, fmt, batch_size))
+
+
+@pytest.mark.parametrize("dataset", list(exporter.DATASETS))
+def test_empty_history_exports_a_header(conn, dataset):
+    frame = pd.read_csv(io.BytesIO(export(conn, dataset, "csv")))
+    assert frame.empty
+    assert list(frame.columns) == list(exporter.DATASETS[dataset])
+
+
+def test_batches_join_into_one_csv(conn):
+    for i in range(5):
+        storage.save_review(conn, EMAIL, {"name": f"Coffee {i}", "rating": i, "date": f"2025-03-0{i + 1}"})
+    data = export(conn, "reviews", "csv", batch_size=2)
+    assert data.count(b"id,name,") == 1
+    frame = pd.read_csv(io.BytesIO(data))
+    assert frame["name"].tolist() == [f"Coffee {i}" for i in reversed(range(5))]
+
+
+def test_cup_scores_have_one_row_per_cup(conn):
+    sheet = scoring.new_sheet(2, 3)
+    storage.save_session(conn, EMAIL, {"name": "Table", "date": "2025-03-01", "cups_per_sample": 3,
+                                       "samples": [{"name": "A"}, {"name": "B"}],
+                                       "score_sheet": scoring.dumps(sheet)})
+    lines = export(conn, "cup_scores", "ndjson").decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [(r["sample"], r["cup"]) for r in rows] == [(s, c) for s in range(2) for c in range(3)]
+    assert rows[0]["flavor"] == scoring.DEFAULT_QUALITY
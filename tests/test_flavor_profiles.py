@@ -0,0 +1,91 @@
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import flavor_profiles
+import flavor_wheel
+import storage
+
+PROFILES = [["Jasmine", "Black Tea"], ["Lemon"], [], ["Jasmine", "Lemon", "Dark Chocolate"]]
+
+
+def test_encode_decode_round_trip():
+    profiles = flavor_profiles.encode_many(PROFILES)
+    assert profiles.shape == (len(PROFILES), flavor_profiles.WORDS)
+    assert [sorted(flavor_profiles.decode(p)) for p in profiles] == [sorted(p) for p in PROFILES]
+    blobs = [flavor_profiles.to_bytes(p) for p in profiles]
+    assert {len(b) for b in blobs} == {16}
+    assert (flavor_profiles.from_bytes(blobs) == profiles).all()
+    assert flavor_profiles.from_bytes([]).shape == (0, flavor_profiles.WORDS)
+
+
+def test_bits_follow_flavor_bits_json():
+    order = flavor_profiles.load_order()
+    for descriptor in ("Jasmine", "Lemon"):
+        profile = flavor_profiles.encode([descriptor])
+        assert np.flatnonzero(flavor_profiles._unpack(profile)).tolist() == [order.index(descriptor)]
+
+
+def test_jaccard():
+    profiles = flavor_profiles.encode_many(PROFILES)
+    similarities = flavor_profiles.jaccard(profiles, flavor_profiles.encode(["Jasmine", "Lemon"]))
+    assert similarities.tolist() == pytest.approx([1 / 3, 1 / 2, 0, 2 / 3])
+    empty = flavor_profiles.jaccard(profiles[2:3], flavor_profiles.encode([]))
+    assert empty.tolist() == [0]
+
+
+def test_counts_match_a_string_count():
+    profiles = flavor_profiles.encode_many(PROFILES)
+    by_descriptor = Counter(d for p in PROFILES for d in p)
+    order = flavor_profiles.load_order()
+    counts = flavor_profiles.bit_counts(profiles)
+    assert {order[i]: int(counts[i]) for i in np.flatnonzero(counts)} == by_descriptor
+
+    by_category = Counter(category for p in PROFILES for d in p for category, _ in flavor_wheel.parents(d))
+    assert {c: n for c, n in flavor_profiles.category_counts(profiles).items() if n} == by_category
+
+
+def test_backfill_encodes_older_samples(conn):
+    storage.save_session(conn, "qc@coffee.com", {
+        "name": "Old table", "date": "2024-01-01",
+        "samples": [{"name": "Lot", "flavors": ["Jasmine"]}, {"name": "Plain"}],
+    })
+    usage = flavor_profiles.load_usage(conn, "qc@coffee.com")
+    assert [flavor_profiles.decode(p) for p in usage] == [["Jasmine"]]
+    assert storage.samples_missing_flavor_bits(conn, "qc@coffee.com") == []
+
+
+@pytest.fixture
+def wheel_files(tmp_path, monkeypatch):
+    wheel = flavor_wheel.load_wheel()
+    bits = {"bits": list(flavor_profiles.load_order())}
+    paths = tmp_path / "flavor_wheel.json", tmp_path / "flavor_bits.json"
+    monkeypatch.setattr(flavor_profiles, "BITS_PATH", str(paths[1]))
+
+    def write(path, data, stamp):
+        path.write_text(json.dumps(data), encoding="utf-8")
+        os.utime(path, ns=(stamp, stamp))
+
+    write(paths[1], bits, 1)
+    yield wheel, bits, paths, write
+    flavor_wheel.reload()
+
+
+def test_new_descriptor_is_picked_up_without_restart(wheel_files):
+    wheel, bits, (wheel_path, bits_path), write = wheel_files
+    before = flavor_profiles.to_bytes(flavor_profiles.encode(["Jasmine", "Lemon"]))
+
+    wheel["categories"][0]["subcategories"][0]["descriptors"].append("Yuzu")
+    write(wheel_path, wheel, 1)
+    flavor_wheel.reload(str(wheel_path))
+    with pytest.raises(ValueError, match="Yuzu"):
+        flavor_profiles.tables()
+
+    bits["bits"].append("Yuzu")
+    write(bits_path, bits, 2)
+    profile = flavor_profiles.encode(["Yuzu", "Jasmine"])
+    assert sorted(flavor_profiles.decode(profile)) == ["Jasmine", "Yuzu"]
+    assert flavor_profiles.to_bytes(flavor_profiles.encode(["Jasmine", "Lemon"])) == before
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+import importer
+import services
+import storage
+
+HEADER = "Lot,Country,Process,Altitude,Moisture\n"
+
+
+def csv(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def xlsx(rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    data = io.BytesIO()
+    workbook.save(data)
+    data.seek(0)
+    return data
+
+
+def test_rejected_rows_keep_their_line_numbers():
+    data = csv(HEADER + "K-1,Kenya,Washed,1850,10.5\n\n,Kenya,,,\nK-1,Kenya,,,\n,,,,\nK-2,Kenya,Boiled,9000,\n")
+    valid, rejected = importer.check_lots(data, "offer.csv", chunk_size=2)
+    assert valid == 1
+    assert rejected.to_dict("records") == [
+        {"line": 4, "lot_id": "", "error": "missing lot ID"},
+        {"line": 5, "lot_id": "K-1", "error": "duplicate lot ID"},
+        {"line": 7, "lot_id": "K-2", "error": "unknown process; altitude must be 0-3500 m"},
+    ]
+
+
+def test_blank_xlsx_rows_are_skipped():
+    data = xlsx([["lot_id", "origin", "altitude"], ["E-1", "Ethiopia", 2100], [None, None, None],
+                 [None, "", None], ["E-2", "Ethiopia", None]])
+    valid, rejected = importer.check_lots(data, "offer.xlsx")
+    assert (valid, len(rejected)) == (2, 0)
+
+
+@pytest.mark.parametrize("header", ["lot,lot_id,origin\n", "Country,origin,lot_id\n"])
+def test_alias_collision_is_reported(header):
+    with pytest.raises(ValueError, match="both give"):
+        importer.check_lots(csv(header + "A,B,C\n"), "offer.csv")
+
+
+def test_iter_samples_yields_batches():
+    rows = "".join(f"L-{i},Brazil,Natural,1100,11\n" for i in range(5))
+    batches = list(importer.iter_samples(csv(HEADER + rows), "offer.csv", chunk_size=2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0][0] == {"lot_id": "L-0", "origin": "Brazil", "name": "L-0", "process": "Natural",
+                             "variety": None, "altitude": 1100.0, "moisture": 11.0}
+
+
+def test_import_session_writes_every_batch(conn):
+    rows = "".join(f"L-{i},Brazil,Natural,1100,11\n" for i in range(5))
+    session_id = services.import_session(conn, "qc@coffee.com", {"name": "Offer"},
+                                         importer.iter_samples(csv(HEADER + rows), "offer.csv", chunk_size=2))
+    [saved] = storage.list_sessions(conn, "qc@coffee.com")
+    assert saved["id"] == session_id
+    assert [s["lot_id"] for s in saved["samples"]] == [f"L-{i}" for i in range(5)]
+    assert storage.get_user_stats(conn, "qc@coffee.com")["origins"] == 1
+
+
+def test_failed_batch_rolls_back_the_import(conn):
+    def batches():
+        yield [{"name": "Good", "origin": "Kenya"}]
+        yield [{"name": "Bad", "process": "Boiled"}]
+
+    with pytest.raises(services.ValidationError):
+        services.import_session(conn, "qc@coffee.com", {"name": "Offer"}, batches())
+    assert storage.list_sessions(conn, "qc@coffee.com") == []
+    with pytest.raises(services.ValidationError, match="at least one sample"):
+        services.import_session(conn, "qc@coffee.com", {"name": "Offer"}, iter([]))
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import storage
+
+EMAIL = "pages@coffee.com"
+
+
+def walk(list_page, page_size, **kwargs):
+    # Every row, following next_cursor until a short page.
+    rows, cursor = [], None
+    while True:
+        page = list_page(limit=page_size, cursor=cursor, **kwargs)
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        cursor = storage.next_cursor(page)
+
+
+@pytest.fixture
+def sessions(conn):
+    # Few distinct dates, origins and scores, so most sort keys are ties.
+    rng = random.Random(7)
+    for i in range(23):
+        storage.save_session(conn, EMAIL, {
+            "name": f"S{i}", "date": f"2025-03-0{rng.randint(1, 3)}",
+            "samples": [{"name": "Lot", "origin": rng.choice(["Kenya", "Brazil"]),
+                         "final_score": rng.choice([None, 80.0, 82.5, 85.0])}],
+        })
+    storage.save_session(conn, "other@coffee.com", {"name": "Other", "date": "2025-03-02", "samples": []})
+    return conn
+
+
+def expected(conn, sort, descending, origin=None):
+    # Sorted in Python from one unpaginated read: (sort key, id), NULL scores lowest.
+    rows = storage.list_sessions(conn, EMAIL, limit=1000, origin=origin)
+    key = (lambda s: s["date"]) if sort == "date" else (lambda s: -1 if s["avg_score"] is None else s["avg_score"])
+    return [s["id"] for s in sorted(rows, key=lambda s: (key(s), s["id"]), reverse=descending)]
+
+
+@pytest.mark.parametrize("sort", list(storage.SESSION_SORTS))
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("origin", [None, "Kenya"])
+@pytest.mark.parametrize("page_size", [1, 4, 23])
+def test_pages_cover_every_session_once(sessions, sort, descending, origin, page_size):
+    pages = walk(lambda **kw: storage.list_sessions(sessions, EMAIL, **kw), page_size,
+                 sort=sort, descending=descending, origin=origin)
+    assert [s["id"] for s in pages] == expected(sessions, sort, descending, origin)
+    assert all(origin in (None, s["samples"][0]["origin"]) for s in pages)
+
+
+def test_min_score_filter(sessions):
+    scored = walk(lambda **kw: storage.list_sessions(sessions, EMAIL, **kw), 3, sort="score", min_score=82.5)
+    assert scored and all(s["avg_score"] >= 82.5 for s in scored)
+
+
+def test_session_average_ignores_unscored_samples(conn):
+    storage.save_session(conn, EMAIL, {"name": "Mixed", "date": "2025-03-01", "samples": [
+        {"final_score": 80.0}, {"final_score": None}, {"final_score": 84.0}]})
+    storage.save_session(conn, EMAIL, {"name": "Unscored", "date": "2025-03-01", "samples": [{}]})
+    scores = {s["name"]: s["avg_score"] for s in storage.list_sessions(conn, EMAIL)}
+    assert scores == {"Mixed": 82.0, "Unscored": None}
+
+
+@pytest.mark.parametrize("sort", list(storage.REVIEW_SORTS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_review_pages_with_ties_and_filters(conn, sort, descending):
+    for i in range(17):
+        storage.save_review(conn, EMAIL, {"name": f"R{i}", "rating": i % 3, "date": f"2025-03-0{i % 2 + 1}",
+                                          "roast_level": "Light" if i % 4 else "Dark"})
+    everything = sorted(storage.list_reviews(conn, EMAIL, limit=100),
+                        key=lambda r: (r[sort], r["id"]), reverse=descending)
+    assert len(everything) == 17
+    pages = walk(lambda **kw: storage.list_reviews(conn, EMAIL, **kw), 3, sort=sort, descending=descending)
+    assert [r["id"] for r in pages] == [r["id"] for r in everything]
+    light = walk(lambda **kw: storage.list_reviews(conn, EMAIL, **kw), 2, sort=sort, descending=descending,
+                 roast_level="Light")
+    assert [r["id"] for r in light] == [r["id"] for r in everything if r["roast_level"] == "Light"]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import scoring
+import storage
+
+UNIFORMITY = scoring.ATTRIBUTES.index("uniformity")
+FLAVOR = scoring.ATTRIBUTES.index("flavor")
+
+
+def scores(sheet):
+    return dict(zip(storage.SCORE_COLUMNS, scoring.sample_scores(sheet)[0]))
+
+
+def test_default_sheet_totals():
+    # 7 quality attributes at 7.50 plus 3 x 10 cup points.
+    result = scores(scoring.new_sheet(1, 5))
+    assert result["flavor"] == 7.5
+    assert result["uniformity"] == 10
+    assert result["defects"] == 0
+    assert result["final_score"] == pytest.approx(82.5)
+
+
+def test_quality_attributes_average_over_cups():
+    sheet = scoring.new_sheet(1, 4)
+    sheet[0, :, FLAVOR] = [8.0, 8.25, 8.5, 8.75]
+    result = scores(sheet)
+    assert result["flavor"] == pytest.approx(8.375)
+    assert result["final_score"] == pytest.approx(82.5 - 7.5 + 8.375)
+
+
+@pytest.mark.parametrize("cups, failed, points", [(5, 1, 8.0), (5, 2, 6.0), (4, 1, 7.5), (3, 3, 0.0)])
+def test_failed_cups_lose_their_share_of_ten_points(cups, failed, points):
+    sheet = scoring.new_sheet(1, cups)
+    sheet[0, :failed, UNIFORMITY] = 0
+    result = scores(sheet)
+    assert result["uniformity"] == pytest.approx(points)
+    assert result["final_score"] == pytest.approx(82.5 - 10 + points)
+
+
+def test_defects_are_deducted_per_cup():
+    sheet = scoring.new_sheet(1, 5)
+    sheet[0, 0, scoring.DEFECTS] = 2  # taint
+    sheet[0, 3, scoring.DEFECTS] = 4  # fault
+    result = scores(sheet)
+    assert result["defects"] == 6
+    assert result["final_score"] == pytest.approx(76.5)
+
+
+def test_samples_are_scored_independently():
+    sheet = scoring.new_sheet(2, 5)
+    sheet[1, :, scoring.DEFECTS] = 2
+    final = scoring.sample_scores(sheet)[:, -1]
+    assert final.tolist() == pytest.approx([82.5, 72.5])
+
+
+def test_sheet_round_trip():
+    sheet = scoring.new_sheet(3, 5)
+    sheet[2, 1, FLAVOR] = 9.25
+    loaded = scoring.loads(scoring.dumps(sheet))
+    assert loaded.dtype == np.float32
+    np.testing.assert_array_equal(loaded, sheet)
@@ -0,0 +1,96 @@
+import pytest
+
+import analytics
+import services
+import storage
+
+EMAIL = "qc@coffee.com"
+
+
+def session(**overrides):
+    return {"name": "Morning table", "date": "2025-03-01",
+            "samples": [{"name": "Lot 1", "origin": "Kenya"}], **overrides}
+
+
+def review(**overrides):
+    return {"name": "Kenya AA", "rating": 4, "cost": 18.5, "date": "2025-03-01", **overrides}
+
+
+def test_session_is_saved_with_normalized_fields(conn):
+    session_id = services.create_session(conn, EMAIL, session(
+        name="  Morning table ", samples=[{"name": "Lot 1", "altitude": "1850", "flavors": ["Jasmine"]}]))
+    [saved] = storage.list_sessions(conn, EMAIL)
+    assert saved["id"] == session_id
+    assert saved["name"] == "Morning table"
+    assert saved["samples"][0]["altitude"] == 1850.0
+    assert saved["samples"][0]["flavors"] == ["Jasmine"]
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"name": " "}, "session name is required"),
+    ({"name": 5}, "session name must be text"),
+    ({"date": "garbage"}, "date must be YYYY-MM-DD"),
+    ({"date": "2025-02-30"}, "date must be YYYY-MM-DD"),
+    ({"date": 20250301}, "date must be YYYY-MM-DD"),
+    ({"samples": []}, "at least one sample"),
+    ({"samples": ["Lot 1", "Lot 2"]}, "samples must be a list of objects"),
+    ({"samples": {"name": "Lot 1"}}, "samples must be a list of objects"),
+    ({"samples": [{"altitude": "high"}]}, "altitude must be a number"),
+    ({"samples": [{"moisture": float("nan")}]}, "moisture must be a number"),
+    ({"samples": [{"process": "Boiled"}]}, "unknown process"),
+    ({"samples": [{"flavors": ["Nope"]}]}, "unknown flavor descriptors: Nope"),
+    ({"samples": [{"cups": ["8.5"]}]}, "cups must be a list"),
+    ({"samples": [{"cups": [{"flavor": 11}]}]}, "quality scores"),
+    ({"cups_per_sample": 7}, "cups_per_sample must be 3-5"),
+])
+def test_invalid_session_is_rejected(conn, overrides, message):
+    with pytest.raises(services.ValidationError, match=message):
+        services.create_session(conn, EMAIL, session(**overrides))
+    assert storage.list_sessions(conn, EMAIL) == []
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"name": ""}, "coffee name is required"),
+    ({"cost": "abc"}, "cost must be a number"),
+    ({"cost": -1}, "cost must be at least 0"),
+    ({"rating": 6}, "rating must be 1-5"),
+    ({"rating": True}, "rating must be 1-5"),
+    ({"date": "yesterday"}, "date must be YYYY-MM-DD"),
+    ({"roast_level": "Burnt"}, "unknown roast level"),
+])
+def test_invalid_review_is_rejected(conn, overrides, message):
+    with pytest.raises(services.ValidationError, match=message):
+        services.create_review(conn, EMAIL, review(**overrides))
+    assert storage.list_reviews(conn, EMAIL) == []
+
+
+def test_review_without_cost(conn):
+    services.create_review(conn, EMAIL, review(cost=None))
+    assert storage.list_reviews(conn, EMAIL)[0]["cost"] is None
+
+
+def test_analytics_read_saved_dates(conn):
+    services.create_session(conn, EMAIL, session(samples=[{"name": "Lot 1", "cups": [{"flavor": 8}]}]))
+    summary = analytics.summarize(conn, EMAIL)
+    assert len(summary["session_scores"]) == 1
+
+
+def test_batch_is_validated_before_saving(conn):
+    with pytest.raises(services.ValidationError):
+        services.create_sessions(conn, EMAIL, [session(), session(date="garbage")])
+    assert storage.list_sessions(conn, EMAIL) == []
+
+
+def test_batch_is_saved_in_one_transaction(conn, monkeypatch):
+    saves = []
+
+    def fail_on_second(conn, user_email, event, stats, changed):
+        saves.append(event)
+        if len(saves) == 2:
+            raise RuntimeError("disk full")
+
+    monkeypatch.setattr(storage, "_save_listeners", [fail_on_second])
+    with pytest.raises(RuntimeError):
+        services.create_sessions(conn, EMAIL, [session(), session(name="Afternoon table")])
+    assert storage.list_sessions(conn, EMAIL) == []
+    assert storage.get_user_stats(conn, EMAIL)["sessions"] == 0
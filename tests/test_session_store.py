@@ -0,0 +1,74 @@
+import pytest
+
+import session_store
+import storage
+
+
+@pytest.fixture(autouse=True)
+def store(conn):
+    session_store.flush()
+    session_store._cache.clear()
+    yield
+    session_store._pending.clear()
+    session_store._cache.clear()
+
+
+def other_worker_load(token):
+    # What a worker that has never cached the session sees.
+    session_store._cache.clear()
+    return session_store.load(token)
+
+
+def test_state_change_is_flushed(conn):
+    token = session_store.create("a@coffee.com", {"language": "en"})
+    assert session_store.update(token, {"language": "es"})
+    session_store.flush()
+    assert other_worker_load(token)["state"] == {"language": "es"}
+
+
+def test_flush_does_not_resurrect_session_revoked_elsewhere(conn):
+    token = session_store.create("a@coffee.com", {"language": "en"})
+    session_store.update(token, {"language": "es"})
+    # Logout on another worker while this one still has the change queued.
+    storage.delete_app_session(conn, session_store.unsign(token))
+    session_store.flush()
+    assert other_worker_load(token) is None
+
+
+def test_revoke_drops_queued_changes(conn):
+    token = session_store.create("a@coffee.com")
+    session_store.update(token, {"language": "pt"})
+    session_store.revoke(token)
+    session_store.flush()
+    assert session_store.load(token) is None
+    assert other_worker_load(token) is None
+
+
+def test_forged_token_is_rejected(conn):
+    token = session_store.create("a@coffee.com")
+    assert session_store.load(token[:-2] + "xx") is None
+    assert session_store.load("not-a-token") is None
+
+
+def test_handle_is_single_use_and_not_a_token(conn):
+    token = session_store.create("a@coffee.com")
+    handle = session_store.issue_handle(token)
+    assert session_store.load(handle) is None
+    assert session_store.redeem_handle(handle) == token
+    assert session_store.redeem_handle(handle) is None
+
+
+def test_handle_dies_with_its_token(conn):
+    token = session_store.create("a@coffee.com")
+    handle = session_store.issue_handle(token)
+    session_store.revoke(token)
+    assert session_store.redeem_handle(handle) is None
+
+
+def test_replaced_or_expired_handle_is_refused(conn, monkeypatch):
+    token = session_store.create("a@coffee.com")
+    replaced = session_store.issue_handle(token)
+    session_store.discard_handle(replaced)
+    assert session_store.redeem_handle(replaced) is None
+    monkeypatch.setattr(session_store, "HANDLE_TTL", -1)
+    assert session_store.redeem_handle(session_store.issue_handle(token)) is None
@@ -0,0 +1,89 @@
+import random
+import threading
+from collections import OrderedDict
+
+import pytest
+
+import scoring
+import services
+import similarity
+import storage
+
+EMAIL = "similar@coffee.com"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    # Keys are (user, data version): equal across the per-test databases.
+    monkeypatch.setattr(similarity, "_cache", OrderedDict())
+
+
+def scored_session(rng, samples=60):
+    return {
+        "name": "History", "date": "2025-03-01", "cups_per_sample": 3,
+        "samples": [
+            {"name": f"Lot {i}", "origin": "Kenya",
+             "cups": [{scoring.ATTRIBUTES[q]: round(rng.uniform(6, 9), 2) for q in scoring.QUALITY}]}
+            for i in range(samples)
+        ],
+    }
+
+
+def test_exact_queries_never_build_the_ivf(conn):
+    services.create_session(conn, EMAIL, scored_session(random.Random(1)))
+    index = similarity.load_index(conn, EMAIL)
+    assert index["ivf"] is None
+    sample_id = index["rows"][0][0]
+    assert len(services.similar_samples(conn, EMAIL, sample_id=sample_id, k=5)) == 5
+    assert similarity.load_index(conn, EMAIL)["ivf"] is None
+
+
+def test_approximate_query_publishes_a_new_index(conn):
+    services.create_session(conn, EMAIL, scored_session(random.Random(2)))
+    exact = similarity.load_index(conn, EMAIL)
+    services.similar_samples(conn, EMAIL, sample_id=exact["rows"][0][0], k=5, approximate=True)
+    cached = similarity.load_index(conn, EMAIL)
+    assert cached is not exact and exact["ivf"] is None
+    assert cached["matrix"] is exact["matrix"]
+    assert len(cached["ivf"]["members"]) == len(cached["rows"])
+    assert similarity.load_index(conn, EMAIL, approximate=True) is cached
+
+
+def test_concurrent_approximate_queries(conn):
+    services.create_session(conn, EMAIL, scored_session(random.Random(3)))
+    exact = similarity.load_index(conn, EMAIL)
+    vector = exact["matrix"][0]
+    expected = similarity.top_k(exact, vector, k=5, exclude=0)
+    indexes, results = [], []
+
+    def query():
+        index = similarity.load_index(storage.get_connection(), EMAIL, approximate=True)
+        indexes.append(index)
+        probe = len(index["ivf"]["centroids"])
+        results.append(similarity.top_k(index, vector, k=5, exclude=0, approximate=True, probe=probe))
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and exact["ivf"] is None
+    assert similarity.load_index(conn, EMAIL) in indexes
+    # Probing every cluster scores every row, so it matches the exact search.
+    assert all([r for r, _ in result] == [r for r, _ in expected] for result in results)
+
+
+def test_empty_history_has_no_ivf(conn):
+    assert services.similar_samples(conn, EMAIL, scores={"flavor": 8}, flavors=[], approximate=True) == []
+    index = similarity.load_index(conn, EMAIL)
+    assert index["rows"] == [] and index["ivf"] is None
+
+
+def test_similar_to_sample_excludes_itself(conn):
+    services.create_session(conn, EMAIL, scored_session(random.Random(4), samples=10))
+    [saved] = storage.list_sessions(conn, EMAIL)
+    sample_id = similarity.load_index(conn, EMAIL)["rows"][0][0]
+    matches = services.similar_samples(conn, EMAIL, sample_id=sample_id, k=3, approximate=True)
+    assert len(matches) == 3
+    assert sample_id not in [m["sample_id"] for m in matches]
+    assert {m["session_id"] for m in matches} == {saved["id"]}
@@ -0,0 +1,86 @@
+import random
+import statistics
+
+import pytest
+
+import running_stats
+import storage
+
+EMAIL = "stats@coffee.com"
+
+
+def state_of(values):
+    state = running_stats.EMPTY
+    for value in values:
+        state = running_stats.add(state, value)
+    return state
+
+
+def test_add_matches_two_pass_statistics():
+    values = [random.Random(3).uniform(70, 95) for _ in range(200)]
+    count, mean, _ = state = state_of(values)
+    assert count == 200
+    assert mean == pytest.approx(statistics.mean(values))
+    assert running_stats.std(state) == pytest.approx(statistics.stdev(values))
+
+
+def test_remove_and_replace_undo_add():
+    values = [80.0, 82.5, 91.0, 85.25]
+    state = running_stats.remove(state_of(values), 91.0)
+    assert state == pytest.approx(state_of([80.0, 82.5, 85.25]))
+    state = running_stats.replace(state, 80.0, 88.0)
+    assert state == pytest.approx(state_of([82.5, 85.25, 88.0]))
+
+
+def test_small_states():
+    assert running_stats.std(running_stats.EMPTY) == 0
+    assert running_stats.std(state_of([84.0])) == 0
+    assert running_stats.remove(state_of([84.0]), 84.0) == running_stats.EMPTY
+
+
+def save(conn, scores, origins, created="2025-03-01T09:00:00"):
+    samples = [{"origin": o, "final_score": s} for s, o in zip(scores, origins)]
+    storage.save_session(conn, EMAIL, {"name": "Table", "date": created[:10], "created": created,
+                                       "samples": samples})
+
+
+def test_user_stats_follow_every_save(conn):
+    rng = random.Random(5)
+    scores, origins = [], set()
+    for _ in range(12):
+        batch = [rng.choice([None, rng.uniform(75, 92)]) for _ in range(3)]
+        names = [rng.choice(["Kenya", "Brazil", "Peru", None]) for _ in range(3)]
+        save(conn, batch, names)
+        scores += [s for s in batch if s is not None]
+        origins |= {o for o in names if o}
+    stats = storage.get_user_stats(conn, EMAIL)
+    assert stats["sessions"] == 12
+    assert stats["score_count"] == len(scores)
+    assert stats["score_mean"] == pytest.approx(statistics.mean(scores))
+    assert stats["score_std"] == pytest.approx(statistics.stdev(scores))
+    assert stats["max_score"] == pytest.approx(max(scores))
+    assert stats["origins"] == len(origins)
+
+
+def test_previous_mean_is_the_mean_before_the_last_scored_save(conn):
+    save(conn, [80.0], ["Kenya"])
+    assert storage.get_user_stats(conn, EMAIL)["previous_mean"] is None
+    save(conn, [90.0], ["Kenya"])
+    save(conn, [None], ["Kenya"])  # unscored: nothing to compare
+    stats = storage.get_user_stats(conn, EMAIL)
+    assert (stats["previous_mean"], stats["score_mean"]) == (80.0, 85.0)
+
+
+def test_empty_user_has_no_scores(conn):
+    stats = storage.get_user_stats(conn, EMAIL)
+    assert (stats["sessions"], stats["score_mean"], stats["max_score"], stats["score_std"]) == (0, None, None, 0)
+
+
+def test_month_counters_reset_in_a_new_month(conn):
+    save(conn, [80.0], ["Kenya"], created="2020-01-05T09:00:00")
+    save(conn, [80.0], ["Brazil"], created="2020-02-05T09:00:00")
+    row = conn.execute("SELECT month, month_sessions, month_origins FROM user_stats").fetchone()
+    assert tuple(row) == ("2020-02", 1, 1)
+    # Read in a later month, the counters show nothing new.
+    stats = storage.get_user_stats(conn, EMAIL)
+    assert (stats["sessions"], stats["month_sessions"], stats["month_origins"]) == (2, 0, 0)
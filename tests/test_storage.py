@@ -0,0 +1,39 @@
+import services
+import storage
+
+
+def add_data(conn, email):
+    services.create_session(conn, email, {"name": "Table", "samples": [{"name": "Lot", "origin": "Kenya"}]})
+    services.create_review(conn, email, {"name": "Kenya AA"})
+    storage.save_draft(conn, email, "review", {"name": "Kenya AA"})
+    services.save_flavor_profile(conn, email, "Bright", ["Jasmine"])
+
+
+def test_guests_do_not_share_data(conn):
+    first, second = storage.create_guest(conn), storage.create_guest(conn)
+    assert first != second
+    add_data(conn, first)
+    assert storage.list_sessions(conn, second) == []
+    assert storage.list_reviews(conn, second) == []
+
+
+def test_delete_guest_removes_everything(conn):
+    guest = storage.create_guest(conn)
+    add_data(conn, guest)
+    storage.delete_guest(conn, guest)
+    for table in storage.GUEST_TABLES:
+        assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE user_email = ?", (guest,)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM guests").fetchone()[0] == 0
+
+
+def test_purge_guests_keeps_recent_ones_and_accounts(conn):
+    old, recent = storage.create_guest(conn), storage.create_guest(conn)
+    with conn:
+        conn.execute("UPDATE guests SET created = '2020-01-01T00:00:00' WHERE email = ?", (old,))
+    for email in (old, recent, "member@coffee.com"):
+        add_data(conn, email)
+    storage.purge_guests(conn, 24 * 60 * 60)
+    assert storage.list_sessions(conn, old) == []
+    assert len(storage.list_sessions(conn, recent)) == 1
+    assert len(storage.list_sessions(conn, "member@coffee.com")) == 1
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import trends
+
+
+def reference_lttb(x, y, threshold):
+    # Textbook per-bucket loop, for comparison.
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x, avg_y = np.mean(x[end:next_end]), np.mean(y[end:next_end])
+        areas = [abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) for j in range(start, end)]
+        a = start + int(np.argmax(areas))
+        kept.append(a)
+    return kept + [n - 1]
+
+
+def frame(days=120):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    return pd.DataFrame({
+        "date": np.repeat(dates, 2), "session_id": np.repeat(np.arange(days), 2),
+        "final_score": rng.uniform(80, 90, 2 * days), "origin": ["Kenya", "Brazil"] * days, "lot_id": "L-1",
+    })
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 10), (10, 50), (10, 2)])
+def test_short_series_is_kept_whole(n, threshold):
+    assert trends.lttb(np.arange(n), np.zeros(n), threshold).tolist() == list(range(n))
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (1001, 400), (57, 3)])
+def test_matches_the_reference_algorithm(n, threshold):
+    rng = np.random.default_rng(n)
+    x, y = np.sort(rng.uniform(0, 1000, n)), rng.normal(85, 2, n)
+    kept = trends.lttb(x, y, threshold)
+    assert len(kept) == threshold and kept[0] == 0 and kept[-1] == n - 1
+    assert (np.diff(kept) > 0).all()
+    assert kept.tolist() == reference_lttb(x, y, threshold)
+
+
+def test_keeps_a_single_dip():
+    y = np.full(5000, 85.0)
+    y[3210] = 70
+    assert 3210 in trends.lttb(np.arange(5000), y, 100)
+
+
+def test_month_resolution_averages_every_sample():
+    df = frame()
+    series = trends.resample(df, "month")
+    assert series["count"].sum() == len(df)
+    january = df[df["date"] < "2024-02-01"]["final_score"].mean()
+    assert series["score"].iloc[0] == pytest.approx(january)
+
+
+def test_trend_downsamples_after_smoothing():
+    points, total = trends.trend(frame(), scope="origin", key="Kenya", max_points=20)
+    assert total == 120 and len(points) == 20
+    full = trends.smooth(trends.resample(trends.select(frame(), "origin", "Kenya")))
+    assert points["rolling"].iloc[-1] == pytest.approx(full["rolling"].iloc[-1])
+
+
+def test_empty_selection():
+    points, total = trends.trend(frame(), scope="lot", key="missing")
+    assert total == 0 and points.empty
@@ -0,0 +1,127 @@
+import hashlib
+import html
+import os
+import re
+
+# Styling for the app. styles/app.css is the stylesheet source. It is minified
+# once per process into static/app.min.css, which Streamlit serves itself
+# (server.enableStaticServing in .streamlit/config.toml). Each rerun sends a
+# short <link> tag instead of the whole stylesheet; the file hash in the URL
+# lets browsers cache it until the CSS changes. Without static serving (or if
+# static/ can't be written) the minified CSS is sent inline.
+#
+# Cards are compiled once from the templates below; rendering one is a
+# single format call, with every value HTML-escaped.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(ROOT, "styles", "app.css")
+OUTPUT = os.path.join(ROOT, "static", "app.min.css")
+STATIC_URL = "app/static/app.min.css"
+
+
+def minify(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def build(source=SOURCE, output=OUTPUT):
+    # Returns (css, version, written). The output is only rewritten when the
+    # minified CSS changed, so its mtime (and the browser's copy) stays valid.
+    with open(source, encoding="utf-8") as f:
+        css = minify(f.read())
+    version = hashlib.sha1(css.encode()).hexdigest()[:10]
+    try:
+        with open(output, encoding="utf-8") as f:
+            current = f.read()
+    except OSError:
+        current = None
+    if current != css:
+        try:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(css)
+        except OSError:
+            return css, version, False
+    return css, version, True
+
+
+CSS, VERSION, WRITTEN = build()
+
+
+def stylesheet(static_serving):
+    if static_serving and WRITTEN:
+        return f'<link rel="stylesheet" href="{STATIC_URL}?v={VERSION}">'
+    return f"<style>{CSS}</style>"
+
+
+# Card templates
+TEMPLATES = {
+    "header": """
+        <div class="main-header">
+            <h1>{title}</h1>
+            <p>{subtitle}</p>
+        </div>""",
+    "footer": """
+        <div class="app-footer">{text}</div>""",
+    "metric": """
+        <div class="metric-card">
+            <h3 class="card-title">{icon}</h3>
+            <h2 class="card-value">{value}</h2>
+            <p class="card-meta">{label}</p>
+            <p class="card-delta">{delta}</p>
+        </div>""",
+    "recent_session": """
+        <div class="coffee-card">
+            <div class="card-row">
+                <div>
+                    <h4 class="card-title">☕ {name}</h4>
+                    <p class="card-meta">🌍 {origin} | 📅 {date}</p>
+                </div>
+                <div class="card-side">
+                    <h3 class="card-value">⭐ {score}</h3>
+                </div>
+            </div>
+        </div>""",
+    "session": """
+        <div class="coffee-card">
+            <h4 class="card-title">☕ {name}</h4>
+            <p class="card-meta">📅 {date} | 🌱 {samples} samples | 🔬 {type}{score}</p>
+            <p class="card-note">Created: {created}</p>
+        </div>""",
+    "review": """
+        <div class="coffee-card">
+            <h4>☕ {name}</h4>
+            <p>🌍 {origin} | 🏷️ {producer} | {stars}</p>
+            <p>💰 {cost} | 🔥 {roast_level} | ☕ {preparation}</p>
+            <p><em>"{flavor_notes}"</em></p>
+            <p>👍 Recommend: {recommend} | 🔄 Buy again: {buy_again}</p>
+        </div>""",
+    "badge": """
+        <div class="badge-card">
+            <h3>{icon} {name}</h3>
+            <p>{description}</p>
+        </div>""",
+    "profile": """
+        <div class="metric-card">
+            <h3 class="card-heading">👤 {name}</h3>
+            <p class="card-meta">{role}</p>
+            <p class="card-meta">📅 Member since: {member_since}</p>
+        </div>""",
+    "page_label": """
+        <p class="page-label">{text}</p>""",
+}
+
+# One line, no whitespace between tags: Markdown then treats each card as a
+# single raw HTML block.
+COMPILED = {name: re.sub(r">\s+<", "><", template.strip()) for name, template in TEMPLATES.items()}
+
+
+def _escape(value):
+    # Line breaks become <br>: a blank line would end the HTML block.
+    return html.escape("" if value is None else str(value)).replace("\n", "<br>")
+
+
+def card(template, /, **fields):
+    return COMPILED[template].format(**{key: _escape(value) for key, value in fields.items()})
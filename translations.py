@@ -0,0 +1,115 @@
+import json
+import os
+from types import MappingProxyType
+
+# Translation catalogs, loaded once at import from locales/*.json and
+# locales/*.po. Each language is resolved against its fallback chain up front,
+# so a lookup is a single dict access on a frozen mapping.
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+DEFAULT_LANGUAGE = "en"
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _unquote(text):
+    return json.loads(text) if text.startswith('"') else text
+
+
+def _load_po(path):
+    # Minimal gettext .po reader: msgid/msgstr pairs with continuation lines.
+    catalog = {}
+    msgid = msgstr = None
+    target = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("msgid "):
+                if msgid and msgstr:
+                    catalog[msgid] = msgstr
+                msgid, msgstr, target = _unquote(line[6:]), "", "msgid"
+            elif line.startswith("msgstr "):
+                msgstr, target = _unquote(line[7:]), "msgstr"
+            elif line.startswith('"') and target == "msgid":
+                msgid += _unquote(line)
+            elif line.startswith('"') and target == "msgstr":
+                msgstr += _unquote(line)
+    if msgid and msgstr:
+        catalog[msgid] = msgstr
+    return catalog
+
+
+LOADERS = {".json": _load_json, ".po": _load_po}
+
+
+def load_raw_catalogs(directory=LOCALES_DIR):
+    catalogs = {}
+    for filename in sorted(os.listdir(directory)):
+        language, ext = os.path.splitext(filename)
+        if ext in LOADERS:
+            catalogs.setdefault(language, {}).update(LOADERS[ext](os.path.join(directory, filename)))
+    return catalogs
+
+
+def fallback_chain(language):
+    # "pt_BR" -> pt_BR, pt, en
+    chain = [language]
+    if "_" in language:
+        chain.append(language.split("_")[0])
+    if DEFAULT_LANGUAGE not in chain:
+        chain.append(DEFAULT_LANGUAGE)
+    return chain
+
+
+def build_catalogs(raw):
+    resolved = {}
+    for language in raw:
+        merged = {}
+        for fallback in reversed(fallback_chain(language)):
+            merged.update(raw.get(fallback, {}))
+        resolved[language] = MappingProxyType(merged)
+    return MappingProxyType(resolved)
+
+
+RAW_CATALOGS = load_raw_catalogs()
+CATALOGS = build_catalogs(RAW_CATALOGS)
+LANGUAGES = MappingProxyType({
+    language: CATALOGS[language].get("language_name", language)
+    for language in sorted(CATALOGS, key=lambda language: (language != DEFAULT_LANGUAGE, language))
+})
+_DEFAULT_CATALOG = CATALOGS.get(DEFAULT_LANGUAGE, MappingProxyType({}))
+_unknown_keys = set()
+
+
+def get_text(language, key):
+    catalog = CATALOGS.get(language, _DEFAULT_CATALOG)
+    try:
+        return catalog[key]
+    except KeyError:
+        _unknown_keys.add(key)
+        return key
+
+
+def missing_keys_report():
+    # Keys each language doesn't translate itself (served from a fallback),
+    # plus keys looked up at runtime that no catalog defines.
+    reference = set(RAW_CATALOGS.get(DEFAULT_LANGUAGE, {}))
+    report = {
+        language: sorted(reference - set(raw))
+        for language, raw in RAW_CATALOGS.items()
+        if language != DEFAULT_LANGUAGE
+    }
+    report["_unknown"] = sorted(_unknown_keys)
+    return report
+
+
+if __name__ == "__main__":
+    for language, keys in missing_keys_report().items():
+        print(f"{language}: {len(keys)} missing")
+        for key in keys:
+            print(f"    {key}")
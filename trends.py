@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Score trends over the flat per-sample frame from analytics.load_samples_frame.
+# A trend is one series (all samples, one origin or one lot) at a resolution
+# (per session, or the mean per day/week/month), smoothed with a rolling mean
+# and an EMA, then downsampled with Largest-Triangle-Three-Buckets so a chart
+# of years of daily cupping sends at most MAX_POINTS points to the browser
+# while keeping the peaks and dips that plain striding would drop.
+
+SCOPES = ("all", "origin", "lot")
+RESOLUTIONS = {"session": None, "day": "D", "week": "W", "month": "M"}
+MAX_POINTS = 400
+
+
+def select(df, scope="all", key=None):
+    scored = df.dropna(subset=["final_score"])
+    if scope == "origin":
+        return scored[scored["origin"] == key]
+    if scope == "lot":
+        return scored[scored["lot_id"] == key]
+    return scored
+
+
+def resample(df, resolution="session"):
+    # (date, score, count) rows, oldest first. "session" keeps one point per
+    # session; the others average every sample in the period, labelled with
+    # the period's start date.
+    if df.empty:
+        return pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "score": [], "count": []})
+    freq = RESOLUTIONS[resolution]
+    if freq is None:
+        keys = [df["date"], df["session_id"]]
+    else:
+        keys = [df["date"].dt.to_period(freq).dt.start_time.rename("date")]
+    grouped = df.groupby(keys, sort=True)["final_score"].agg(score="mean", count="size").reset_index()
+    return grouped[["date", "score", "count"]]
+
+
+def smooth(series, window=4, span=8):
+    # Rolling mean over the last `window` points and an EMA with `span`.
+    return series.assign(
+        rolling=series["score"].rolling(window, min_periods=1).mean(),
+        ema=series["score"].ewm(span=span, adjust=False).mean(),
+    )
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    # Indices of the points to keep, first and last always included. Each
+    # bucket keeps the point forming the largest triangle with the point kept
+    # from the previous bucket and the average of the next bucket.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def trend(df, scope="all", key=None, resolution="session", window=4, span=8, max_points=MAX_POINTS):
+    # Smoothing runs on the full series; downsampling only picks which of the
+    # smoothed points are sent. Returns (points, total points before downsampling).
+    series = smooth(resample(select(df, scope, key), resolution), window, span)
+    kept = lttb(series["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64), series["score"], max_points)
+    return series.iloc[kept].reset_index(drop=True), len(series)
+
+
+def choices(df, scope):
+    # Origins or lots that have scored samples, for the scope picker.
+    column = {"origin": "origin", "lot": "lot_id"}[scope]
+    values = df.dropna(subset=["final_score"])[column].replace("", pd.NA).dropna()
+    return sorted(values.unique().tolist())
@@ -0,0 +1,46 @@
+import importlib
+import os
+import threading
+import time
+
+# Preloads the heavy modules the analytics, cupping and export pages need, on
+# a background thread, once per process. The app starts it after serving the
+# login page, so the imports overlap with the user typing their password
+# instead of delaying the first page after a cold start. The thread waits
+# DELAY seconds first, so it doesn't compete with the rest of the run that
+# started it (there is one CPU in most of our containers). Imports are
+# thread-safe: a page that needs a module still loading waits for it rather
+# than importing it twice. Set CUPPING_WARMUP=0 to turn it off.
+
+ENABLED = os.environ.get("CUPPING_WARMUP", "1") != "0"
+DELAY = 0.5
+MODULES = (
+    "numpy", "pandas", "pyarrow", "plotly.express", "plotly.graph_objects",
+    "analytics", "exporter", "figures", "importer", "trends",
+)
+
+# Seconds each module took to import, filled in as the thread runs.
+timings = {}
+
+_lock = threading.Lock()
+_thread = None
+
+
+def _run(modules):
+    time.sleep(DELAY)
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue  # optional dependency missing; the page will say so
+        timings[name] = time.perf_counter() - start
+
+
+def start(modules=MODULES):
+    global _thread
+    with _lock:
+        if _thread is not None or not ENABLED:
+            return
+        _thread = threading.Thread(target=_run, args=(modules,), name="warmup", daemon=True)
+        _thread.start()